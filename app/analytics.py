@@ -0,0 +1,215 @@
+"""Per-user columnar transaction snapshots (NumPy) for statistics and forecasting.
+
+A snapshot is loaded with one query and kept in memory until the user's change sequence moves
+(every write to transactions/categories allocates a new one), so repeated report calls only pay
+for vectorized arithmetic over int arrays.
+"""
+import threading
+from collections import OrderedDict
+from typing import List, Optional
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from . import models, archive
+from .core.money import format_cents
+
+UNCATEGORIZED = -1
+
+
+class Snapshot:
+    """Transactions of one user as parallel arrays.
+
+    ``cents`` are positive amounts in minor units, ``signs`` +1 for income and -1 for expense,
+    ``days`` days since 1970-01-01 and ``codes`` indexes into ``category_ids``/``category_names``
+    (``UNCATEGORIZED`` for rows without a category).
+    """
+
+    __slots__ = ("seq", "ids", "cents", "signs", "days", "codes", "category_ids", "category_names")
+
+    def __init__(self, seq, ids, cents, signs, days, codes, category_ids, category_names):
+        self.seq = seq
+        self.ids = ids
+        self.cents = cents
+        self.signs = signs
+        self.days = days
+        self.codes = codes
+        self.category_ids: List[int] = category_ids
+        self.category_names: List[str] = category_names
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def months(self) -> np.ndarray:
+        """Months since 1970-01 for every row."""
+        return self.days.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+
+
+def load_snapshot(db: Session, user_id: int, seq: int) -> Snapshot:
+    categories = db.execute(
+        select(models.Category.id, models.Category.name)
+        .where(models.Category.user_id == user_id)
+        .order_by(models.Category.id)
+    ).all()
+    code_of = {cid: code for code, (cid, _) in enumerate(categories)}
+
+    src = archive.transactions_source(user_id, archive.archived_before(db, user_id) is not None)
+    rows = db.execute(select(src.c.id, src.c.amount_cents, src.c.type, src.c.date, src.c.category_id)).all()
+    n = len(rows)
+    ids, cents, types, dates, category_ids = zip(*rows) if rows else ((), (), (), (), ())
+    return Snapshot(
+        seq=seq,
+        ids=np.fromiter(ids, dtype=np.int64, count=n),
+        cents=np.fromiter(cents, dtype=np.int64, count=n),
+        signs=np.fromiter((1 if t == models.TxType.income else -1 for t in types), dtype=np.int8, count=n),
+        days=np.array(dates, dtype="datetime64[D]").astype(np.int32) if n else np.empty(0, dtype=np.int32),
+        codes=np.fromiter((code_of.get(c, UNCATEGORIZED) for c in category_ids), dtype=np.int32, count=n),
+        category_ids=[cid for cid, _ in categories],
+        category_names=[name for _, name in categories],
+    )
+
+
+class SnapshotCache:
+    """LRU of snapshots keyed by user, valid while the user's change sequence is unchanged."""
+
+    def __init__(self, max_users: int = 256):
+        self.max_users = max_users
+        self._items: "OrderedDict[int, Snapshot]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, db: Session, user_id: int) -> Snapshot:
+        seq = db.scalar(
+            select(models.ChangeCounter.seq).where(models.ChangeCounter.user_id == user_id)
+        ) or 0
+        with self._lock:
+            snap = self._items.get(user_id)
+            if snap is not None and snap.seq == seq:
+                self._items.move_to_end(user_id)
+                return snap
+        snap = load_snapshot(db, user_id, seq)
+        with self._lock:
+            self._items[user_id] = snap
+            self._items.move_to_end(user_id)
+            while len(self._items) > self.max_users:
+                self._items.popitem(last=False)
+        return snap
+
+    def invalidate(self, user_id: Optional[int] = None) -> None:
+        with self._lock:
+            if user_id is None:
+                self._items.clear()
+            else:
+                self._items.pop(user_id, None)
+
+
+snapshots = SnapshotCache()
+
+
+def _money(cents) -> str:
+    return format_cents(int(round(float(cents))))
+
+
+def _month_label(month_index: int) -> str:
+    return str(np.datetime64(int(month_index), "M"))
+
+
+def monthly_totals(snap: Snapshot):
+    """(month indexes, income cents, expense cents) for every month from first to last transaction."""
+    if not len(snap):
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, empty
+    months = snap.months
+    first = months.min()
+    span = int(months.max() - first) + 1
+    offset = months - first
+    income = np.bincount(offset, weights=np.where(snap.signs > 0, snap.cents, 0), minlength=span).astype(np.int64)
+    expense = np.bincount(offset, weights=np.where(snap.signs < 0, snap.cents, 0), minlength=span).astype(np.int64)
+    return np.arange(first, first + span), income, expense
+
+
+def spending_stats(snap: Snapshot, outlier_threshold: float = 3.5) -> dict:
+    """Distribution of expenses per category, month-over-month variation and outlier flags.
+
+    Outliers use the robust z-score 0.6745 * (x - median) / MAD within each category.
+    """
+    expense = snap.signs < 0
+    cents = snap.cents[expense]
+    codes = snap.codes[expense]
+    ids = snap.ids[expense]
+
+    categories = []
+    outliers = []
+    for code in np.unique(codes):
+        mask = codes == code
+        values = cents[mask]
+        p25, median, p75, p90 = np.percentile(values, [25, 50, 75, 90])
+        mad = np.median(np.abs(values - median))
+        flagged = np.empty(0, dtype=np.int64)
+        if mad > 0:
+            score = 0.6745 * (values - median) / mad
+            flagged = np.flatnonzero(score > outlier_threshold)
+        category_id = snap.category_ids[code] if code != UNCATEGORIZED else None
+        categories.append({
+            "category_id": category_id,
+            "category_name": snap.category_names[code] if code != UNCATEGORIZED else "(Brak kategorii)",
+            "count": int(values.size),
+            "total": _money(values.sum()),
+            "mean": _money(values.mean()),
+            "median": _money(median),
+            "p25": _money(p25),
+            "p75": _money(p75),
+            "p90": _money(p90),
+        })
+        outliers.extend(
+            {"id": int(ids[mask][i]), "category_id": category_id, "amount": _money(values[i])} for i in flagged
+        )
+
+    months, _, expense_by_month = monthly_totals(snap)
+    changes = np.diff(expense_by_month)
+    return {
+        "categories": categories,
+        "monthly": {
+            "months": [_month_label(m) for m in months],
+            "expense": [_money(v) for v in expense_by_month],
+            "change": [_money(v) for v in changes],
+            "mean": _money(expense_by_month.mean()) if months.size else "0.00",
+            "std": _money(expense_by_month.std()) if months.size else "0.00",
+            "mean_abs_change": _money(np.abs(changes).mean()) if changes.size else "0.00",
+        },
+        "outliers": outliers,
+    }
+
+
+def forecast(snap: Snapshot, horizon: int = 3, history: int = 12) -> dict:
+    """Project monthly income and expense with a least-squares linear trend over recent months.
+
+    Fewer than three months of history fall back to the mean. Projections never go below zero.
+    """
+    months, income, expense = monthly_totals(snap)
+    months, income, expense = months[-history:], income[-history:], expense[-history:]
+    if not months.size:
+        return {"method": "none", "history_months": 0, "months": [], "income": [], "expense": [], "net": []}
+
+    future = np.arange(months[-1] + 1, months[-1] + 1 + horizon)
+    if months.size >= 3:
+        method = "linear"
+        x = months - months[0]
+        fx = future - months[0]
+        income_fc = np.polyval(np.polyfit(x, income, 1), fx)
+        expense_fc = np.polyval(np.polyfit(x, expense, 1), fx)
+    else:
+        method = "mean"
+        income_fc = np.full(horizon, income.mean())
+        expense_fc = np.full(horizon, expense.mean())
+    income_fc = np.clip(np.rint(income_fc), 0, None)
+    expense_fc = np.clip(np.rint(expense_fc), 0, None)
+    return {
+        "method": method,
+        "history_months": int(months.size),
+        "months": [_month_label(m) for m in future],
+        "income": [_money(v) for v in income_fc],
+        "expense": [_money(v) for v in expense_fc],
+        "net": [_money(v) for v in income_fc - expense_fc],
+    }
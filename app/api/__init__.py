@@ -4,6 +4,12 @@ from .categories import router as categories_router
 from .transactions import router as transactions_router
 from .reports import router as reports_router
 from .debug import router as debug_router
+from .budgets import router as budgets_router
+from .dashboard import router as dashboard_router
+from .sync import router as sync_router
+from .events import router as events_router
+from .rules import router as rules_router
+from .tags import router as tags_router
 
 # Auth is optional during development: keep the rest of API working even if auth deps are missing
 try:
@@ -16,6 +22,12 @@ try:
 except Exception:
     google_auth_router = None  # type: ignore
 
+# Statistics/forecast endpoints need numpy
+try:
+    from .analytics import router as analytics_router  # type: ignore
+except ImportError:
+    analytics_router = None  # type: ignore
+
 router = APIRouter()
 
 # Core public routers
@@ -23,9 +35,17 @@ router.include_router(categories_router)
 router.include_router(transactions_router)
 router.include_router(reports_router)
 router.include_router(debug_router)
+router.include_router(budgets_router)
+router.include_router(dashboard_router)
+router.include_router(sync_router)
+router.include_router(events_router)
+router.include_router(rules_router)
+router.include_router(tags_router)
 
 # Optional routers
 if auth_router is not None:
     router.include_router(auth_router)
 if google_auth_router is not None:
     router.include_router(google_auth_router)
+if analytics_router is not None:
+    router.include_router(analytics_router)
@@ -0,0 +1,30 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from ..deps import get_current_user, get_user_db
+from .. import analytics
+
+# Shares the /reports prefix; lives in its own module because it needs numpy (optional dependency)
+router = APIRouter(prefix="/reports", tags=["reports"])
+
+
+@router.get("/stats")
+def spending_stats(
+    outlier_threshold: float = Query(3.5, gt=0, description="robust z-score above which an expense is flagged"),
+    db: Session = Depends(get_user_db),
+    current_user=Depends(get_current_user),
+):
+    """Per-category expense percentiles, month-over-month variation and outlier transactions."""
+    snap = analytics.snapshots.get(db, current_user.id)
+    return analytics.spending_stats(snap, outlier_threshold=outlier_threshold)
+
+
+@router.get("/forecast")
+def spending_forecast(
+    months: int = Query(3, ge=1, le=24, description="how many months ahead to project"),
+    history: int = Query(12, ge=1, le=120, description="how many recent months to fit"),
+    db: Session = Depends(get_user_db),
+    current_user=Depends(get_current_user),
+):
+    """Projected monthly income, expense and net from the trend of recent months."""
+    snap = analytics.snapshots.get(db, current_user.id)
+    return analytics.forecast(snap, horizon=months, history=history)
@@ -6,6 +6,7 @@ from ..database import get_db
 from ..models import User
 from ..schemas import UserCreate, UserOut, Token
 from ..core.security import hash_password, verify_password, create_access_token
+from ..shards import shard_router
 from ..deps import get_current_user
 
 router = APIRouter(prefix="/auth", tags=["auth"])
@@ -26,6 +27,8 @@ def register_user(payload: UserCreate, db: Session = Depends(get_db)):
     db.add(user)
     db.commit()
     db.refresh(user)
+    if shard_router.sharded:
+        shard_router.assign(db, user)
     return user
 
 
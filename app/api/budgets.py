@@ -0,0 +1,185 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from sqlalchemy import select, func, update, and_
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import List, Optional
+from .. import models
+from ..schemas import BudgetSet, BudgetOut
+from ..deps import get_current_user, get_user_db
+from ..core.money import from_cents
+from ..budgets import reconcile_spend
+
+router = APIRouter(prefix="/budgets", tags=["budgets"])
+
+
+def track_spend(db: Session, tx: models.Transaction, sign: int = 1) -> None:
+    """Add (sign=1) or withdraw (sign=-1) a transaction's amount from its monthly spend counter.
+
+    Only categorized expenses are counted. Call with sign=-1 *before* mutating or deleting a
+    transaction and with sign=1 after creating or mutating it; the caller commits.
+    """
+    if tx.category_id is None or models.TxType(tx.type) != models.TxType.expense:
+        return
+    delta = tx.amount_cents * sign
+    key = and_(
+        models.CategorySpend.user_id == tx.user_id,
+        models.CategorySpend.category_id == tx.category_id,
+        models.CategorySpend.year == tx.date.year,
+        models.CategorySpend.month == tx.date.month,
+    )
+    res = db.execute(
+        update(models.CategorySpend)
+        .where(key)
+        .values(spent_cents=models.CategorySpend.spent_cents + delta)
+        .execution_options(synchronize_session=False)
+    )
+    if res.rowcount == 0:
+        db.add(models.CategorySpend(
+            user_id=tx.user_id,
+            category_id=tx.category_id,
+            year=tx.date.year,
+            month=tx.date.month,
+            spent_cents=delta,
+        ))
+        db.flush()
+
+
+def track_spend_many(db: Session, txs) -> None:
+    """Add many new transactions to the spend counters with one statement per (category, month)."""
+    deltas = {}
+    for tx in txs:
+        if tx.category_id is None or models.TxType(tx.type) != models.TxType.expense:
+            continue
+        key = (tx.user_id, tx.category_id, tx.date.year, tx.date.month)
+        deltas[key] = deltas.get(key, 0) + tx.amount_cents
+    for (user_id, category_id, year, month), delta in deltas.items():
+        res = db.execute(
+            update(models.CategorySpend)
+            .where(
+                models.CategorySpend.user_id == user_id,
+                models.CategorySpend.category_id == category_id,
+                models.CategorySpend.year == year,
+                models.CategorySpend.month == month,
+            )
+            .values(spent_cents=models.CategorySpend.spent_cents + delta)
+            .execution_options(synchronize_session=False)
+        )
+        if res.rowcount == 0:
+            db.add(models.CategorySpend(user_id=user_id, category_id=category_id, year=year, month=month, spent_cents=delta))
+    db.flush()
+
+
+def remaining_budget(db: Session, tx: models.Transaction) -> Optional[Decimal]:
+    """Return limit - spent for the transaction's category and month, or None without a budget."""
+    if tx.category_id is None:
+        return None
+    row = db.execute(
+        select(models.Budget.limit_cents, func.coalesce(models.CategorySpend.spent_cents, 0).label("spent"))
+        .join(
+            models.CategorySpend,
+            (models.CategorySpend.user_id == models.Budget.user_id)
+            & (models.CategorySpend.category_id == models.Budget.category_id)
+            & (models.CategorySpend.year == tx.date.year)
+            & (models.CategorySpend.month == tx.date.month),
+            isouter=True,
+        )
+        .where(models.Budget.user_id == tx.user_id)
+        .where(models.Budget.category_id == tx.category_id)
+    ).first()
+    if row is None:
+        return None
+    return from_cents(row.limit_cents - row.spent)
+
+
+@router.get("", response_model=List[BudgetOut])
+def list_budgets(db: Session = Depends(get_user_db), current_user=Depends(get_current_user)):
+    return db.scalars(
+        select(models.Budget)
+        .where(models.Budget.user_id == current_user.id)
+        .order_by(models.Budget.category_id)
+    ).all()
+
+
+@router.put("/{category_id}", response_model=BudgetOut)
+def set_budget(category_id: int, payload: BudgetSet, db: Session = Depends(get_user_db), current_user=Depends(get_current_user)):
+    cat = db.get(models.Category, category_id)
+    if not cat or cat.user_id != current_user.id:
+        raise HTTPException(status_code=404, detail="Category not found")
+    budget = db.scalar(
+        select(models.Budget)
+        .where(models.Budget.user_id == current_user.id)
+        .where(models.Budget.category_id == category_id)
+    )
+    if budget is None:
+        budget = models.Budget(user_id=current_user.id, category_id=category_id)
+    budget.monthly_limit = payload.monthly_limit
+    db.add(budget)
+    db.commit()
+    db.refresh(budget)
+    return budget
+
+
+@router.delete("/{category_id}", status_code=204)
+def delete_budget(category_id: int, db: Session = Depends(get_user_db), current_user=Depends(get_current_user)):
+    deleted = db.query(models.Budget).filter(
+        models.Budget.user_id == current_user.id,
+        models.Budget.category_id == category_id,
+    ).delete()
+    if not deleted:
+        raise HTTPException(status_code=404, detail="Budget not found")
+    db.commit()
+    return None
+
+
+@router.get("/status")
+def budget_status(
+    year: Optional[int] = None,
+    month: Optional[int] = None,
+    db: Session = Depends(get_user_db),
+    current_user=Depends(get_current_user),
+):
+    """Limit, spent and remaining amount per budgeted category for a month (defaults to current)."""
+    now = datetime.now(timezone.utc)
+    y = year or now.year
+    m = month or now.month
+    if m < 1 or m > 12:
+        raise HTTPException(status_code=400, detail="Invalid month")
+
+    stmt = (
+        select(
+            models.Budget.category_id,
+            models.Category.name.label("category_name"),
+            models.Budget.limit_cents,
+            func.coalesce(models.CategorySpend.spent_cents, 0).label("spent"),
+        )
+        .join(models.Category, models.Category.id == models.Budget.category_id)
+        .join(
+            models.CategorySpend,
+            (models.CategorySpend.user_id == models.Budget.user_id)
+            & (models.CategorySpend.category_id == models.Budget.category_id)
+            & (models.CategorySpend.year == y)
+            & (models.CategorySpend.month == m),
+            isouter=True,
+        )
+        .where(models.Budget.user_id == current_user.id)
+        .order_by(models.Category.name.asc())
+    )
+    result = []
+    for r in db.execute(stmt):
+        limit = from_cents(r.limit_cents)
+        spent = from_cents(r.spent) or Decimal(0)
+        result.append({
+            "category_id": r.category_id,
+            "category_name": r.category_name,
+            "limit": str(limit),
+            "spent": str(spent),
+            "remaining": str(limit - spent),
+        })
+    return {"year": y, "month": m, "categories": result}
+
+
+@router.post("/reconcile")
+def reconcile_budgets(db: Session = Depends(get_user_db), current_user=Depends(get_current_user)):
+    """Rebuild the current user's spend counters from transactions."""
+    return reconcile_spend(db, current_user.id)
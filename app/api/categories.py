@@ -1,17 +1,18 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from sqlalchemy import select
+from sqlalchemy import select, literal
 from typing import List
 
-from ..database import get_db
 from .. import models
 from ..schemas import CategoryCreate, CategoryUpdate, CategoryOut
-from ..deps import get_current_user
+from ..deps import get_current_user, get_user_db
+from .sync import next_seq, add_tombstones
+from ..core.events import hub
 
 router = APIRouter(prefix="/categories", tags=["categories"])
 
 @router.get("", response_model=List[CategoryOut])
-def list_categories(db: Session = Depends(get_db), current_user=Depends(get_current_user)):
+def list_categories(db: Session = Depends(get_user_db), current_user=Depends(get_current_user)):
     categories = db.scalars(
         select(models.Category)
         .where(models.Category.user_id == current_user.id)
@@ -21,16 +22,17 @@ def list_categories(db: Session = Depends(get_db), current_user=Depends(get_curr
 
 
 @router.post("", response_model=CategoryOut, status_code=201)
-def create_category(payload: CategoryCreate, db: Session = Depends(get_db), current_user=Depends(get_current_user)):
-    cat = models.Category(name=payload.name, color=payload.color, user_id=current_user.id)
+def create_category(payload: CategoryCreate, db: Session = Depends(get_user_db), current_user=Depends(get_current_user)):
+    cat = models.Category(name=payload.name, color=payload.color, user_id=current_user.id, seq=next_seq(db, current_user.id))
     db.add(cat)
     db.commit()
     db.refresh(cat)
+    hub.publish(current_user.id, {"type": "category.created", "seq": cat.seq, "category": CategoryOut.model_validate(cat).model_dump()})
     return cat
 
 
 @router.get("/{category_id}", response_model=CategoryOut)
-def get_category(category_id: int, db: Session = Depends(get_db), current_user=Depends(get_current_user)):
+def get_category(category_id: int, db: Session = Depends(get_user_db), current_user=Depends(get_current_user)):
     cat = db.get(models.Category, category_id)
     if not cat or cat.user_id != current_user.id:
         raise HTTPException(status_code=404, detail="Category not found")
@@ -38,7 +40,7 @@ def get_category(category_id: int, db: Session = Depends(get_db), current_user=D
 
 
 @router.put("/{category_id}", response_model=CategoryOut)
-def update_category(category_id: int, payload: CategoryUpdate, db: Session = Depends(get_db), current_user=Depends(get_current_user)):
+def update_category(category_id: int, payload: CategoryUpdate, db: Session = Depends(get_user_db), current_user=Depends(get_current_user)):
     cat = db.get(models.Category, category_id)
     if not cat or cat.user_id != current_user.id:
         raise HTTPException(status_code=404, detail="Category not found")
@@ -46,22 +48,38 @@ def update_category(category_id: int, payload: CategoryUpdate, db: Session = Dep
         cat.name = payload.name
     if payload.color is not None:
         cat.color = payload.color
+    cat.seq = next_seq(db, current_user.id)
     db.add(cat)
     db.commit()
     db.refresh(cat)
+    hub.publish(current_user.id, {"type": "category.updated", "seq": cat.seq, "category": CategoryOut.model_validate(cat).model_dump()})
     return cat
 
 
 @router.delete("/{category_id}", status_code=204)
-def delete_category(category_id: int, db: Session = Depends(get_db), current_user=Depends(get_current_user)):
+def delete_category(category_id: int, db: Session = Depends(get_user_db), current_user=Depends(get_current_user)):
     cat = db.get(models.Category, category_id)
     if not cat or cat.user_id != current_user.id:
         raise HTTPException(status_code=404, detail="Category not found")
+    seq = next_seq(db, current_user.id)
     # Detach transactions from this category for current user before deletion
     db.query(models.Transaction).filter(
         models.Transaction.user_id == current_user.id,
         models.Transaction.category_id == category_id
-    ).update({models.Transaction.category_id: None})
+    ).update({models.Transaction.category_id: None, models.Transaction.seq: seq})
+    # Archived rows and their summaries fall into the uncategorized bucket as well
+    for model in (models.ArchivedTransaction, models.TransactionSummary):
+        db.query(model).filter(
+            model.user_id == current_user.id,
+            model.category_id == category_id,
+        ).update({model.category_id: None})
+    # Budgets, spend counters and rules are per category, drop them explicitly (SQLite does not enforce FKs)
+    db.query(models.Budget).filter(models.Budget.category_id == category_id).delete()
+    db.query(models.CategorySpend).filter(models.CategorySpend.category_id == category_id).delete()
+    db.query(models.CategoryRule).filter(models.CategoryRule.category_id == category_id).delete()
+    add_tombstones(db, current_user.id, "category", select(literal(category_id)), seq)
     db.delete(cat)
     db.commit()
+    # Detached transactions changed too; clients reload them through /sync or a refetch
+    hub.publish(current_user.id, {"type": "category.deleted", "seq": seq, "id": category_id})
     return None
\ No newline at end of file
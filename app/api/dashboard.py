@@ -0,0 +1,31 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from sqlalchemy import select
+from .. import models
+from ..schemas import DashboardOut
+from ..deps import get_current_user, get_user_db
+from .reports import balance_totals
+from .. import archive
+
+router = APIRouter(prefix="/dashboard", tags=["dashboard"])
+
+
+@router.get("", response_model=DashboardOut)
+def get_dashboard(
+    recent_limit: int = Query(5, ge=1, le=100),
+    db: Session = Depends(get_user_db),
+    current_user=Depends(get_current_user),
+):
+    """Everything the main page needs on load, on one session: user, balance, newest transactions, categories."""
+    recent = archive.list_transactions(db, current_user.id, lambda model: [], limit=recent_limit)
+    categories = db.scalars(
+        select(models.Category)
+        .where(models.Category.user_id == current_user.id)
+        .order_by(models.Category.name)
+    ).all()
+    return {
+        "user": current_user,
+        "balance": balance_totals(db, current_user.id),
+        "recent_transactions": recent,
+        "categories": categories,
+    }
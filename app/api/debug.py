@@ -1,17 +1,22 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import select
+from sqlalchemy import select, insert
 from datetime import datetime, timedelta, timezone
 import random
 from decimal import Decimal
-from ..database import get_db
 from .. import models
-from ..deps import get_current_user
+from ..deps import get_current_user, get_current_superuser, get_user_db
+from .budgets import track_spend_many
+from .sync import next_seq, add_tombstones
+from ..duplicates import fingerprint_of
+from ..core.events import hub, RESYNC
+from ..core.profiling import profiles
 
 router = APIRouter(prefix="/debug", tags=["debug"])
 
 @router.post("/seed-demo")
-def seed_demo(db: Session = Depends(get_db), current_user=Depends(get_current_user)):
+def seed_demo(db: Session = Depends(get_user_db), current_user=Depends(get_current_user)):
     """Seed a few demo categories and random transactions for the current user. Auth required."""
     default_cats = [
         ("Jedzenie", "#f59e0b"),
@@ -19,16 +24,17 @@ def seed_demo(db: Session = Depends(get_db), current_user=Depends(get_current_us
         ("Rachunki", "#ef4444"),
         ("Wypłata", "#10b981"),
     ]
+    seq = next_seq(db, current_user.id)
     existing = {c.name for c in db.scalars(select(models.Category).where(models.Category.user_id == current_user.id)).all()}
     created = 0
     for name, color in default_cats:
         if name not in existing:
-            db.add(models.Category(name=name, color=color, user_id=current_user.id))
+            db.add(models.Category(name=name, color=color, user_id=current_user.id, seq=seq))
             created += 1
-    db.commit()
+    db.flush()
 
     cats = db.scalars(select(models.Category).where(models.Category.user_id == current_user.id)).all()
-    tx_created = 0
+    txs = []
     now = datetime.now(timezone.utc)
     for _ in range(12):
         cat = random.choice(cats) if cats else None
@@ -44,18 +50,57 @@ def seed_demo(db: Session = Depends(get_db), current_user=Depends(get_current_us
             description=("Przychód" if is_income else "Wydatek") + " demo",
             date=now - timedelta(days=random.randint(0, 45)),
             is_planned=False,
+            seq=seq,
         )
-        db.add(tx)
-        tx_created += 1
+        tx.fingerprint = fingerprint_of(tx)
+        txs.append(tx)
+    # One executemany and one counter update per (category, month) instead of two statements per row
+    columns = [c.key for c in models.Transaction.__table__.columns if c.key != "id"]
+    db.execute(insert(models.Transaction), [{c: getattr(tx, c) for c in columns} for tx in txs])
+    track_spend_many(db, txs)
     db.commit()
+    hub.publish(current_user.id, RESYNC)
 
-    return {"categories_created": created, "transactions_created": tx_created}
+    return {"categories_created": created, "transactions_created": len(txs)}
 
 
 @router.post("/clear")
-def clear_all(db: Session = Depends(get_db), current_user=Depends(get_current_user)):
+def clear_all(db: Session = Depends(get_user_db), current_user=Depends(get_current_user)):
     """Danger: remove all current user's transactions and categories. Auth required."""
+    seq = next_seq(db, current_user.id)
+    add_tombstones(db, current_user.id, "transaction", select(models.Transaction.id).where(models.Transaction.user_id == current_user.id), seq)
+    add_tombstones(db, current_user.id, "transaction", select(models.ArchivedTransaction.id).where(models.ArchivedTransaction.user_id == current_user.id), seq)
+    add_tombstones(db, current_user.id, "category", select(models.Category.id).where(models.Category.user_id == current_user.id), seq)
+    db.query(models.CategorySpend).filter(models.CategorySpend.user_id == current_user.id).delete()
+    db.query(models.Budget).filter(models.Budget.user_id == current_user.id).delete()
+    db.query(models.TransactionTag).filter(
+        models.TransactionTag.tag_id.in_(select(models.Tag.id).where(models.Tag.user_id == current_user.id))
+    ).delete(synchronize_session=False)
+    for model in (models.Tag, models.CategoryRule, models.ArchivedTransaction, models.TransactionSummary, models.ArchiveState):
+        db.query(model).filter(model.user_id == current_user.id).delete()
     tx_deleted = db.query(models.Transaction).filter(models.Transaction.user_id == current_user.id).delete()
     cat_deleted = db.query(models.Category).filter(models.Category.user_id == current_user.id).delete()
     db.commit()
-    return {"transactions_deleted": tx_deleted, "categories_deleted": cat_deleted}
\ No newline at end of file
+    hub.publish(current_user.id, RESYNC)
+    return {"transactions_deleted": tx_deleted, "categories_deleted": cat_deleted}
+
+
+@router.get("/profiles")
+def list_profiles(current_user=Depends(get_current_superuser)):
+    """Recent request profiles of this process, newest first (superuser only)."""
+    return [p.summary() for p in profiles.list()]
+
+
+@router.get("/profiles/{profile_id}")
+def get_profile(
+    profile_id: int,
+    format: str = Query("json", pattern="^(json|folded)$", description="folded: collapsed stacks for flame graph tools"),
+    current_user=Depends(get_current_superuser),
+):
+    """One profile: SQL statements with timings, hottest functions and sampled stacks (superuser only)."""
+    profile = profiles.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if format == "folded":
+        return PlainTextResponse(profile.folded())
+    return profile.details()
@@ -0,0 +1,45 @@
+import asyncio
+import json
+
+from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
+
+from ..core.events import hub
+from ..deps import get_current_user_for_stream
+
+router = APIRouter(prefix="/events", tags=["events"])
+
+# Comment line sent on idle connections so proxies do not time them out
+KEEPALIVE_SECONDS = 15
+
+
+def _format(event: dict) -> str:
+    return f"event: {event['type']}\ndata: {json.dumps(event, separators=(',', ':'))}\n\n"
+
+
+@router.get("")
+async def stream_events(current_user=Depends(get_current_user_for_stream)):
+    """Server-Sent Events stream of the current user's changes (transactions, categories, balance deltas).
+
+    Browsers' EventSource cannot send headers, so the JWT may be passed as ``?token=``.
+    """
+    sub = hub.subscribe(current_user.id)
+
+    async def stream():
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(sub.queue.get(), KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield _format(event)
+        finally:
+            hub.unsubscribe(sub)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -8,6 +8,8 @@ from ..database import get_db
 from ..models import User
 from ..core.security import create_access_token, hash_password
 from ..core.config import settings
+from ..core import oidc
+from ..shards import shard_router
 
 router = APIRouter(prefix="/auth/google", tags=["auth"])
 
@@ -17,11 +19,17 @@ starlette_config = StarletteConfig(environ={
 })
 oauth = OAuth(starlette_config)
 
+GOOGLE_METADATA_URL = "https://accounts.google.com/.well-known/openid-configuration"
+# Metadata and JWKS come from the shared cache, so Authlib does not fetch them per process
+google_provider = oidc.ProviderCache(GOOGLE_METADATA_URL)
+
 oauth.register(
     name="google",
-    server_metadata_url="https://accounts.google.com/.well-known/openid-configuration",
+    server_metadata_url=GOOGLE_METADATA_URL,
     client_kwargs={
         "scope": "openid email profile",
+        # token exchange over the pooled keep-alive connections
+        "transport": oidc.transport,
         # opcjonalnie włącz PKCE: "code_challenge_method": "S256"
     },
 )
@@ -31,23 +39,26 @@ async def google_login(request: Request):
     if not settings.google_client_id or not settings.google_client_secret:
         raise HTTPException(status_code=500, detail="Google OAuth not configured")
     redirect_uri = f"{settings.server_base_url}/api/auth/google/callback"
+    await google_provider.prepare(oauth.google)
     return await oauth.google.authorize_redirect(request, redirect_uri)
 
 @router.get("/callback")
 async def google_callback(request: Request, db: Session = Depends(get_db)):
     try:
+        await google_provider.prepare(oauth.google)
+        # Authlib validates the ID token locally against the cached JWKS (signature, iss, aud, exp, nonce)
         token = await oauth.google.authorize_access_token(request)
-        userinfo = token.get("userinfo")
-        if not userinfo:
-            # jeżeli provider nie zwrócił userinfo, pobierz jawnie
-            resp = await oauth.google.get("userinfo", token=token)
-            userinfo = resp.json()
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"OAuth error: {e}")
+    userinfo = token.get("userinfo")
+    if not userinfo:
+        raise HTTPException(status_code=400, detail="Brak id_token z Google")
 
     email = (userinfo.get("email") or "").lower()
     if not email:
         raise HTTPException(status_code=400, detail="Brak e-maila z Google")
+    if userinfo.get("email_verified") is False:
+        raise HTTPException(status_code=400, detail="Adres e-mail w Google nie jest zweryfikowany")
 
     user = db.query(User).filter(User.email == email).first()
     if not user:
@@ -62,6 +73,8 @@ async def google_callback(request: Request, db: Session = Depends(get_db)):
         db.add(user)
         db.commit()
         db.refresh(user)
+        if shard_router.sharded:
+            shard_router.assign(db, user)
 
     if not user.is_active:
         raise HTTPException(status_code=403, detail="Konto zablokowane")
@@ -1,35 +1,58 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import select, func, case
-from datetime import datetime, timezone
-from typing import Optional
-from ..database import get_db
+from sqlalchemy import select, func, case, cast, and_, literal, union_all, Integer
+from datetime import datetime, timezone, timedelta
+from decimal import Decimal
+from typing import Optional, Literal
 from .. import models
 
 router = APIRouter(prefix="/reports", tags=["reports"])
 
-from ..deps import get_current_user
+from ..deps import get_current_user, get_user_db
+from ..core.money import from_cents
+from ..core.cache import cache
+from .. import archive
+from .sync import current_seq
 
-@router.get("/balance")
-def get_balance(db: Session = Depends(get_db), current_user=Depends(get_current_user)):
-    income_sum = db.scalar(
-        select(func.coalesce(func.sum(models.Transaction.amount), 0))
-        .where(models.Transaction.user_id == current_user.id)
-        .where(models.Transaction.type == models.TxType.income)
-    ) or 0
-    expense_sum = db.scalar(
-        select(func.coalesce(func.sum(models.Transaction.amount), 0))
-        .where(models.Transaction.user_id == current_user.id)
-        .where(models.Transaction.type == models.TxType.expense)
-    ) or 0
+def _archived_sum(column, user_id: int, *where):
+    """Scalar subquery summing an archived-summary column for a user (optionally filtered)."""
+    return (
+        select(func.coalesce(func.sum(column), 0))
+        .where(models.TransactionSummary.user_id == user_id, *where)
+        .scalar_subquery()
+    )
+
+
+def balance_totals(db: Session, user_id: int) -> dict:
+    """All-time income/expense/net for a user, cached until the user's data changes."""
+    return cache.report("balance", user_id, current_seq(db, user_id), None, lambda: _balance_totals(db, user_id))
+
+
+def _balance_totals(db: Session, user_id: int) -> dict:
+    """All-time income/expense/net for a user in a single query (hot rows plus archived summaries)."""
+    row = db.execute(
+        select(
+            (func.coalesce(func.sum(case((models.Transaction.type == models.TxType.income, models.Transaction.amount_cents), else_=0)), 0)
+             + _archived_sum(models.TransactionSummary.income_cents, user_id)).label("income"),
+            (func.coalesce(func.sum(case((models.Transaction.type == models.TxType.expense, models.Transaction.amount_cents), else_=0)), 0)
+             + _archived_sum(models.TransactionSummary.expense_cents, user_id)).label("expense"),
+        ).where(models.Transaction.user_id == user_id)
+    ).one()
+    income_sum = from_cents(row.income) or 0
+    expense_sum = from_cents(row.expense) or 0
     net = income_sum - expense_sum
     return {"income": str(income_sum), "expense": str(expense_sum), "net": str(net)}
 
+
+@router.get("/balance")
+def get_balance(db: Session = Depends(get_user_db), current_user=Depends(get_current_user)):
+    return balance_totals(db, current_user.id)
+
 @router.get("/monthly")
 def get_monthly_report(
     year: Optional[int] = None,
     month: Optional[int] = None,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_user_db),
     current_user=Depends(get_current_user),
 ):
     """Return income/expense/net for a given month (defaults to current month)."""
@@ -45,20 +68,22 @@ def get_monthly_report(
     else:
         end = datetime(y, m + 1, 1)
 
-    income_sum = db.scalar(
-        select(func.coalesce(func.sum(models.Transaction.amount), 0))
-        .where(models.Transaction.user_id == current_user.id)
-        .where(models.Transaction.type == models.TxType.income)
-        .where(models.Transaction.date >= start)
-        .where(models.Transaction.date < end)
-    ) or 0
-    expense_sum = db.scalar(
-        select(func.coalesce(func.sum(models.Transaction.amount), 0))
-        .where(models.Transaction.user_id == current_user.id)
-        .where(models.Transaction.type == models.TxType.expense)
-        .where(models.Transaction.date >= start)
-        .where(models.Transaction.date < end)
-    ) or 0
+    tx = models.Transaction
+    summary = models.TransactionSummary
+    in_month = (summary.year == y, summary.month == m)
+    row = db.execute(
+        select(
+            func.coalesce(func.sum(case((tx.type == models.TxType.income, tx.amount_cents), else_=0)), 0).label("income"),
+            func.coalesce(func.sum(case((tx.type == models.TxType.expense, tx.amount_cents), else_=0)), 0).label("expense"),
+            _archived_sum(summary.income_cents, current_user.id, *in_month).label("archived_income"),
+            _archived_sum(summary.expense_cents, current_user.id, *in_month).label("archived_expense"),
+        )
+        .where(tx.user_id == current_user.id)
+        .where(tx.date >= start)
+        .where(tx.date < end)
+    ).one()
+    income_sum = from_cents(row.income + row.archived_income) or 0
+    expense_sum = from_cents(row.expense + row.archived_expense) or 0
     net = income_sum - expense_sum
     return {
         "year": y,
@@ -70,51 +95,326 @@ def get_monthly_report(
 
 
 @router.get("/by-category")
-def report_by_category(db: Session = Depends(get_db), current_user=Depends(get_current_user)):
+def report_by_category(db: Session = Depends(get_user_db), current_user=Depends(get_current_user)):
     """Aggregate income/expense by category for current user (including uncategorized)."""
-    income_sum = func.coalesce(func.sum(case((models.Transaction.type == models.TxType.income, models.Transaction.amount), else_=0)), 0)
-    expense_sum = func.coalesce(func.sum(case((models.Transaction.type == models.TxType.expense, models.Transaction.amount), else_=0)), 0)
+    return cache.report(
+        "by-category", current_user.id, current_seq(db, current_user.id), None,
+        lambda: _by_category(db, current_user.id),
+    )
 
-    stmt = (
+
+def _by_category(db: Session, user_id: int) -> list:
+    """Income/expense per category, uncategorized last.
+
+    One statement: hot transactions and archived summaries are grouped per category, summed, and
+    joined to the user's categories; the uncategorized bucket comes back as a row without a category.
+    """
+    tx = models.Transaction
+    summary = models.TransactionSummary
+    per_category = union_all(
+        select(
+            tx.category_id.label("category_id"),
+            func.sum(case((tx.type == models.TxType.income, tx.amount_cents), else_=0)).label("income"),
+            func.sum(case((tx.type == models.TxType.expense, tx.amount_cents), else_=0)).label("expense"),
+        ).where(tx.user_id == user_id).group_by(tx.category_id),
+        # Archived months only survive as per-category summaries
+        select(
+            summary.category_id.label("category_id"),
+            func.sum(summary.income_cents).label("income"),
+            func.sum(summary.expense_cents).label("expense"),
+        ).where(summary.user_id == user_id).group_by(summary.category_id),
+    ).subquery("per_category")
+    totals = (
+        select(
+            per_category.c.category_id,
+            func.sum(per_category.c.income).label("income"),
+            func.sum(per_category.c.expense).label("expense"),
+        )
+        .group_by(per_category.c.category_id)
+        .subquery("totals")
+    )
+    categorized = (
         select(
             models.Category.id.label("category_id"),
             models.Category.name.label("category_name"),
-            income_sum.label("income"),
-            expense_sum.label("expense"),
-        )
-        .join(
-            models.Transaction,
-            (models.Transaction.category_id == models.Category.id)
-            & (models.Transaction.user_id == current_user.id),
-            isouter=True,
+            func.coalesce(totals.c.income, 0).label("income"),
+            func.coalesce(totals.c.expense, 0).label("expense"),
+            literal(0).label("uncategorized"),
         )
-        .where(models.Category.user_id == current_user.id)
-        .group_by(models.Category.id, models.Category.name)
-        .order_by(models.Category.name.asc())
+        .join(totals, totals.c.category_id == models.Category.id, isouter=True)
+        .where(models.Category.user_id == user_id)
     )
-    rows = db.execute(stmt).mappings().all()
-
-    unc_stmt = select(
-        income_sum.label("income"),
-        expense_sum.label("expense"),
-    ).where(models.Transaction.category_id.is_(None)).where(models.Transaction.user_id == current_user.id)
-    unc = db.execute(unc_stmt).mappings().first()
-    result = [
-        {
-            "category_id": r["category_id"],
-            "category_name": r["category_name"],
-            "income": str(r["income"] or 0),
-            "expense": str(r["expense"] or 0),
-            "total": str((r["income"] or 0) - (r["expense"] or 0)),
-        }
-        for r in rows
-    ]
-    if unc and ((unc["income"] or 0) != 0 or (unc["expense"] or 0) != 0):
+    uncategorized = select(
+        literal(None).label("category_id"),
+        literal(None).label("category_name"),
+        totals.c.income,
+        totals.c.expense,
+        literal(1).label("uncategorized"),
+    ).where(totals.c.category_id.is_(None))
+    both = union_all(categorized, uncategorized).subquery("report")
+    stmt = select(both).order_by(both.c.uncategorized, both.c.category_name.asc())
+
+    result = []
+    for r in db.execute(stmt):
+        income = from_cents(r.income) or 0
+        expense = from_cents(r.expense) or 0
+        if r.uncategorized:
+            if income == 0 and expense == 0:
+                continue
+            result.append({
+                "category_id": None,
+                "category_name": "(Brak kategorii)",
+                "income": str(income),
+                "expense": str(expense),
+                "total": str(income - expense),
+            })
+        else:
+            result.append({
+                "category_id": r.category_id,
+                "category_name": r.category_name,
+                "income": str(income),
+                "expense": str(expense),
+                "total": str(income - expense),
+            })
+    return result
+
+
+@router.get("/by-tag")
+def report_by_tag(
+    date_from: Optional[datetime] = Query(None, alias="from"),
+    date_to: Optional[datetime] = Query(None, alias="to"),
+    db: Session = Depends(get_user_db),
+    current_user=Depends(get_current_user),
+):
+    """Income/expense/count per tag; a transaction with several tags counts towards each of them."""
+    return cache.report(
+        "by-tag", current_user.id, current_seq(db, current_user.id), [date_from, date_to],
+        lambda: _by_tag(db, current_user.id, date_from, date_to),
+    )
+
+
+def _by_tag(db: Session, user_id: int, date_from: Optional[datetime], date_to: Optional[datetime]) -> list:
+    links = models.TransactionTag
+
+    def totals(model):
+        in_range = [model.user_id == user_id]
+        if date_from is not None:
+            in_range.append(model.date >= date_from)
+        if date_to is not None:
+            in_range.append(model.date <= date_to)
+        stmt = (
+            select(
+                models.Tag.id,
+                models.Tag.name,
+                func.coalesce(func.sum(case((model.type == models.TxType.income, model.amount_cents), else_=0)), 0).label("income"),
+                func.coalesce(func.sum(case((model.type == models.TxType.expense, model.amount_cents), else_=0)), 0).label("expense"),
+                func.count(model.id).label("count"),
+            )
+            .join(links, links.tag_id == models.Tag.id, isouter=True)
+            .join(model, (model.id == links.transaction_id) & and_(*in_range), isouter=True)
+            .where(models.Tag.user_id == user_id)
+            .group_by(models.Tag.id, models.Tag.name)
+        )
+        return {r.id: r for r in db.execute(stmt)}
+
+    hot = totals(models.Transaction)
+    # Summaries carry no tags; archived rows are read only when the range reaches them
+    cold = totals(models.ArchivedTransaction) if archive.reaches_archive(archive.archived_before(db, user_id), date_from) else {}
+    result = []
+    for tag_id, r in sorted(hot.items(), key=lambda item: item[1].name):
+        c = cold.get(tag_id)
+        income = from_cents(r.income + (c.income if c else 0)) or 0
+        expense = from_cents(r.expense + (c.expense if c else 0)) or 0
         result.append({
-            "category_id": None,
-            "category_name": "(Brak kategorii)",
-            "income": str(unc["income"] or 0),
-            "expense": str(unc["expense"] or 0),
-            "total": str((unc["income"] or 0) - (unc["expense"] or 0)),
+            "tag_id": tag_id,
+            "tag_name": r.name,
+            "income": str(income),
+            "expense": str(expense),
+            "total": str(income - expense),
+            "count": r.count + (c.count if c else 0),
         })
-    return result
\ No newline at end of file
+    return result
+
+
+Granularity = Literal["day", "week", "month", "year"]
+
+# strftime (SQLite) / DATE_FORMAT (MySQL) patterns used to bucket transaction dates into periods;
+# weeks are ISO 8601 ("2025-W01"), see _iso_week_sqlite
+_PERIOD_FORMATS = {
+    "day": ("%Y-%m-%d", "%Y-%m-%d"),
+    "week": (None, "%x-W%v"),
+    "month": ("%Y-%m", "%Y-%m"),
+    "year": ("%Y", "%Y"),
+}
+
+
+def _iso_week_sqlite(column):
+    """ISO week label in SQLite, which only has %G/%V from 3.46: the week's Thursday gives year and number."""
+    thursday = func.date(column, "-3 days", "weekday 4")
+    week = (cast(func.strftime("%j", thursday), Integer) + 6) // 7
+    return func.printf("%s-W%02d", func.strftime("%Y", thursday), week)
+
+
+def _period_expr(db: Session, column, granularity: str):
+    """SQL expression rendering a datetime column as a sortable period label."""
+    sqlite_fmt, mysql_fmt = _PERIOD_FORMATS[granularity]
+    if db.get_bind().dialect.name == "sqlite":
+        return _iso_week_sqlite(column) if granularity == "week" else func.strftime(sqlite_fmt, column)
+    return func.date_format(column, mysql_fmt)
+
+
+def _signed_amount(src):
+    return case((src.c.type == models.TxType.income, src.c.amount_cents), else_=-src.c.amount_cents)
+
+
+@router.get("/running-balance")
+def running_balance(
+    date_from: Optional[datetime] = Query(None, alias="from"),
+    date_to: Optional[datetime] = Query(None, alias="to"),
+    granularity: Granularity = "month",
+    db: Session = Depends(get_user_db),
+    current_user=Depends(get_current_user),
+):
+    """Cumulative balance per period, computed in the database with a window function.
+
+    The opening balance (everything before ``from``) is one aggregate; the series is a grouped
+    query with ``SUM() OVER`` on top, so the payload only contains one entry per non-empty period.
+    Archived rows are only read when ``from`` reaches before the archive boundary; otherwise the
+    archived part of the opening balance comes from the monthly summaries.
+    """
+    include_archive = archive.reaches_archive(archive.archived_before(db, current_user.id), date_from)
+    src = archive.transactions_source(current_user.id, include_archive)
+    signed = _signed_amount(src)
+    opening = 0
+    if date_from is not None:
+        opening_cents = db.scalar(select(func.coalesce(func.sum(signed), 0)).where(src.c.date < date_from))
+        if not include_archive:
+            opening_cents += db.scalar(select(
+                _archived_sum(models.TransactionSummary.income_cents, current_user.id)
+                - _archived_sum(models.TransactionSummary.expense_cents, current_user.id)
+            ))
+        opening = from_cents(opening_cents) or 0
+
+    period = _period_expr(db, src.c.date, granularity)
+    per_period = select(period.label("period"), func.sum(signed).label("net"))
+    if date_from is not None:
+        per_period = per_period.where(src.c.date >= date_from)
+    if date_to is not None:
+        per_period = per_period.where(src.c.date <= date_to)
+    per_period = per_period.group_by(period).subquery()
+
+    stmt = select(
+        per_period.c.period,
+        per_period.c.net,
+        func.sum(per_period.c.net).over(order_by=per_period.c.period).label("cumulative"),
+    ).order_by(per_period.c.period)
+    rows = db.execute(stmt).all()
+    return {
+        "granularity": granularity,
+        "opening": str(opening),
+        "periods": [r.period for r in rows],
+        "net": [str(from_cents(r.net)) for r in rows],
+        "balance": [str(opening + from_cents(r.cumulative)) for r in rows],
+    }
+
+
+def _fill_periods(labels, granularity: str):
+    """Sorted period labels with gaps between the first and last one filled in."""
+    labels = sorted(labels)
+    if len(labels) < 2:
+        return labels
+    first, last = labels[0], labels[-1]
+    if granularity == "week":
+        week = datetime.strptime(first + "-1", "%G-W%V-%u").date()
+        out = []
+        while True:
+            year, number, _ = week.isocalendar()
+            label = f"{year:04d}-W{number:02d}"
+            if label > last:
+                return out
+            out.append(label)
+            week += timedelta(days=7)
+    if granularity == "year":
+        return [str(y) for y in range(int(first), int(last) + 1)]
+    if granularity == "month":
+        y, m = map(int, first.split("-"))
+        out = []
+        while f"{y:04d}-{m:02d}" <= last:
+            out.append(f"{y:04d}-{m:02d}")
+            y, m = (y + 1, 1) if m == 12 else (y, m + 1)
+        return out
+    day = datetime.strptime(first, "%Y-%m-%d").date()
+    end = datetime.strptime(last, "%Y-%m-%d").date()
+    out = []
+    while day <= end:
+        out.append(day.isoformat())
+        day += timedelta(days=1)
+    return out
+
+
+@router.get("/pivot")
+def pivot_report(
+    date_from: Optional[datetime] = Query(None, alias="from"),
+    date_to: Optional[datetime] = Query(None, alias="to"),
+    rows: Literal["category", "type"] = "category",
+    cols: Granularity = "month",
+    value: Literal["expense", "income", "net"] = "expense",
+    db: Session = Depends(get_user_db),
+    current_user=Depends(get_current_user),
+):
+    """Dense rows x periods matrix (e.g. category x month spending) with row and column totals.
+
+    One grouped query over transactions LEFT JOIN categories yields every non-empty cell, the
+    uncategorized bucket included; the matrix, gaps and totals are assembled in Python.
+    Archived rows are included only when ``from`` reaches before the archive boundary.
+    """
+    include_archive = archive.reaches_archive(archive.archived_before(db, current_user.id), date_from)
+    src = archive.transactions_source(current_user.id, include_archive)
+    if value == "net":
+        measure = _signed_amount(src)
+    else:
+        measure = case((src.c.type == models.TxType(value), src.c.amount_cents), else_=0)
+    period = _period_expr(db, src.c.date, cols).label("period")
+
+    if rows == "category":
+        row_cols = (src.c.category_id.label("row_key"), models.Category.name.label("row_label"))
+    else:
+        row_cols = (src.c.type.label("row_key"), src.c.type.label("row_label"))
+    stmt = (
+        select(*row_cols, period, func.sum(measure).label("amount"))
+        .select_from(src)
+        .outerjoin(models.Category, models.Category.id == src.c.category_id)
+    )
+    if date_from is not None:
+        stmt = stmt.where(src.c.date >= date_from)
+    if date_to is not None:
+        stmt = stmt.where(src.c.date <= date_to)
+    stmt = stmt.group_by(*row_cols, period)
+
+    cells = {}
+    row_labels = {}
+    periods = set()
+    for r in db.execute(stmt):
+        key = r.row_key.value if isinstance(r.row_key, models.TxType) else r.row_key
+        row_labels[key] = (r.row_label.value if isinstance(r.row_label, models.TxType) else r.row_label) or "(Brak kategorii)"
+        periods.add(r.period)
+        cells[(key, r.period)] = from_cents(r.amount) or Decimal(0)
+
+    columns = _fill_periods(periods, cols)
+    # Alphabetical rows, uncategorized bucket last
+    row_keys = sorted(row_labels, key=lambda k: (k is None, row_labels[k].lower()))
+    zero = Decimal(0)
+    matrix = [[cells.get((k, c), zero) for c in columns] for k in row_keys]
+    col_totals = [sum((row[i] for row in matrix), zero) for i in range(len(columns))]
+    return {
+        "rows": rows,
+        "cols": cols,
+        "value": value,
+        "row_keys": row_keys,
+        "row_labels": [row_labels[k] for k in row_keys],
+        "columns": columns,
+        "values": [[str(v) for v in row] for row in matrix],
+        "row_totals": [str(sum(row, zero)) for row in matrix],
+        "col_totals": [str(v) for v in col_totals],
+        "total": str(sum(col_totals, zero)),
+    }
@@ -0,0 +1,135 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from sqlalchemy import select
+from typing import List
+
+from .. import models
+from ..schemas import RuleCreate, RuleUpdate, RuleOut
+from ..deps import get_current_user, get_user_db
+from ..categorize import matchers, rule_regex, InvalidRule
+from ..core.events import hub, RESYNC
+from .budgets import track_spend_many
+from .sync import next_seq
+
+router = APIRouter(prefix="/rules", tags=["rules"])
+
+
+def _validate(db: Session, user_id: int, rule: models.CategoryRule) -> None:
+    cat = db.get(models.Category, rule.category_id)
+    if not cat or cat.user_id != user_id:
+        raise HTTPException(status_code=400, detail="Category does not exist")
+    if not rule.pattern and rule.type is None and rule.min_amount_cents is None and rule.max_amount_cents is None:
+        raise HTTPException(status_code=400, detail="Rule needs a pattern, a type or an amount range")
+    if (
+        rule.min_amount_cents is not None and rule.max_amount_cents is not None
+        and rule.min_amount_cents > rule.max_amount_cents
+    ):
+        raise HTTPException(status_code=400, detail="min_amount must not exceed max_amount")
+    try:
+        rule_regex(rule.kind, rule.pattern)
+    except InvalidRule as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _get_rule(db: Session, user_id: int, rule_id: int) -> models.CategoryRule:
+    rule = db.get(models.CategoryRule, rule_id)
+    if not rule or rule.user_id != user_id:
+        raise HTTPException(status_code=404, detail="Rule not found")
+    return rule
+
+
+@router.get("", response_model=List[RuleOut])
+def list_rules(db: Session = Depends(get_user_db), current_user=Depends(get_current_user)):
+    return db.scalars(
+        select(models.CategoryRule)
+        .where(models.CategoryRule.user_id == current_user.id)
+        .order_by(models.CategoryRule.priority, models.CategoryRule.id)
+    ).all()
+
+
+@router.post("", response_model=RuleOut, status_code=201)
+def create_rule(payload: RuleCreate, db: Session = Depends(get_user_db), current_user=Depends(get_current_user)):
+    rule = models.CategoryRule(
+        user_id=current_user.id,
+        category_id=payload.category_id,
+        kind=payload.kind,
+        pattern=payload.pattern,
+        type=models.TxType(payload.type) if payload.type is not None else None,
+        min_amount=payload.min_amount,
+        max_amount=payload.max_amount,
+        priority=payload.priority,
+    )
+    _validate(db, current_user.id, rule)
+    rule.seq = next_seq(db, current_user.id)
+    db.add(rule)
+    db.commit()
+    db.refresh(rule)
+    return rule
+
+
+@router.put("/{rule_id}", response_model=RuleOut)
+def update_rule(rule_id: int, payload: RuleUpdate, db: Session = Depends(get_user_db), current_user=Depends(get_current_user)):
+    rule = _get_rule(db, current_user.id, rule_id)
+    fields = payload.model_dump(exclude_unset=True)
+    for name, value in fields.items():
+        if name == "type":
+            value = models.TxType(value) if value is not None else None
+        setattr(rule, name, value)
+    _validate(db, current_user.id, rule)
+    rule.seq = next_seq(db, current_user.id)
+    db.commit()
+    db.refresh(rule)
+    return rule
+
+
+@router.delete("/{rule_id}", status_code=204)
+def delete_rule(rule_id: int, db: Session = Depends(get_user_db), current_user=Depends(get_current_user)):
+    rule = _get_rule(db, current_user.id, rule_id)
+    db.delete(rule)
+    db.commit()
+    return None
+
+
+@router.post("/apply")
+def apply_rules(
+    batch_size: int = Query(1000, ge=1, le=10000),
+    db: Session = Depends(get_user_db),
+    current_user=Depends(get_current_user),
+):
+    """Run the rules over the user's uncategorized transactions, committing batch by batch.
+
+    Short transactions keep the write lock free for other requests; already processed rows are
+    skipped by id, so an interrupted run can simply be repeated.
+    """
+    matcher = matchers.get(db, current_user.id)
+    scanned = categorized = batches = 0
+    last_id = 0
+    while matcher.rules:
+        txs = db.scalars(
+            select(models.Transaction)
+            .where(models.Transaction.user_id == current_user.id)
+            .where(models.Transaction.category_id.is_(None))
+            .where(models.Transaction.id > last_id)
+            .order_by(models.Transaction.id)
+            .limit(batch_size)
+        ).all()
+        if not txs:
+            break
+        last_id = txs[-1].id
+        scanned += len(txs)
+        batches += 1
+        matched = []
+        for tx in txs:
+            tx.category_id = matcher.categorize(tx.description, tx.amount_cents, tx.type)
+            if tx.category_id is not None:
+                matched.append(tx)
+        if matched:
+            seq = next_seq(db, current_user.id)
+            for tx in matched:
+                tx.seq = seq
+            track_spend_many(db, matched)
+            categorized += len(matched)
+        db.commit()
+    if categorized:
+        hub.publish(current_user.id, RESYNC)
+    return {"scanned": scanned, "categorized": categorized, "batches": batches}
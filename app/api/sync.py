@@ -0,0 +1,83 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import select, update, insert, literal
+from .. import models
+from ..schemas import SyncOut
+from ..deps import get_current_user, get_user_db
+
+router = APIRouter(prefix="/sync", tags=["sync"])
+
+
+def next_seq(db: Session, user_id: int) -> int:
+    """Allocate the user's next change sequence number.
+
+    The counter row stays write-locked until the caller commits, so sequence numbers are handed out
+    in commit order. Call once per request and stamp every row the request writes with the result.
+    """
+    res = db.execute(
+        update(models.ChangeCounter)
+        .where(models.ChangeCounter.user_id == user_id)
+        .values(seq=models.ChangeCounter.seq + 1)
+        .execution_options(synchronize_session=False)
+    )
+    if res.rowcount == 0:
+        db.add(models.ChangeCounter(user_id=user_id, seq=1))
+        db.flush()
+        return 1
+    return db.scalar(select(models.ChangeCounter.seq).where(models.ChangeCounter.user_id == user_id))
+
+
+def current_seq(db: Session, user_id: int) -> int:
+    return db.scalar(select(models.ChangeCounter.seq).where(models.ChangeCounter.user_id == user_id)) or 0
+
+
+def add_tombstones(db: Session, user_id: int, entity: str, id_query, seq: int) -> None:
+    """Insert tombstones for every id returned by ``id_query`` (a single-column select), server side."""
+    db.execute(
+        insert(models.Tombstone).from_select(
+            ["user_id", "entity", "entity_id", "seq"],
+            select(literal(user_id), literal(entity), id_query.subquery().c[0], literal(seq)),
+        )
+    )
+
+
+@router.get("", response_model=SyncOut)
+def sync_changes(
+    since: int = Query(0, ge=0, description="seq returned by the previous sync; 0 for a full sync"),
+    db: Session = Depends(get_user_db),
+    current_user=Depends(get_current_user),
+):
+    """Rows created or changed after ``since`` plus ids deleted after it, with the new high-water mark."""
+    seq = current_seq(db, current_user.id)
+    cat_stmt = select(models.Category).where(models.Category.user_id == current_user.id)
+    tx_stmt = (
+        select(models.Transaction)
+        .where(models.Transaction.user_id == current_user.id)
+        .options(selectinload(models.Transaction.tag_objects))
+    )
+    deleted = {"categories": [], "transactions": []}
+    archived = []
+    if not since:
+        # Archived rows never change, so only a full sync needs them; they keep their original ids
+        archived = db.scalars(
+            select(models.ArchivedTransaction)
+            .where(models.ArchivedTransaction.user_id == current_user.id)
+            .options(selectinload(models.ArchivedTransaction.tag_objects))
+            .order_by(models.ArchivedTransaction.id)
+        ).all()
+    else:
+        cat_stmt = cat_stmt.where(models.Category.seq > since)
+        tx_stmt = tx_stmt.where(models.Transaction.seq > since)
+        tombstones = db.execute(
+            select(models.Tombstone.entity, models.Tombstone.entity_id)
+            .where(models.Tombstone.user_id == current_user.id)
+            .where(models.Tombstone.seq > since)
+        )
+        for entity, entity_id in tombstones:
+            deleted["categories" if entity == "category" else "transactions"].append(entity_id)
+    return {
+        "seq": seq,
+        "categories": db.scalars(cat_stmt.order_by(models.Category.seq)).all(),
+        "transactions": [*archived, *db.scalars(tx_stmt.order_by(models.Transaction.seq)).all()],
+        "deleted": deleted,
+    }
@@ -0,0 +1,47 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from sqlalchemy import select, func, update
+from typing import List
+
+from .. import models
+from ..schemas import TagOut
+from ..deps import get_current_user, get_user_db
+from .sync import next_seq
+from ..core.events import hub, RESYNC
+
+router = APIRouter(prefix="/tags", tags=["tags"])
+
+
+@router.get("", response_model=List[TagOut])
+def list_tags(db: Session = Depends(get_user_db), current_user=Depends(get_current_user)):
+    """The user's tags with the number of tagged transactions (archived ones included)."""
+    rows = db.execute(
+        select(models.Tag.id, models.Tag.name, func.count(models.TransactionTag.transaction_id).label("count"))
+        .join(models.TransactionTag, models.TransactionTag.tag_id == models.Tag.id, isouter=True)
+        .where(models.Tag.user_id == current_user.id)
+        .group_by(models.Tag.id, models.Tag.name)
+        .order_by(models.Tag.name)
+    ).mappings()
+    return list(rows)
+
+
+@router.delete("/{tag_id}", status_code=204)
+def delete_tag(tag_id: int, db: Session = Depends(get_user_db), current_user=Depends(get_current_user)):
+    """Remove a tag from every transaction and delete it."""
+    tag = db.get(models.Tag, tag_id)
+    if not tag or tag.user_id != current_user.id:
+        raise HTTPException(status_code=404, detail="Tag not found")
+    tagged = select(models.TransactionTag.transaction_id).where(models.TransactionTag.tag_id == tag_id)
+    # Untagged transactions changed; let delta sync pick them up
+    db.execute(
+        update(models.Transaction)
+        .where(models.Transaction.user_id == current_user.id)
+        .where(models.Transaction.id.in_(tagged))
+        .values(seq=next_seq(db, current_user.id))
+        .execution_options(synchronize_session=False)
+    )
+    db.query(models.TransactionTag).filter(models.TransactionTag.tag_id == tag_id).delete()
+    db.delete(tag)
+    db.commit()
+    hub.publish(current_user.id, RESYNC)
+    return None
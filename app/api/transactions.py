@@ -1,87 +1,264 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import select
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import select, insert, literal
 from datetime import datetime
-from typing import List, Optional
-from ..database import get_db
+from decimal import Decimal
+from typing import List, Literal, Optional
 from .. import models
-from ..schemas import TransactionCreate, TransactionUpdate, TransactionOut
-from ..deps import get_current_user
+from ..schemas import TransactionCreate, TransactionBulkCreate, TransactionUpdate, TransactionOut, TransactionCreatedOut
+from ..deps import get_current_user, get_user_db
+from .budgets import track_spend, track_spend_many, remaining_budget
+from .sync import next_seq, add_tombstones
+from ..core.events import hub, RESYNC
+from ..categorize import matchers
+from .. import archive, columnar, duplicates, tags as tagging
+from ..core.money import from_cents, to_cents
 
 router = APIRouter(prefix="/transactions", tags=["transactions"])
 
+FORMAT_QUERY = Query(None, description="columnar: one array per field (also sent for Accept: application/x-msgpack)")
+
+
+def _balance_delta(*changes) -> dict:
+    """Net change of the balance totals for (type, amount, sign) contributions, as strings."""
+    totals = {models.TxType.income: Decimal(0), models.TxType.expense: Decimal(0)}
+    for tx_type, amount, sign in changes:
+        totals[models.TxType(tx_type)] += Decimal(amount) * sign
+    return {"income": str(totals[models.TxType.income]), "expense": str(totals[models.TxType.expense])}
+
+
+def _publish(user_id: int, kind: str, tx: models.Transaction, delta: dict) -> None:
+    hub.publish(user_id, {
+        "type": f"transaction.{kind}",
+        "seq": tx.seq,
+        "transaction": TransactionOut.model_validate(tx).model_dump(mode="json"),
+        "balance_delta": delta,
+    })
+
 @router.get("", response_model=List[TransactionOut])
 def list_transactions(
-    db: Session = Depends(get_db),
+    request: Request,
+    db: Session = Depends(get_user_db),
     type: Optional[models.TxType] = Query(None, description="income or expense"),
     category_id: Optional[int] = None,
     date_from: Optional[datetime] = None,
     date_to: Optional[datetime] = None,
     q: Optional[str] = Query(None, description="search in description"),
+    tags: Optional[str] = Query(None, description="comma-separated tag names"),
+    tag_match: Literal["any", "all"] = Query("any", description="transactions with any or with all of the tags"),
     skip: int = 0,
     limit: int = 100,
+    format: Optional[Literal["columnar"]] = FORMAT_QUERY,
     current_user=Depends(get_current_user),
 ):
-    stmt = select(models.Transaction).where(models.Transaction.user_id == current_user.id)
-    if type is not None:
-        stmt = stmt.where(models.Transaction.type == type)
-    if category_id is not None:
-        stmt = stmt.where(models.Transaction.category_id == category_id)
-    if date_from is not None:
-        stmt = stmt.where(models.Transaction.date >= date_from)
-    if date_to is not None:
-        stmt = stmt.where(models.Transaction.date <= date_to)
-    if q:
-        like = f"%{q.replace('%','').replace('_',' ')}%"
-        stmt = stmt.where(models.Transaction.description.ilike(like))
-
-    stmt = stmt.order_by(models.Transaction.date.desc()).offset(skip).limit(limit)
-    txs = db.scalars(stmt).all()
-    return txs
-
-
-@router.post("", response_model=TransactionOut, status_code=201)
-def create_transaction(payload: TransactionCreate, db: Session = Depends(get_db), current_user=Depends(get_current_user)):
+    fmt = columnar.negotiate(request, format)
+    tag_names = tagging.parse_tags(tags)
+    tag_ids = tagging.tag_ids(db, current_user.id, tag_names)
+
+    def conditions(model):
+        conds = []
+        if type is not None:
+            conds.append(model.type == type)
+        if category_id is not None:
+            conds.append(model.category_id == category_id)
+        if date_from is not None:
+            conds.append(model.date >= date_from)
+        if date_to is not None:
+            conds.append(model.date <= date_to)
+        if q:
+            like = f"%{q.replace('%','').replace('_',' ')}%"
+            conds.append(model.description.ilike(like))
+        conds += tagging.filter_conditions(model, tag_names, tag_ids, tag_match)
+        return conds
+
+    txs = archive.list_transactions(db, current_user.id, conditions, date_from, skip, limit)
+    return columnar.response(txs, fmt) if fmt else txs
+
+
+OnDuplicate = Literal["allow", "skip"]
+
+
+@router.post("", response_model=TransactionCreatedOut, status_code=201)
+def create_transaction(
+    payload: TransactionCreate,
+    on_duplicate: OnDuplicate = Query("allow", description="skip: answer 409 instead of storing a duplicate"),
+    db: Session = Depends(get_user_db),
+    current_user=Depends(get_current_user),
+):
+    fingerprint = duplicates.fingerprint(payload.date, payload.type, to_cents(payload.amount), payload.description)
+    duplicate_of = duplicates.first_match(db, current_user.id, fingerprint)
+    if duplicate_of is not None and on_duplicate == "skip":
+        raise HTTPException(status_code=409, detail={"message": "Duplicate transaction", "duplicate_of": duplicate_of})
     # Validate category if provided and belongs to current user
     if payload.category_id is not None:
         cat = db.get(models.Category, payload.category_id)
         if not cat or cat.user_id != current_user.id:
             raise HTTPException(status_code=400, detail="Category does not exist")
+        category_id = payload.category_id
+    else:
+        category_id = matchers.get(db, current_user.id).categorize(payload.description, to_cents(payload.amount), payload.type)
 
     tx = models.Transaction(
-        category_id=payload.category_id,
+        category_id=category_id,
         user_id=current_user.id,
         type=models.TxType(payload.type),
         amount=payload.amount,
         description=payload.description,
         date=payload.date,
         is_planned=payload.is_planned,
+        seq=next_seq(db, current_user.id),
+        fingerprint=fingerprint,
     )
     db.add(tx)
+    track_spend(db, tx)
+    if payload.tags:
+        db.flush()
+        tagging.set_tags(db, current_user.id, {tx.id: payload.tags})
     db.commit()
     db.refresh(tx)
-    return tx
+    out = TransactionCreatedOut.model_validate(tx)
+    out.budget_remaining = remaining_budget(db, tx)
+    out.duplicate_of = duplicate_of
+    _publish(current_user.id, "created", tx, _balance_delta((tx.type, tx.amount, 1)))
+    return out
+
+
+@router.post("/bulk", status_code=201)
+def create_transactions_bulk(
+    payload: TransactionBulkCreate,
+    on_duplicate: OnDuplicate = Query("allow", description="skip: leave out rows that are already stored"),
+    db: Session = Depends(get_user_db),
+    current_user=Depends(get_current_user),
+):
+    """Insert many transactions in one database transaction; uncategorized ones go through the rules.
+
+    ``duplicates`` lists the positions of rows matching already stored transactions.
+    """
+    wanted = {p.category_id for p in payload.transactions if p.category_id is not None}
+    if wanted:
+        owned = set(db.scalars(
+            select(models.Category.id)
+            .where(models.Category.user_id == current_user.id)
+            .where(models.Category.id.in_(wanted))
+        ))
+        if wanted - owned:
+            raise HTTPException(status_code=400, detail="Category does not exist")
+
+    fingerprints = [
+        duplicates.fingerprint(p.date, p.type, to_cents(p.amount), p.description) for p in payload.transactions
+    ]
+    fresh = duplicates.new_rows(db, current_user.id, fingerprints)
+    matcher = matchers.get(db, current_user.id)
+    seq = next_seq(db, current_user.id)
+    txs = []
+    tags = {}
+    categorized = 0
+    for p, fingerprint, is_new in zip(payload.transactions, fingerprints, fresh):
+        if not is_new and on_duplicate == "skip":
+            continue
+        category_id = p.category_id
+        if category_id is None:
+            category_id = matcher.categorize(p.description, to_cents(p.amount), p.type)
+            categorized += category_id is not None
+        txs.append(models.Transaction(
+            category_id=category_id,
+            user_id=current_user.id,
+            type=models.TxType(p.type),
+            amount=p.amount,
+            description=p.description,
+            date=p.date,
+            is_planned=p.is_planned,
+            seq=seq,
+            fingerprint=fingerprint,
+        ))
+        if p.tags:
+            tags[len(txs) - 1] = p.tags
+    if txs:
+        # One executemany; the request's seq then identifies the new rows, in insertion order
+        columns = [c.key for c in models.Transaction.__table__.columns if c.key != "id"]
+        db.execute(insert(models.Transaction), [{c: getattr(tx, c) for c in columns} for tx in txs])
+        ids = db.scalars(
+            select(models.Transaction.id)
+            .where(models.Transaction.user_id == current_user.id)
+            .where(models.Transaction.seq == seq)
+            .order_by(models.Transaction.id)
+        ).all()
+        for tx, tx_id in zip(txs, ids):
+            tx.id = tx_id
+    track_spend_many(db, txs)
+    tagging.set_tags(db, current_user.id, {txs[i].id: names for i, names in tags.items()})
+    db.commit()
+    # One resync instead of an event per row
+    if txs:
+        hub.publish(current_user.id, RESYNC)
+    return {
+        "created": len(txs),
+        "categorized": categorized,
+        "duplicates": [i for i, is_new in enumerate(fresh) if not is_new],
+    }
+
+
+@router.get("/duplicates")
+def list_duplicates(db: Session = Depends(get_user_db), current_user=Depends(get_current_user)):
+    """Groups of stored transactions with the same day, type, amount and normalized description."""
+    return duplicates.find_duplicates(db, current_user.id)
+
+
+@router.get("/export", response_model=List[TransactionOut])
+def export_transactions(
+    request: Request,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    format: Optional[Literal["columnar"]] = FORMAT_QUERY,
+    db: Session = Depends(get_user_db),
+    current_user=Depends(get_current_user),
+):
+    """All transactions in the range, archive included, oldest first."""
+    fmt = columnar.negotiate(request, format)
+
+    def conditions(model):
+        conds = []
+        if date_from is not None:
+            conds.append(model.date >= date_from)
+        if date_to is not None:
+            conds.append(model.date <= date_to)
+        return conds
+
+    cutoff = archive.archived_before(db, current_user.id)
+    src = archive.transactions_source(current_user.id, archive.reaches_archive(cutoff, date_from), conditions)
+    rows = db.execute(select(src).order_by(src.c.date, src.c.id)).mappings().all()
+    tags = tagging.user_tags_by_transaction(db, current_user.id)
+    rows = [{**r, "tags": tags.get(r["id"], [])} for r in rows]
+    if fmt:
+        return columnar.response(rows, fmt)
+    return [{**r, "amount": from_cents(r["amount_cents"])} for r in rows]
 
 
 @router.get("/{tx_id}", response_model=TransactionOut)
-def get_transaction(tx_id: int, db: Session = Depends(get_db), current_user=Depends(get_current_user)):
-    tx = db.get(models.Transaction, tx_id)
+def get_transaction(tx_id: int, db: Session = Depends(get_user_db), current_user=Depends(get_current_user)):
+    tx = (
+        db.get(models.Transaction, tx_id, options=[joinedload(models.Transaction.tag_objects)])
+        or db.get(models.ArchivedTransaction, tx_id, options=[joinedload(models.ArchivedTransaction.tag_objects)])
+    )
     if not tx or tx.user_id != current_user.id:
         raise HTTPException(status_code=404, detail="Transaction not found")
     return tx
 
 
 @router.put("/{tx_id}", response_model=TransactionOut)
-def update_transaction(tx_id: int, payload: TransactionUpdate, db: Session = Depends(get_db), current_user=Depends(get_current_user)):
-    tx = db.get(models.Transaction, tx_id)
+def update_transaction(tx_id: int, payload: TransactionUpdate, db: Session = Depends(get_user_db), current_user=Depends(get_current_user)):
+    tx = db.get(models.Transaction, tx_id) or archive.restore(db, current_user.id, tx_id)
     if not tx or tx.user_id != current_user.id:
         raise HTTPException(status_code=404, detail="Transaction not found")
 
+    if payload.category_id:
+        cat = db.get(models.Category, payload.category_id)
+        if not cat or cat.user_id != current_user.id:
+            raise HTTPException(status_code=400, detail="Category does not exist")
+
+    track_spend(db, tx, -1)
+    before = (tx.type, tx.amount, -1)
     if payload.category_id is not None:
-        if payload.category_id:
-            cat = db.get(models.Category, payload.category_id)
-            if not cat or cat.user_id != current_user.id:
-                raise HTTPException(status_code=400, detail="Category does not exist")
         tx.category_id = payload.category_id
 
     if payload.type is not None:
@@ -94,18 +271,30 @@ def update_transaction(tx_id: int, payload: TransactionUpdate, db: Session = Dep
         tx.date = payload.date
     if payload.is_planned is not None:
         tx.is_planned = payload.is_planned
+    if payload.tags is not None:
+        tagging.set_tags(db, current_user.id, {tx.id: payload.tags})
+    tx.fingerprint = duplicates.fingerprint_of(tx)
+    tx.seq = next_seq(db, current_user.id)
 
+    track_spend(db, tx)
     db.add(tx)
     db.commit()
     db.refresh(tx)
+    _publish(current_user.id, "updated", tx, _balance_delta(before, (tx.type, tx.amount, 1)))
     return tx
 
 
 @router.delete("/{tx_id}", status_code=204)
-def delete_transaction(tx_id: int, db: Session = Depends(get_db), current_user=Depends(get_current_user)):
-    tx = db.get(models.Transaction, tx_id)
+def delete_transaction(tx_id: int, db: Session = Depends(get_user_db), current_user=Depends(get_current_user)):
+    tx = db.get(models.Transaction, tx_id) or archive.restore(db, current_user.id, tx_id)
     if not tx or tx.user_id != current_user.id:
         raise HTTPException(status_code=404, detail="Transaction not found")
+    track_spend(db, tx, -1)
+    seq = next_seq(db, current_user.id)
+    add_tombstones(db, current_user.id, "transaction", select(literal(tx_id)), seq)
+    delta = _balance_delta((tx.type, tx.amount, -1))
+    db.query(models.TransactionTag).filter(models.TransactionTag.transaction_id == tx_id).delete()
     db.delete(tx)
     db.commit()
+    hub.publish(current_user.id, {"type": "transaction.deleted", "seq": seq, "id": tx_id, "balance_delta": delta})
     return None
\ No newline at end of file
@@ -0,0 +1,210 @@
+"""Hot/cold archival of old transactions.
+
+Transactions dated before a horizon (``ARCHIVE_AFTER_DAYS``, rounded down to a month start) move
+from ``transactions`` to ``transactions_archive`` and leave per-(category, month) totals in
+``transaction_summaries``. All-time reports add the summaries instead of scanning archived rows;
+listings and range reports read the archive only when the requested range starts before the
+user's ``archive_state.archived_before``. Run periodically::
+
+    python -m app.archive [--days N]
+"""
+import sys
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Optional
+
+from sqlalchemy import select, insert, delete, func, case, extract, union_all
+from sqlalchemy.orm import Session, joinedload
+
+from . import models
+from .tags import tags_by_transaction
+from .core.config import settings
+from .core.money import from_cents
+
+# Columns shared by the hot and the archive table
+COLUMNS = ("id", "user_id", "category_id", "type", "amount_cents", "description", "date", "is_planned", "fingerprint")
+
+
+def _naive_utc(value: datetime) -> datetime:
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def archived_before(db: Session, user_id: int) -> Optional[datetime]:
+    return db.scalar(select(models.ArchiveState.archived_before).where(models.ArchiveState.user_id == user_id))
+
+
+def reaches_archive(cutoff: Optional[datetime], date_from: Optional[datetime]) -> bool:
+    """Whether a range starting at ``date_from`` (None = unbounded) can contain archived rows."""
+    return cutoff is not None and (date_from is None or _naive_utc(date_from) < cutoff)
+
+
+def transactions_source(
+    user_id: Optional[int],
+    include_archive: bool,
+    where: Optional[Callable] = None,
+):
+    """Selectable over the user's transactions, UNION ALL the archive when ``include_archive``.
+
+    ``where(model)`` returns extra conditions and is applied to each branch, so filters reach the
+    indexes of both tables. Columns are ``COLUMNS``.
+    """
+    def branch(model):
+        conds = [] if user_id is None else [model.user_id == user_id]
+        conds += where(model) if where else []
+        return select(*(getattr(model, c) for c in COLUMNS)).where(*conds)
+
+    if not include_archive:
+        return branch(models.Transaction).subquery("hot_transactions")
+    return union_all(branch(models.Transaction), branch(models.ArchivedTransaction)).subquery("all_transactions")
+
+
+def list_transactions(
+    db: Session,
+    user_id: int,
+    where: Callable,
+    date_from: Optional[datetime] = None,
+    skip: int = 0,
+    limit: int = 100,
+) -> list:
+    """Newest-first page of transactions matching ``where(model)``, archive included when needed.
+
+    Archived rows are all older than the boundary, so the archive is skipped when the range cannot
+    reach it or when a full page of hot rows already ends at or after the boundary. Hot rows come
+    back as models (tags preloaded), archived pages as dicts shaped like ``TransactionOut``.
+    """
+    txs = db.scalars(
+        select(models.Transaction)
+        .where(models.Transaction.user_id == user_id)
+        .where(*where(models.Transaction))
+        .order_by(models.Transaction.date.desc())
+        .offset(skip)
+        .limit(limit)
+        .options(joinedload(models.Transaction.tag_objects))
+    ).unique().all()
+    cutoff = archived_before(db, user_id)
+    if not reaches_archive(cutoff, date_from) or (len(txs) == limit and (not txs or txs[-1].date >= cutoff)):
+        return txs
+    src = transactions_source(user_id, True, where)
+    rows = db.execute(select(src).order_by(src.c.date.desc()).offset(skip).limit(limit)).mappings().all()
+    tags = tags_by_transaction(db, (r["id"] for r in rows))
+    return [{**r, "amount": from_cents(r["amount_cents"]), "tags": tags.get(r["id"], [])} for r in rows]
+
+
+def month_start(value: datetime) -> datetime:
+    return datetime(value.year, value.month, 1)
+
+
+def _summary(db: Session, user_id: int, category_id: Optional[int], year: int, month: int):
+    return db.scalar(
+        select(models.TransactionSummary)
+        .where(models.TransactionSummary.user_id == user_id)
+        .where(
+            models.TransactionSummary.category_id.is_(None) if category_id is None
+            else models.TransactionSummary.category_id == category_id
+        )
+        .where(models.TransactionSummary.year == year)
+        .where(models.TransactionSummary.month == month)
+    )
+
+
+def restore(db: Session, user_id: int, tx_id: int) -> Optional[models.Transaction]:
+    """Move one archived transaction back to the hot table, so it can be edited or deleted.
+
+    Its amount leaves the monthly summary and the row keeps its id; the caller commits. Returns
+    None when the user has no archived transaction with that id.
+    """
+    row = db.get(models.ArchivedTransaction, tx_id)
+    if row is None or row.user_id != user_id:
+        return None
+    summary = _summary(db, user_id, row.category_id, row.date.year, row.date.month)
+    if summary is not None:
+        if models.TxType(row.type) == models.TxType.income:
+            summary.income_cents -= row.amount_cents
+        else:
+            summary.expense_cents -= row.amount_cents
+        summary.count -= 1
+        if summary.count <= 0:
+            db.delete(summary)
+    tx = models.Transaction(**{c: getattr(row, c) for c in COLUMNS})
+    db.delete(row)
+    db.add(tx)
+    db.flush()
+    return tx
+
+
+def archive_user(db: Session, user_id: int, cutoff: datetime) -> int:
+    """Move the user's transactions dated before ``cutoff`` to the archive; return how many moved.
+
+    One transaction: copy rows, fold them into the monthly summaries, delete them from the hot
+    table and advance the user's archive boundary.
+    """
+    tx = models.Transaction
+    old = (tx.user_id == user_id, tx.date < cutoff)
+    db.execute(insert(models.ArchivedTransaction).from_select(
+        list(COLUMNS), select(*(getattr(tx, c) for c in COLUMNS)).where(*old)
+    ))
+
+    year = extract("year", tx.date)
+    month = extract("month", tx.date)
+    groups = db.execute(
+        select(
+            tx.category_id,
+            year.label("year"),
+            month.label("month"),
+            func.sum(case((tx.type == models.TxType.income, tx.amount_cents), else_=0)).label("income"),
+            func.sum(case((tx.type == models.TxType.expense, tx.amount_cents), else_=0)).label("expense"),
+            func.count().label("count"),
+        ).where(*old).group_by(tx.category_id, year, month)
+    ).all()
+    for g in groups:
+        summary = _summary(db, user_id, g.category_id, int(g.year), int(g.month))
+        if summary is None:
+            summary = models.TransactionSummary(
+                user_id=user_id, category_id=g.category_id, year=int(g.year), month=int(g.month),
+                income_cents=0, expense_cents=0, count=0,
+            )
+            db.add(summary)
+        summary.income_cents += int(g.income or 0)
+        summary.expense_cents += int(g.expense or 0)
+        summary.count += int(g.count)
+
+    moved = db.execute(delete(tx).where(*old)).rowcount
+    state = db.get(models.ArchiveState, user_id)
+    if state is None:
+        db.add(models.ArchiveState(user_id=user_id, archived_before=cutoff))
+    elif state.archived_before < cutoff:
+        state.archived_before = cutoff
+    db.commit()
+    return moved
+
+
+def archive_database(db: Session, horizon_days: Optional[int] = None, now: Optional[datetime] = None) -> dict:
+    """Archive every user's transactions older than the horizon in one database (shard)."""
+    days = settings.archive_after_days if horizon_days is None else horizon_days
+    now = _naive_utc(now or datetime.now(timezone.utc))
+    cutoff = month_start(now - timedelta(days=days))
+    user_ids = db.scalars(
+        select(models.Transaction.user_id).where(models.Transaction.date < cutoff).distinct()
+    ).all()
+    moved = {user_id: archive_user(db, user_id, cutoff) for user_id in user_ids if user_id is not None}
+    return {"cutoff": cutoff.isoformat(), "users": len(moved), "transactions": sum(moved.values())}
+
+
+def main(argv=None) -> int:
+    from .shards import shard_router
+
+    args = list(sys.argv[1:] if argv is None else argv)
+    days = int(args[1]) if len(args) == 2 and args[0] == "--days" else None
+    if args and days is None:
+        print(__doc__)
+        return 2
+    shard_router.create_schema()
+    for name in shard_router.engines:
+        with shard_router.session(name) as db:
+            print(name, archive_database(db, days))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+"""Static frontend served from memory: precompressed variants, content-hashed URLs and ETags."""
+import gzip
+import hashlib
+import mimetypes
+import re
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import Response
+
+from .core.negotiation import accepted
+
+try:
+    import brotli  # type: ignore
+except Exception:  # brotli is optional; gzip is always available
+    brotli = None  # type: ignore
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+# Encodings in order of preference when the client accepts several
+_PREFERRED_ENCODINGS = ("br", "gzip")
+
+
+class Asset:
+    def __init__(self, body: bytes, media_type: str):
+        self.media_type = media_type
+        digest = hashlib.sha256(body).hexdigest()
+        self.hash = digest[:12]
+        self.etag = f'"{digest[:32]}"'
+        self.variants: Dict[str, bytes] = {"identity": body}
+        gz = gzip.compress(body, compresslevel=9, mtime=0)
+        if len(gz) < len(body):
+            self.variants["gzip"] = gz
+        if brotli is not None:
+            br = brotli.compress(body, quality=11)
+            if len(br) < len(body):
+                self.variants["br"] = br
+
+    def pick(self, accept_encoding: str) -> Tuple[str, bytes]:
+        tokens = accepted(accept_encoding)
+        for enc in _PREFERRED_ENCODINGS:
+            if enc in self.variants and (enc in tokens or "*" in tokens):
+                return enc, self.variants[enc]
+        return "identity", self.variants["identity"]
+
+    def response(self, request: Request, cache_control: str) -> Response:
+        headers = {"ETag": self.etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+        inm = request.headers.get("if-none-match")
+        if inm and (inm.strip() == "*" or self.etag in [t.strip() for t in inm.split(",")]):
+            return Response(status_code=304, headers=headers)
+        encoding, body = self.pick(request.headers.get("accept-encoding", ""))
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        return Response(content=body, media_type=self.media_type, headers=headers)
+
+
+class AssetStore:
+    """Loads every file of the static directory once and keeps compressed variants in memory.
+
+    Non-HTML files are also reachable under a content-hashed name (``main.<hash>.js``) that can be
+    cached forever; HTML pages are rewritten to reference those names. With ``watch=True`` files
+    are reloaded when their mtime changes, so editing the frontend during development still works.
+    """
+
+    def __init__(self, directory: Path, watch: bool = False):
+        self.directory = directory
+        self.watch = watch
+        self._mtimes: Dict[str, float] = {}
+        self.assets: Dict[str, Asset] = {}
+        self.hashed: Dict[str, str] = {}
+        self._load()
+
+    def _snapshot_mtimes(self) -> Dict[str, float]:
+        return {p.name: p.stat().st_mtime for p in self.directory.iterdir() if p.is_file()}
+
+    def _load(self) -> None:
+        self._mtimes = self._snapshot_mtimes()
+        assets: Dict[str, Asset] = {}
+        hashed: Dict[str, str] = {}
+        pages = []
+        for name in sorted(self._mtimes):
+            path = self.directory / name
+            media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+            if media_type == "text/html":
+                pages.append((name, path.read_text(encoding="utf-8")))
+                continue
+            asset = Asset(path.read_bytes(), media_type)
+            assets[name] = asset
+            stem, dot, ext = name.rpartition(".")
+            hashed_name = f"{stem}.{asset.hash}.{ext}" if dot else f"{name}.{asset.hash}"
+            hashed[hashed_name] = name
+
+        urls = {name: f"/static/{hashed_name}" for hashed_name, name in hashed.items()}
+        if urls:
+            pattern = re.compile("/static/(" + "|".join(re.escape(n) for n in urls) + r")(?=[\"'])")
+        for name, html in pages:
+            if urls:
+                html = pattern.sub(lambda m: urls[m.group(1)], html)
+            assets[name] = Asset(html.encode("utf-8"), "text/html; charset=utf-8")
+
+        self.assets = assets
+        self.hashed = hashed
+
+    def _refresh(self) -> None:
+        if self.watch and self._snapshot_mtimes() != self._mtimes:
+            self._load()
+
+    def lookup(self, name: str) -> Tuple[Optional[Asset], str]:
+        """Return the asset behind a /static name and the Cache-Control it should be served with."""
+        self._refresh()
+        if name in self.hashed:
+            return self.assets[self.hashed[name]], IMMUTABLE
+        return self.assets.get(name), REVALIDATE
@@ -0,0 +1,77 @@
+"""Consistency check for the per-(category, month) spend counters behind budgets.
+
+Transaction writes keep ``category_spend`` in step incrementally (see ``api/budgets.py``); this job
+recomputes the counters from the transactions and corrects any drift. The startup migration runs
+it once per database, which also fills the counters of a database upgraded from a version without
+them. Run periodically::
+
+    python -m app.budgets
+"""
+import sys
+from typing import Optional
+
+from sqlalchemy import select, func, extract
+from sqlalchemy.orm import Session
+
+from . import models, archive
+
+
+def reconcile_spend(db: Session, user_id: Optional[int] = None) -> dict:
+    """Recompute spend counters from transactions and correct any drift.
+
+    Runs one grouped aggregate over transactions, archived ones included (optionally for a single
+    user), and compares it with the stored counters. Meant to be run periodically as a consistency
+    check job.
+    """
+    src = archive.transactions_source(
+        user_id, True, lambda m: [m.category_id.is_not(None), m.type == models.TxType.expense]
+    )
+    year = extract("year", src.c.date)
+    month = extract("month", src.c.date)
+    actual_stmt = (
+        select(
+            src.c.user_id,
+            src.c.category_id,
+            year.label("year"),
+            month.label("month"),
+            func.sum(src.c.amount_cents).label("spent"),
+        )
+        .group_by(src.c.user_id, src.c.category_id, year, month)
+    )
+    counters_stmt = select(models.CategorySpend)
+    if user_id is not None:
+        counters_stmt = counters_stmt.where(models.CategorySpend.user_id == user_id)
+
+    actual = {
+        (r.user_id, r.category_id, int(r.year), int(r.month)): int(r.spent or 0)
+        for r in db.execute(actual_stmt)
+    }
+    corrected = 0
+    for counter in db.scalars(counters_stmt).all():
+        key = (counter.user_id, counter.category_id, counter.year, counter.month)
+        expected = actual.pop(key, 0)
+        if counter.spent_cents != expected:
+            counter.spent_cents = expected
+            corrected += 1
+    for (uid, cid, y, m), spent in actual.items():
+        db.add(models.CategorySpend(user_id=uid, category_id=cid, year=y, month=m, spent_cents=spent))
+        corrected += 1
+    db.commit()
+    return {"corrected": corrected}
+
+
+def main(argv=None) -> int:
+    from .shards import shard_router
+
+    args = list(sys.argv[1:] if argv is None else argv)
+    if args:
+        print(__doc__)
+        return 2
+    for name in shard_router.engines:
+        with shard_router.session(name) as db:
+            print(name, reconcile_spend(db))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
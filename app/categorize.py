@@ -0,0 +1,206 @@
+"""Rule-based auto-categorization with one compiled matcher per user.
+
+A user's rules (priority order) are compiled into a single anchored alternation
+``^(?:(?P<r0>.*?(?:kw))|(?P<r1>.*?(?:regex))|...)``. The regex engine tries alternatives in order
+and each one scans the whole description, so one ``match`` call returns the highest-priority rule
+whose text condition holds. Type and amount conditions do not fit in a regex; instead they split
+amounts into intervals with a constant set of eligible rules, and one alternation is compiled
+lazily per (type, interval). Categorizing a transaction is then a bisect plus one regex call.
+"""
+import re
+import threading
+from re import _parser as sre_parse
+from bisect import bisect_right
+from collections import OrderedDict
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session
+
+from . import models
+
+
+class InvalidRule(ValueError):
+    pass
+
+
+# Complexity caps for user regexes, which run against every new transaction's description
+MAX_REGEX_NODES = 50  # anything but literal characters
+MAX_REGEX_REPEAT = 100
+MAX_UNBOUNDED_REPEATS = 3
+_REPEATS = (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT, sre_parse.POSSESSIVE_REPEAT)
+
+
+def _check_backtracking(parsed, in_repeat: bool = False, counts=None) -> None:
+    """Reject constructs that make backtracking exponential or let one rule cost too much.
+
+    A variable-length repeat inside another repeat (``(a+)+``), an alternation under a repeat
+    (``(a|ab)*``) and backreferences are refused; sizes are capped by the constants above.
+    """
+    counts = {"nodes": 0, "unbounded": 0} if counts is None else counts
+    for op, av in parsed:
+        counts["nodes"] += op != sre_parse.LITERAL
+        if counts["nodes"] > MAX_REGEX_NODES:
+            raise InvalidRule("Rule pattern is too complex")
+        if op in (sre_parse.GROUPREF, sre_parse.GROUPREF_EXISTS):
+            raise InvalidRule("Backreferences are not allowed in rule patterns")
+        if op in _REPEATS:
+            low, high, body = av
+            if high == sre_parse.MAXREPEAT:
+                counts["unbounded"] += 1
+                if counts["unbounded"] > MAX_UNBOUNDED_REPEATS:
+                    raise InvalidRule(f"Use at most {MAX_UNBOUNDED_REPEATS} unbounded repeats (*, +, {{n,}}) in a rule pattern")
+            elif high > MAX_REGEX_REPEAT:
+                raise InvalidRule(f"Repeat counts above {MAX_REGEX_REPEAT} are not allowed in rule patterns")
+            if in_repeat and low != high:
+                raise InvalidRule("Nested repeats like (a+)+ are not allowed in rule patterns")
+            _check_backtracking(body, in_repeat or high > 1, counts)
+        elif op == sre_parse.BRANCH:
+            if in_repeat:
+                raise InvalidRule("Alternatives inside a repeat like (a|b)+ are not allowed in rule patterns")
+            for branch in av[1]:
+                _check_backtracking(branch, in_repeat, counts)
+        elif op == sre_parse.SUBPATTERN:
+            _check_backtracking(av[3], in_repeat, counts)
+        elif op in (sre_parse.ASSERT, sre_parse.ASSERT_NOT):
+            _check_backtracking(av[1], in_repeat, counts)
+        elif op == sre_parse.ATOMIC_GROUP:
+            _check_backtracking(av, in_repeat, counts)
+
+
+class RuleSpec(NamedTuple):
+    category_id: int
+    regex: Optional[str]  # None: no text condition
+    type: Optional[models.TxType]
+    min_cents: Optional[int]
+    max_cents: Optional[int]
+
+    @classmethod
+    def from_model(cls, rule: models.CategoryRule) -> "RuleSpec":
+        return cls(
+            rule.category_id,
+            rule_regex(rule.kind, rule.pattern),
+            models.TxType(rule.type) if rule.type is not None else None,
+            rule.min_amount_cents,
+            rule.max_amount_cents,
+        )
+
+    def eligible(self, tx_type: models.TxType, amount_cents: int) -> bool:
+        return (
+            (self.type is None or self.type == tx_type)
+            and (self.min_cents is None or amount_cents >= self.min_cents)
+            and (self.max_cents is None or amount_cents <= self.max_cents)
+        )
+
+
+def rule_regex(kind: str, pattern: Optional[str]) -> Optional[str]:
+    """Regex source for a rule's text condition; raises InvalidRule for unusable patterns."""
+    if not pattern:
+        return None
+    if kind == "keyword":
+        return re.escape(pattern)
+    try:
+        compiled = re.compile(pattern)
+    except re.error as e:
+        raise InvalidRule(f"Invalid regex: {e}") from None
+    # Capturing groups would shift group numbers inside the combined pattern
+    if compiled.groups:
+        raise InvalidRule("Use non-capturing groups (?:...) in rule patterns")
+    _check_backtracking(sre_parse.parse(pattern))
+    return pattern
+
+
+class RuleMatcher:
+    def __init__(self, rules: Iterable[RuleSpec]):
+        self.rules: List[RuleSpec] = list(rules)
+        bounds = {r.min_cents for r in self.rules if r.min_cents is not None}
+        bounds |= {r.max_cents + 1 for r in self.rules if r.max_cents is not None}
+        self._bounds = sorted(bounds)
+        self._patterns = {}
+        self._lock = threading.Lock()
+
+    def _pattern(self, tx_type: models.TxType, interval: int):
+        key = (tx_type, interval)
+        pattern = self._patterns.get(key, False)
+        if pattern is not False:
+            return pattern
+        # Any amount inside the interval has the same eligible rules
+        if not self._bounds:
+            sample = 0
+        elif interval == 0:
+            sample = self._bounds[0] - 1
+        else:
+            sample = self._bounds[interval - 1]
+        alternatives = [
+            f"(?P<r{i}>.*?(?:{rule.regex}))" if rule.regex is not None else f"(?P<r{i}>)"
+            for i, rule in enumerate(self.rules)
+            if rule.eligible(tx_type, sample)
+        ]
+        pattern = re.compile("^(?:" + "|".join(alternatives) + ")", re.IGNORECASE | re.DOTALL) if alternatives else None
+        with self._lock:
+            self._patterns[key] = pattern
+        return pattern
+
+    def categorize(self, description: Optional[str], amount_cents: int, tx_type) -> Optional[int]:
+        """Category id of the first matching rule, or None."""
+        if not self.rules:
+            return None
+        pattern = self._pattern(models.TxType(tx_type), bisect_right(self._bounds, amount_cents))
+        if pattern is None:
+            return None
+        m = pattern.match(description or "")
+        if m is None:
+            return None
+        return self.rules[int(m.lastgroup[1:])].category_id
+
+
+class MatcherCache:
+    """LRU of compiled matchers per user, valid while the user's rule set fingerprint is unchanged.
+
+    Every rule write stamps a new change sequence, so (rule count, max seq) changes with any
+    create, update or delete, in every worker process.
+    """
+
+    def __init__(self, max_users: int = 1024):
+        self.max_users = max_users
+        self._items: "OrderedDict[int, Tuple[tuple, RuleMatcher]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, db: Session, user_id: int) -> RuleMatcher:
+        fingerprint = tuple(db.execute(
+            select(func.count(), func.max(models.CategoryRule.seq)).where(models.CategoryRule.user_id == user_id)
+        ).one())
+        with self._lock:
+            cached = self._items.get(user_id)
+            if cached is not None and cached[0] == fingerprint:
+                self._items.move_to_end(user_id)
+                return cached[1]
+        rules = db.scalars(
+            select(models.CategoryRule)
+            .where(models.CategoryRule.user_id == user_id)
+            .order_by(models.CategoryRule.priority, models.CategoryRule.id)
+        ).all()
+        specs = []
+        for rule in rules:
+            try:
+                specs.append(RuleSpec.from_model(rule))
+            except InvalidRule:
+                # Saved before the current pattern checks; it matches nothing until edited
+                continue
+        matcher = RuleMatcher(specs)
+        with self._lock:
+            self._items[user_id] = (fingerprint, matcher)
+            self._items.move_to_end(user_id)
+            while len(self._items) > self.max_users:
+                self._items.popitem(last=False)
+        return matcher
+
+    def invalidate(self, user_id: Optional[int] = None) -> None:
+        with self._lock:
+            if user_id is None:
+                self._items.clear()
+            else:
+                self._items.pop(user_id, None)
+
+
+matchers = MatcherCache()
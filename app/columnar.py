@@ -0,0 +1,72 @@
+"""Column-oriented encodings of transaction lists for large pages and exports.
+
+A JSON array of ``TransactionOut`` objects repeats every key on every row and sends amounts as
+decimal strings. The columnar form sends one array per field instead: dates as epoch seconds
+(UTC), amounts as integer cents and the type as a code into ``types``. It is served as JSON with
+``format=columnar`` or as MessagePack when the client sends ``Accept: application/x-msgpack``
+(needs the optional ``msgpack`` package).
+"""
+import calendar
+import json
+from typing import Iterable, Optional
+
+from fastapi import HTTPException, Request
+from fastapi.responses import Response
+
+from . import models
+from .core.negotiation import accepted
+
+try:
+    import msgpack  # type: ignore
+except Exception:  # msgpack is optional; columnar JSON is always available
+    msgpack = None  # type: ignore
+
+MSGPACK = "application/x-msgpack"
+TYPES = [models.TxType.income.value, models.TxType.expense.value]
+_TYPE_CODES = {name: code for code, name in enumerate(TYPES)}
+
+
+def negotiate(request: Request, format: Optional[str]) -> Optional[str]:
+    """``"msgpack"``, ``"columnar"`` (JSON) or None for the regular list of objects."""
+    types = accepted(request.headers.get("accept", ""))
+    if MSGPACK in types or "application/msgpack" in types:
+        if msgpack is not None:
+            return "msgpack"
+        if not types & {"application/json", "application/*", "*/*"}:
+            raise HTTPException(status_code=406, detail="MessagePack is not available on this server")
+    return "columnar" if format == "columnar" else None
+
+
+def _epoch(value) -> int:
+    # Naive values (as stored) are taken to be UTC; aware ones are converted to UTC
+    return calendar.timegm(value.utctimetuple())
+
+
+def _field(row, name):
+    return row[name] if isinstance(row, dict) else getattr(row, name)
+
+
+def encode(rows: Iterable) -> dict:
+    """Columns of transaction models or ``COLUMNS``-shaped dicts (with ``tags``)."""
+    rows = list(rows)
+    get = lambda name: [_field(r, name) for r in rows]
+    return {
+        "count": len(rows),
+        "types": TYPES,
+        "id": get("id"),
+        "date": [_epoch(d) for d in get("date")],
+        "type": [_TYPE_CODES[models.TxType(t).value] for t in get("type")],
+        "amount_cents": get("amount_cents"),
+        "category_id": get("category_id"),
+        "description": get("description"),
+        "is_planned": get("is_planned"),
+        "tags": get("tags"),
+    }
+
+
+def response(rows: Iterable, fmt: str) -> Response:
+    columns = encode(rows)
+    if fmt == "msgpack":
+        return Response(content=msgpack.packb(columns, use_bin_type=True), media_type=MSGPACK, headers={"Vary": "Accept"})
+    body = json.dumps(columns, ensure_ascii=False, separators=(",", ":"))
+    return Response(content=body, media_type="application/json", headers={"Vary": "Accept"})
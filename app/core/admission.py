@@ -0,0 +1,60 @@
+"""Admission control: fail fast with 429 when a bounded resource is saturated."""
+import math
+import threading
+from contextlib import contextmanager
+
+from fastapi.responses import JSONResponse
+
+
+class Overloaded(Exception):
+    """Raised when a request cannot be admitted; rendered as 429 with Retry-After."""
+
+    def __init__(self, retry_after: float = 1.0, detail: str = "Too many requests"):
+        super().__init__(detail)
+        self.retry_after = retry_after
+        self.detail = detail
+
+
+def too_many_requests(retry_after: float, detail: str = "Too many requests") -> JSONResponse:
+    return JSONResponse(
+        status_code=429,
+        content={"detail": detail},
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+class AdmissionGate:
+    """Bounded concurrency with a bounded wait queue.
+
+    At most ``concurrency`` callers run at once and at most ``max_queue`` wait for a slot (for up
+    to ``timeout`` seconds); anyone beyond that is rejected immediately with ``Overloaded`` so load
+    degrades into fast 429s instead of an ever-growing backlog of blocked threads.
+    """
+
+    def __init__(self, name: str, concurrency: int, max_queue: int, timeout: float = 5.0):
+        self.name = name
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(concurrency)
+        self._lock = threading.Lock()
+        self._waiting = 0
+
+    @contextmanager
+    def admit(self):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                if self._waiting >= self.max_queue:
+                    raise Overloaded(self.timeout, f"{self.name} saturated, retry later")
+                self._waiting += 1
+            try:
+                acquired = self._slots.acquire(timeout=self.timeout)
+            finally:
+                with self._lock:
+                    self._waiting -= 1
+            if not acquired:
+                raise Overloaded(self.timeout, f"{self.name} saturated, retry later")
+        try:
+            yield
+        finally:
+            self._slots.release()
@@ -0,0 +1,193 @@
+"""Key-value cache for authenticated users and report results, shareable between worker processes.
+
+``CACHE_BACKEND`` selects where entries live:
+
+* ``memory`` - this process only (a single uvicorn process, tests);
+* ``sqlite:///path/cache.db`` - a file shared by the worker processes of one host; ``python -m
+  app.server`` switches to a fresh one of these when it forks several workers;
+* ``redis://host:6379/0`` - shared by every host (needs the ``redis`` package).
+
+Values are JSON. Cached reports are keyed by the user's change sequence (``ChangeCounter.seq``,
+read from the database on every request), so they never outlive a write whichever process made
+it, even with a per-process backend; the TTL only bounds how long unused entries stay around.
+Backend errors are logged and treated as misses, so a broken cache means recomputing, never a
+failed request.
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+from .config import settings
+
+log = logging.getLogger(__name__)
+
+class CacheBackend:
+    def get(self, key: str) -> Optional[str]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: str, ttl: float) -> None:
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+
+class MemoryBackend(CacheBackend):
+    """LRU with per-entry expiry, for a single process."""
+
+    def __init__(self, max_items: int = 10_000):
+        self.max_items = max_items
+        self._items: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            if item[1] < time.monotonic():
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return item[0]
+
+    def set(self, key: str, value: str, ttl: float) -> None:
+        with self._lock:
+            self._items[key] = (value, time.monotonic() + ttl)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._items.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+
+class SQLiteBackend(CacheBackend):
+    """Entries in a WAL-mode SQLite file that the processes of one host open concurrently."""
+
+    PURGE_EVERY = 1000
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+
+    def _conn(self) -> sqlite3.Connection:
+        # One connection per thread and process; a forked worker never reuses its parent's
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            conn.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL NOT NULL)")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def get(self, key: str) -> Optional[str]:
+        row = self._conn().execute("SELECT value, expires FROM cache WHERE key = ?", (key,)).fetchone()
+        if row is None or row[1] < time.time():
+            return None
+        return row[0]
+
+    def set(self, key: str, value: str, ttl: float) -> None:
+        conn = self._conn()
+        now = time.time()
+        conn.execute("INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)", (key, value, now + ttl))
+        self._writes += 1
+        if self._writes % self.PURGE_EVERY == 0:
+            conn.execute("DELETE FROM cache WHERE expires < ?", (now,))
+
+    def delete(self, key: str) -> None:
+        self._conn().execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def clear(self) -> None:
+        self._conn().execute("DELETE FROM cache")
+
+
+class RedisBackend(CacheBackend):
+    """Entries shared by all hosts. Requires ``redis``."""
+
+    def __init__(self, url: str, prefix: str = "cache:"):
+        import redis  # optional dependency, only needed for this backend
+
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url)
+
+    def get(self, key: str) -> Optional[str]:
+        value = self._client.get(self.prefix + key)
+        return None if value is None else value.decode()
+
+    def set(self, key: str, value: str, ttl: float) -> None:
+        self._client.set(self.prefix + key, value, px=max(int(ttl * 1000), 1))
+
+    def delete(self, key: str) -> None:
+        self._client.delete(self.prefix + key)
+
+    def clear(self) -> None:
+        for key in self._client.scan_iter(self.prefix + "*"):
+            self._client.delete(key)
+
+
+def make_backend(spec: str) -> CacheBackend:
+    if spec.startswith(("redis://", "rediss://")):
+        return RedisBackend(spec)
+    if spec.startswith("sqlite:///"):
+        return SQLiteBackend(spec[len("sqlite:///"):])
+    return MemoryBackend()
+
+
+class Cache:
+    """JSON values over a swappable backend."""
+
+    def __init__(self, backend: CacheBackend):
+        self.backend = backend
+
+    def get(self, key: str) -> Any:
+        try:
+            value = self.backend.get(key)
+        except Exception:
+            log.warning("Cache read failed", exc_info=True)
+            return None
+        return None if value is None else json.loads(value)
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        try:
+            self.backend.set(key, json.dumps(value, separators=(",", ":"), default=str), ttl)
+        except Exception:
+            log.warning("Cache write failed", exc_info=True)
+
+    def delete(self, key: str) -> None:
+        try:
+            self.backend.delete(key)
+        except Exception:
+            log.warning("Cache delete failed", exc_info=True)
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+    def report(self, name: str, user_id: int, seq: int, params, compute):
+        """``compute()`` for the user's report, reused while the user's change sequence is ``seq``."""
+        if settings.report_cache_ttl <= 0:
+            return compute()
+        key = f"report:{user_id}:{seq}:{name}:{json.dumps(params, separators=(',', ':'), default=str)}"
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.set(key, value, settings.report_cache_ttl)
+        return value
+
+
+cache = Cache(make_backend(settings.cache_backend))
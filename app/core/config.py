@@ -12,4 +12,35 @@ class Settings(BaseSettings):
     google_client_secret: Optional[str] = None # GOOGLE_CLIENT_SECRET
     server_base_url: str = 'http://localhost:8000'  # SERVER_BASE_URL
 
+    # Google OpenID metadata and signing keys, cached in memory and in a file shared by workers, see core/oidc.py
+    oidc_cache_ttl: float = 3600                      # OIDC_CACHE_TTL (seconds before a background refresh)
+    oidc_cache_max_stale: float = 86400               # OIDC_CACHE_MAX_STALE (older entries are fetched inline)
+    oidc_cache_dir: str = ''                          # OIDC_CACHE_DIR (empty: per-process memory; app.server sets a private one)
+
+    # Token-bucket rate limiting per user (JWT sub) or client IP, see core/ratelimit.py
+    rate_limit_enabled: bool = True                   # RATE_LIMIT_ENABLED
+    rate_limit_capacity: float = 120                  # RATE_LIMIT_CAPACITY (burst, in cost units)
+    rate_limit_refill_per_second: float = 2.0         # RATE_LIMIT_REFILL_PER_SECOND
+    rate_limit_backend: str = 'memory'                # RATE_LIMIT_BACKEND: 'memory' or redis://host:6379/0
+    # Reverse proxies whose X-Forwarded-For app.server trusts; requests from them are limited per forwarded client
+    forwarded_allow_ips: str = '127.0.0.1,::1'        # FORWARDED_ALLOW_IPS: comma-separated addresses or '*'
+
+    # Live update fan-out between worker processes, see core/events.py
+    events_broker: str = 'local'                      # EVENTS_BROKER: 'local' or redis://host:6379/0
+
+    # Cache of authenticated users and report results, see core/cache.py
+    cache_backend: str = 'memory'                     # CACHE_BACKEND: 'memory', sqlite:///path or redis://host:6379/0
+    report_cache_ttl: float = 300                     # REPORT_CACHE_TTL (seconds, 0 disables; writes invalidate at once)
+    auth_cache_ttl: float = 0                         # AUTH_CACHE_TTL (seconds a user lookup is reused, 0 disables)
+
+    # Per-user data shards, see shards.py; empty keeps everything in DATABASE_URL
+    shards: str = ''                                  # SHARDS: 'name=url,name=url'
+
+    # Transactions older than this are moved to the archive by `python -m app.archive`
+    archive_after_days: int = 730                     # ARCHIVE_AFTER_DAYS
+
+    # Superuser request profiling (X-Profile: 1), see core/profiling.py
+    profile_buffer_size: int = 50                     # PROFILE_BUFFER_SIZE (profiles kept per process)
+    profile_interval_ms: float = 5                    # PROFILE_INTERVAL_MS (sampling period)
+
 settings = Settings()
\ No newline at end of file
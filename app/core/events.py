@@ -0,0 +1,141 @@
+"""In-process pub/sub hub fanning out per-user change events to push (SSE) connections."""
+import asyncio
+import json
+import threading
+from collections import defaultdict
+from typing import Dict, Optional, Set
+
+from .config import settings
+
+# Sent instead of queued events when a slow subscriber falls behind; the client refetches state
+RESYNC = {"type": "resync"}
+
+
+class Subscription:
+    """One connected client: a bounded queue living on the event loop that serves the connection."""
+
+    __slots__ = ("user_id", "queue", "loop")
+
+    def __init__(self, user_id: int, queue_size: int):
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.loop = asyncio.get_running_loop()
+
+    def _put(self, event: dict) -> None:
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Drop the backlog and ask the client to reload rather than block the publisher
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+
+
+class Broker:
+    """Carries published events to the hubs that hold subscriptions.
+
+    The default delivers straight to the local hub, which is enough for a single worker process.
+    Multi-worker deployments plug in a broker that relays through a shared channel so every
+    worker's hub sees every event.
+    """
+
+    def __init__(self, hub: "EventHub"):
+        self.hub = hub
+
+    def publish(self, user_id: int, event: dict) -> None:
+        self.hub.deliver(user_id, event)
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+
+class RedisBroker(Broker):
+    """Relays events through Redis pub/sub so all worker processes fan out every event. Requires ``redis``."""
+
+    def __init__(self, hub: "EventHub", url: str, channel: str = "budget-planner:events"):
+        super().__init__(hub)
+        import redis  # optional dependency, only needed for this broker
+
+        self.url = url
+        self.channel = channel
+        self._publisher = redis.Redis.from_url(url)
+        self._task: Optional[asyncio.Task] = None
+
+    def publish(self, user_id: int, event: dict) -> None:
+        self._publisher.publish(self.channel, json.dumps({"user_id": user_id, "event": event}))
+
+    async def _listen(self) -> None:
+        import redis.asyncio as aioredis
+
+        client = aioredis.Redis.from_url(self.url)
+        pubsub = client.pubsub()
+        await pubsub.subscribe(self.channel)
+        try:
+            async for message in pubsub.listen():
+                if message.get("type") != "message":
+                    continue
+                payload = json.loads(message["data"])
+                self.hub.deliver(payload["user_id"], payload["event"])
+        finally:
+            await pubsub.close()
+            await client.aclose()
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+class EventHub:
+    """Tracks live subscriptions per user. Idle connections cost one small queue each."""
+
+    def __init__(self, queue_size: int = 64):
+        self.queue_size = queue_size
+        self._subscribers: Dict[int, Set[Subscription]] = defaultdict(set)
+        self._lock = threading.Lock()
+        self.broker: Broker = Broker(self)
+
+    def subscribe(self, user_id: int) -> Subscription:
+        sub = Subscription(user_id, self.queue_size)
+        with self._lock:
+            self._subscribers[user_id].add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        with self._lock:
+            subs = self._subscribers.get(sub.user_id)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._subscribers[sub.user_id]
+
+    def subscriber_count(self, user_id: Optional[int] = None) -> int:
+        with self._lock:
+            if user_id is not None:
+                return len(self._subscribers.get(user_id, ()))
+            return sum(len(s) for s in self._subscribers.values())
+
+    def publish(self, user_id: int, event: dict) -> None:
+        """Publish an event for a user. Safe to call from sync routes running in worker threads."""
+        self.broker.publish(user_id, event)
+
+    def deliver(self, user_id: int, event: dict) -> None:
+        with self._lock:
+            subs = list(self._subscribers.get(user_id, ()))
+        for sub in subs:
+            try:
+                sub.loop.call_soon_threadsafe(sub._put, event)
+            except RuntimeError:
+                # Loop already closed; the connection is gone
+                self.unsubscribe(sub)
+
+
+hub = EventHub()
+if settings.events_broker.startswith(("redis://", "rediss://")):
+    hub.broker = RedisBroker(hub, settings.events_broker)
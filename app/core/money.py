@@ -0,0 +1,23 @@
+"""Amounts are stored as integer minor units (cents); Decimal only appears at the API boundary."""
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Optional
+
+_CENT = Decimal("0.01")
+
+
+def to_cents(value) -> int:
+    """Decimal/str/int/float amount -> integer cents (half-up to the nearest cent)."""
+    if not isinstance(value, Decimal):
+        value = Decimal(str(value))
+    return int(value.quantize(_CENT, rounding=ROUND_HALF_UP).scaleb(2))
+
+
+def from_cents(cents) -> Optional[Decimal]:
+    """Integer cents (or a SQL SUM of them) -> Decimal with two places; None stays None."""
+    if cents is None:
+        return None
+    return Decimal(int(cents)).scaleb(-2)
+
+
+def format_cents(cents) -> str:
+    return str(from_cents(cents or 0))
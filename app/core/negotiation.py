@@ -0,0 +1,21 @@
+"""Parsing of ``Accept``-style request headers (``Accept``, ``Accept-Encoding``)."""
+
+
+def accepted(header: str) -> set:
+    """Lower-cased tokens of a comma-separated header, without those sent with ``q=0``.
+
+    Preferences between non-zero q-values are not ranked; callers apply their own order.
+    """
+    tokens = set()
+    for part in header.split(","):
+        token, _, params = part.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        if token:
+            tokens.add(token.strip().lower())
+    return tokens
@@ -0,0 +1,169 @@
+"""OpenID Connect provider metadata and signing keys, cached across requests and workers.
+
+Authlib loads the discovery document and the JWKS lazily, once per process, each over a fresh
+HTTP client, so a cold worker pays several TLS handshakes during the first login. Here both are
+kept together in memory and, when ``OIDC_CACHE_DIR`` is set (``python -m app.server`` sets a
+private one for its workers), in a JSON file that every worker on the host reads. The file holds
+the keys ID tokens are verified with, so the directory is only used when it belongs to this user
+and nobody else can write to it. A fresh entry is used as is, a stale one (older than
+``OIDC_CACHE_TTL``) is still served while one background task refreshes it, and only an expired
+or missing one (older than ``OIDC_CACHE_MAX_STALE``) is fetched inline. The cached document is handed to Authlib with the
+JWKS embedded, so it never fetches them itself and validates the ID token locally. All calls go
+through one keep-alive connection pool.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Optional
+
+import httpx
+
+from .config import settings
+
+log = logging.getLogger(__name__)
+
+
+class SharedTransport(httpx.AsyncBaseTransport):
+    """Connection pool shared by short-lived clients: closing a client leaves the pool open."""
+
+    def __init__(self, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self._transport = transport or httpx.AsyncHTTPTransport(
+            limits=httpx.Limits(max_keepalive_connections=10, keepalive_expiry=300),
+            retries=1,
+        )
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await self._transport.handle_async_request(request)
+
+    async def aclose(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        await self._transport.aclose()
+
+
+transport = SharedTransport()
+
+
+class ProviderCache:
+    """Discovery document of one provider with its JWKS under ``"jwks"``."""
+
+    def __init__(
+        self,
+        metadata_url: str,
+        ttl: Optional[float] = None,
+        max_stale: Optional[float] = None,
+        cache_dir: Optional[str] = None,
+        transport: SharedTransport = transport,
+        timeout: float = 10.0,
+    ):
+        self.metadata_url = metadata_url
+        self.ttl = settings.oidc_cache_ttl if ttl is None else ttl
+        self.max_stale = settings.oidc_cache_max_stale if max_stale is None else max_stale
+        directory = cache_dir or settings.oidc_cache_dir
+        # No directory: this process keeps the metadata in memory only
+        self.path = Path(directory) / (hashlib.sha1(metadata_url.encode()).hexdigest() + ".json") if directory else None
+        self.transport = transport
+        self.timeout = timeout
+        self.metadata: Optional[dict] = None
+        self.fetched_at = 0.0
+        self._lock: Optional[asyncio.Lock] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    def _client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(transport=self.transport, timeout=self.timeout)
+
+    def _private_dir(self) -> bool:
+        """Create the cache directory (0700) and check nobody but this user can plant keys in it."""
+        directory = self.path.parent
+        try:
+            directory.mkdir(mode=0o700, parents=True, exist_ok=True)
+            st = directory.stat()
+        except OSError:
+            log.warning("Cannot use OIDC cache directory %s", directory, exc_info=True)
+            return False
+        if hasattr(os, "getuid") and (st.st_uid != os.getuid() or st.st_mode & 0o022):
+            log.warning("Ignoring OIDC cache directory %s: not owned by this user or writable by others", directory)
+            return False
+        return True
+
+    def _read_file(self) -> None:
+        if self.path is None or not self._private_dir():
+            return
+        try:
+            entry = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            return
+        if entry.get("fetched_at", 0) > self.fetched_at and isinstance(entry.get("metadata"), dict):
+            self.metadata = entry["metadata"]
+            self.fetched_at = entry["fetched_at"]
+
+    def _write_file(self) -> None:
+        if self.path is None or not self._private_dir():
+            return
+        try:
+            fd, tmp = tempfile.mkstemp(dir=self.path.parent, suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                json.dump({"fetched_at": self.fetched_at, "metadata": self.metadata}, f)
+            os.replace(tmp, self.path)
+        except OSError:
+            log.warning("Cannot write OIDC cache file %s", self.path, exc_info=True)
+
+    def age(self) -> float:
+        return time.time() - self.fetched_at
+
+    async def refresh(self) -> dict:
+        """Fetch the discovery document and its JWKS now and store both."""
+        async with self._client() as client:
+            resp = await client.get(self.metadata_url)
+            resp.raise_for_status()
+            metadata = resp.json()
+            resp = await client.get(metadata["jwks_uri"])
+            resp.raise_for_status()
+            metadata["jwks"] = resp.json()
+        self.metadata = metadata
+        self.fetched_at = time.time()
+        self._write_file()
+        return metadata
+
+    async def _refresh_in_background(self) -> None:
+        try:
+            await self.refresh()
+        except Exception:
+            log.warning("Background refresh of %s failed", self.metadata_url, exc_info=True)
+
+    async def get(self) -> dict:
+        if self.metadata is None or self.age() >= self.ttl:
+            # Another worker may have refreshed the shared file already
+            self._read_file()
+        if self.metadata is not None and self.age() < self.ttl:
+            return self.metadata
+        if self.metadata is not None and self.age() < self.max_stale:
+            if self._refresh_task is None or self._refresh_task.done():
+                self._refresh_task = asyncio.create_task(self._refresh_in_background())
+            return self.metadata
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self.metadata is None or self.age() >= self.max_stale:
+                await self.refresh()
+        return self.metadata
+
+    async def warm(self) -> None:
+        """Load the cache ahead of the first login; failures only log, the login retries."""
+        try:
+            await self.get()
+        except Exception:
+            log.warning("Cannot load %s", self.metadata_url, exc_info=True)
+
+    async def prepare(self, app) -> None:
+        """Give an Authlib client app the cached metadata, JWKS included."""
+        metadata = await self.get()
+        app.server_metadata.update(metadata)
+        # Authlib fetches the document itself only while "_loaded_at" is missing
+        app.server_metadata["_loaded_at"] = self.fetched_at
@@ -0,0 +1,280 @@
+"""Opt-in per-request profiling for superusers.
+
+A request sent with ``X-Profile: 1`` (or ``?profile=1``) gets a pending profile in a context
+variable. Nothing runs unless the authenticated user is a superuser: ``get_current_user`` then
+starts a sampling thread and SQL capture. Samples come from the threads that execute the
+request's SQL (sync endpoints run in a thread pool, so the request has no fixed thread), taken
+with ``sys._current_frames()`` every ``PROFILE_INTERVAL_MS``; each statement is timed by engine
+hooks, installed the first time anything is profiled. The finished profile goes into an
+in-process ring buffer (``/api/debug/profiles``) and the response gets ``X-Profile-Id`` and
+``Server-Timing`` headers. Requests without the flag pay one header lookup.
+"""
+import itertools
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs
+
+from .config import settings
+
+HEADER = b"x-profile"
+MAX_STATEMENTS = 500
+MAX_SQL_LENGTH = 2000
+_TRUE = {"1", "true", "yes", "on"}
+
+_current: ContextVar[Optional["Profile"]] = ContextVar("profile", default=None)
+# Pool thread -> profile whose SQL it last executed; a thread works for one request at a time
+_owners: Dict[int, "Profile"] = {}
+_ids = itertools.count(1)
+_hooks_installed = False
+_hooks_lock = threading.Lock()
+
+
+_APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_labels: Dict[object, str] = {}
+
+
+def _frame_label(code) -> str:
+    label = _labels.get(code)
+    if label is None:
+        path = code.co_filename
+        for root in sorted(filter(None, sys.path), key=len, reverse=True):
+            if path.startswith(root + os.sep):
+                path = os.path.relpath(path, root)
+                break
+        label = _labels[code] = f"{code.co_name} ({path}:{code.co_firstlineno})"
+    return label
+
+
+class Profile:
+    def __init__(self, method: str, path: str, query: str, interval: float):
+        self.id = next(_ids)
+        self.method = method
+        self.path = path
+        self.query = query
+        self.interval = interval
+        self.user_id: Optional[int] = None
+        self.started = False
+        self.status: Optional[int] = None
+        self.started_at = datetime.now(timezone.utc)
+        self._t0 = time.perf_counter()
+        self.duration = 0.0
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.statements: List[dict] = []
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self._threads: Dict[int, bool] = {}
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+
+    def start(self, user_id: int) -> None:
+        _install_sql_hooks()
+        self.user_id = user_id
+        self.started = True
+        self._sampler = threading.Thread(target=self._sample, name=f"profile-{self.id}", daemon=True)
+        self._sampler.start()
+
+    def claim(self, thread_id: int) -> None:
+        self._threads[thread_id] = True
+
+    def release(self, thread_id: int) -> None:
+        self._threads.pop(thread_id, None)
+
+    def release_all(self) -> None:
+        for thread_id in list(self._threads):
+            if _owners.get(thread_id) is self:
+                _owners.pop(thread_id, None)
+        self._threads.clear()
+
+    def _sample(self) -> None:
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            for thread_id in list(self._threads):
+                frame = frames.get(thread_id)
+                stack = []
+                in_app = False
+                while frame is not None:
+                    in_app = in_app or frame.f_code.co_filename.startswith(_APP_DIR)
+                    stack.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                # A pool thread between two pieces of work only waits for its next job
+                if in_app:
+                    self.stacks[";".join(reversed(stack))] += 1
+                    self.samples += 1
+
+    def record_sql(self, statement: str, seconds: float) -> None:
+        self.sql_count += 1
+        self.sql_time += seconds
+        if len(self.statements) < MAX_STATEMENTS:
+            self.statements.append({"sql": statement[:MAX_SQL_LENGTH], "ms": round(seconds * 1000, 3)})
+
+    def finish(self, status: int) -> None:
+        self.status = status
+        self.duration = time.perf_counter() - self._t0
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+        self.release_all()
+
+    def top_functions(self, limit: int = 30) -> List[dict]:
+        """Functions by inclusive ("total") and exclusive ("self") sample counts."""
+        total: Counter = Counter()
+        own: Counter = Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")
+            own[frames[-1]] += count
+            for frame in set(frames):
+                total[frame] += count
+        return [
+            {"function": name, "total": count, "self": own.get(name, 0)}
+            for name, count in total.most_common(limit)
+        ]
+
+    def folded(self) -> str:
+        """Collapsed stacks (``a;b;c count`` per line) for flamegraph.pl, speedscope or inferno."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "query": self.query,
+            "user_id": self.user_id,
+            "status": self.status,
+            "started_at": self.started_at.isoformat(),
+            "duration_ms": round(self.duration * 1000, 3),
+            "samples": self.samples,
+            "interval_ms": self.interval * 1000,
+            "sql_count": self.sql_count,
+            "sql_ms": round(self.sql_time * 1000, 3),
+        }
+
+    def details(self) -> dict:
+        return {**self.summary(), "sql": self.statements, "top": self.top_functions(), "folded": self.folded()}
+
+    def server_timing(self) -> str:
+        app_ms = max(self.duration - self.sql_time, 0) * 1000
+        return f'db;dur={self.sql_time * 1000:.1f};desc="{self.sql_count} queries", app;dur={app_ms:.1f}'
+
+
+class ProfileBuffer:
+    """Bounded, thread-safe ring buffer of finished profiles (oldest dropped first)."""
+
+    def __init__(self, size: int):
+        self._items: deque = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, profile: Profile) -> None:
+        with self._lock:
+            self._items.append(profile)
+
+    def list(self) -> List[Profile]:
+        with self._lock:
+            return list(reversed(self._items))
+
+    def get(self, profile_id: int) -> Optional[Profile]:
+        with self._lock:
+            return next((p for p in self._items if p.id == profile_id), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+
+profiles = ProfileBuffer(settings.profile_buffer_size)
+
+
+def authorize(user) -> None:
+    """Start the pending profile of this request if ``user`` may profile (called on authentication)."""
+    profile = _current.get()
+    if profile is not None and not profile.started and user.is_superuser:
+        profile.start(user.id)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _current.get()
+    active = profile is not None and profile.started
+    if not _owners and not active:
+        return
+    thread_id = threading.get_ident()
+    owner = _owners.get(thread_id)
+    if owner is not None and owner is not profile:
+        owner.release(thread_id)
+        del _owners[thread_id]
+    if active:
+        _owners[thread_id] = profile
+        profile.claim(thread_id)
+        conn.info.setdefault("profile_t0", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _current.get()
+    if profile is not None and profile.started:
+        starts = conn.info.get("profile_t0")
+        if starts:
+            profile.record_sql(statement, time.perf_counter() - starts.pop())
+
+
+def _install_sql_hooks() -> None:
+    global _hooks_installed
+    if _hooks_installed:
+        return
+    with _hooks_lock:
+        if _hooks_installed:
+            return
+        from sqlalchemy import event
+        from sqlalchemy.engine import Engine
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        _hooks_installed = True
+
+
+def _wants_profile(scope) -> bool:
+    for name, value in scope.get("headers", ()):
+        if name == HEADER:
+            return value.decode("latin-1").strip().lower() in _TRUE
+    query = scope.get("query_string", b"")
+    if b"profile=" not in query:
+        return False
+    values = parse_qs(query.decode("latin-1")).get("profile", [])
+    return bool(values) and values[-1].strip().lower() in _TRUE
+
+
+class ProfilingMiddleware:
+    """ASGI middleware creating a pending profile for flagged ``/api`` requests and storing it."""
+
+    def __init__(self, app, buffer: ProfileBuffer = profiles, interval: Optional[float] = None):
+        self.app = app
+        self.buffer = buffer
+        self.interval = (settings.profile_interval_ms if interval is None else interval) / 1000
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith("/api/") or not _wants_profile(scope):
+            await self.app(scope, receive, send)
+            return
+        profile = Profile(scope["method"], scope["path"], scope.get("query_string", b"").decode("latin-1"), self.interval)
+        token = _current.set(profile)
+
+        async def send_with_profile(message):
+            if message["type"] == "http.response.start" and profile.started:
+                profile.finish(message["status"])
+                self.buffer.add(profile)
+                headers = list(message.get("headers", []))
+                headers.append((b"x-profile-id", str(profile.id).encode()))
+                headers.append((b"server-timing", profile.server_timing().encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_profile)
+        finally:
+            if profile.started and profile.status is None:
+                profile.finish(500)
+            _current.reset(token)
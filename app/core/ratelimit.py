@@ -0,0 +1,184 @@
+"""Per-client token-bucket rate limiting with a per-route cost model."""
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from jose import jwt, JWTError
+
+from .admission import too_many_requests
+from .config import settings
+from .security import SECRET_KEY, ALGORITHM
+
+
+class RateLimitBackend:
+    """Token bucket storage. ``take`` must be atomic per key across everything sharing the backend."""
+
+    def take(self, key: str, cost: float, capacity: float, refill_rate: float) -> float:
+        """Take ``cost`` tokens; return 0 when allowed, else seconds until enough tokens refill."""
+        raise NotImplementedError
+
+    async def take_async(self, key: str, cost: float, capacity: float, refill_rate: float) -> float:
+        """``take`` for the event loop; backends that do network I/O override it so they never block."""
+        return self.take(key, cost, capacity, refill_rate)
+
+    def reset(self) -> None:
+        raise NotImplementedError
+
+
+class InMemoryBackend(RateLimitBackend):
+    """Process-local buckets (LRU-bounded). Each worker process limits independently."""
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: str, cost: float, capacity: float, refill_rate: float) -> float:
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.pop(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - last) * refill_rate)
+            wait = 0.0
+            if tokens >= cost:
+                tokens -= cost
+            else:
+                wait = (cost - tokens) / refill_rate
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return wait
+
+    def reset(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+
+_REDIS_TAKE = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local now = tonumber(ARGV[4])
+local b = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(b[1]) or capacity
+local ts = tonumber(b[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens >= cost then tokens = tokens - cost else wait = (cost - tokens) / rate end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return tostring(wait)
+"""
+
+
+class RedisBackend(RateLimitBackend):
+    """Buckets shared by all workers/hosts, updated atomically by a Lua script. Requires ``redis``."""
+
+    def __init__(self, url: str, prefix: str = "ratelimit:"):
+        import redis  # optional dependency, only needed for this backend
+        import redis.asyncio as aioredis
+
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url)
+        self._take = self._client.register_script(_REDIS_TAKE)
+        # The middleware runs on the event loop, so it goes through the asyncio client
+        self._take_async = aioredis.Redis.from_url(url).register_script(_REDIS_TAKE)
+
+    def take(self, key: str, cost: float, capacity: float, refill_rate: float) -> float:
+        return float(self._take(keys=[self.prefix + key], args=[capacity, refill_rate, cost, time.time()]))
+
+    async def take_async(self, key: str, cost: float, capacity: float, refill_rate: float) -> float:
+        return float(await self._take_async(keys=[self.prefix + key], args=[capacity, refill_rate, cost, time.time()]))
+
+    def reset(self) -> None:
+        for key in self._client.scan_iter(self.prefix + "*"):
+            self._client.delete(key)
+
+
+# Relative cost of a request per (method, path); everything else costs DEFAULT_COST.
+# Password hashing and data generation are orders of magnitude more expensive than a lookup.
+DEFAULT_COST = 1
+ROUTE_COSTS: Dict[Tuple[str, str], float] = {
+    ("POST", "/api/auth/login"): 10,
+    ("POST", "/api/auth/register"): 10,
+    ("POST", "/api/debug/seed-demo"): 20,
+    ("POST", "/api/debug/clear"): 5,
+    ("POST", "/api/budgets/reconcile"): 5,
+    ("POST", "/api/transactions/bulk"): 20,
+    ("GET", "/api/transactions/duplicates"): 5,
+    ("GET", "/api/transactions/export"): 10,
+    ("POST", "/api/rules/apply"): 20,
+    ("GET", "/api/reports/by-category"): 5,
+    ("GET", "/api/reports/running-balance"): 5,
+    ("GET", "/api/reports/pivot"): 5,
+    ("GET", "/api/reports/by-tag"): 5,
+    ("GET", "/api/reports/stats"): 5,
+    ("GET", "/api/reports/forecast"): 5,
+}
+
+
+class RateLimiter:
+    def __init__(self, backend: RateLimitBackend, capacity: float, refill_rate: float, costs: Optional[Dict] = None):
+        self.backend = backend
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self.costs = ROUTE_COSTS if costs is None else costs
+
+    def cost(self, method: str, path: str) -> float:
+        return self.costs.get((method, path.rstrip("/") or "/"), DEFAULT_COST)
+
+    @staticmethod
+    def client_key(scope) -> str:
+        """``user:<sub>`` for a valid bearer token, otherwise ``ip:<address>``."""
+        for name, value in scope.get("headers", ()):
+            if name == b"authorization":
+                scheme, _, token = value.decode("latin-1").partition(" ")
+                if scheme.lower() == "bearer" and token:
+                    try:
+                        sub = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM]).get("sub")
+                    except JWTError:
+                        sub = None
+                    if sub:
+                        return f"user:{sub}"
+                break
+        client = scope.get("client")
+        return f"ip:{client[0] if client else 'unknown'}"
+
+    def check(self, scope) -> float:
+        return self.backend.take(
+            self.client_key(scope), self.cost(scope["method"], scope["path"]), self.capacity, self.refill_rate
+        )
+
+    async def check_async(self, scope) -> float:
+        return await self.backend.take_async(
+            self.client_key(scope), self.cost(scope["method"], scope["path"]), self.capacity, self.refill_rate
+        )
+
+
+class RateLimitMiddleware:
+    """ASGI middleware applying the limiter to ``/api`` requests."""
+
+    def __init__(self, app, limiter: RateLimiter):
+        self.app = app
+        self.limiter = limiter
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"].startswith("/api/"):
+            wait = await self.limiter.check_async(scope)
+            if wait > 0:
+                await too_many_requests(wait)(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
+
+def _make_backend(spec: str) -> RateLimitBackend:
+    if spec.startswith(("redis://", "rediss://")):
+        return RedisBackend(spec)
+    return InMemoryBackend()
+
+
+limiter = RateLimiter(
+    _make_backend(settings.rate_limit_backend),
+    capacity=settings.rate_limit_capacity,
+    refill_rate=settings.rate_limit_refill_per_second,
+)
@@ -4,6 +4,8 @@ from passlib.context import CryptContext
 from jose import jwt
 import os
 
+from .admission import AdmissionGate
+
 # In production, use environment variables; defaults for dev
 SECRET_KEY = os.getenv("SECRET_KEY", "change-me-in-env")
 ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
@@ -11,14 +13,24 @@ ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "60")
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# bcrypt is CPU-bound: run at most one hash per core and let only a short queue wait for a slot,
+# beyond that requests are rejected with 429 instead of starving every other request of CPU.
+hash_gate = AdmissionGate(
+    "Password hashing",
+    concurrency=int(os.getenv("HASH_CONCURRENCY", str(os.cpu_count() or 1))),
+    max_queue=int(os.getenv("HASH_QUEUE_LIMIT", "16")),
+)
+
 
 def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+    with hash_gate.admit():
+        return pwd_context.hash(password)
 
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    with hash_gate.admit():
+        return pwd_context.verify(plain_password, hashed_password)
 
 
 def create_access_token(subject: str, expires_delta: Optional[timedelta] = None) -> str:
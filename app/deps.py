@@ -1,22 +1,32 @@
-from fastapi import Depends, HTTPException, status
+from datetime import datetime
+from typing import Optional
+
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 from jose import jwt, JWTError
 
 from .database import get_db
 from .models import User
+from .shards import shard_router, DEFAULT_SHARD
 from .core.security import SECRET_KEY, ALGORITHM
+from .core import profiling
+from .core.cache import cache
+from .core.config import settings
 
 # Expect Authorization: Bearer <token>
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login", auto_error=False)
 
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
+def _user_from_token(token: Optional[str], db: Session) -> User:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    if not token:
+        raise credentials_exception
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email = payload.get("sub")
@@ -25,12 +35,71 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
     except JWTError:
         raise credentials_exception
 
-    user = db.query(User).filter(User.email == email).first()
+    user = _cached_user(email)
+    if user is None:
+        user = db.query(User).filter(User.email == email).first()
+        if user is not None:
+            # Read-only for the request: detached, so the route's commits do not expire it and reload it
+            db.expunge(user)
+            _cache_user(user)
     if not user or not user.is_active:
         raise credentials_exception
     return user
 
 
+_USER_FIELDS = ("id", "email", "is_active", "is_superuser", "created_at")
+
+
+def _cached_user(email: str) -> Optional[User]:
+    if settings.auth_cache_ttl <= 0:
+        return None
+    fields = cache.get(f"user:{email}")
+    if fields is None:
+        return None
+    fields["created_at"] = datetime.fromisoformat(fields["created_at"]) if fields["created_at"] else None
+    return User(**fields)
+
+
+def _cache_user(user: User) -> None:
+    """Reuse the lookup for AUTH_CACHE_TTL seconds (deactivation and role changes wait that long)."""
+    if settings.auth_cache_ttl > 0:
+        fields = {name: getattr(user, name) for name in _USER_FIELDS}
+        fields["created_at"] = user.created_at.isoformat() if user.created_at else None
+        cache.set(f"user:{user.email}", fields, settings.auth_cache_ttl)
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
+    user = _user_from_token(token, db)
+    # Starts profiling when the request asked for it and the user is a superuser
+    profiling.authorize(user)
+    return user
+
+
+def get_user_db(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+    """Session on the shard holding the current user's data (the directory session when unsharded)."""
+    if not shard_router.sharded:
+        yield db
+        return
+    name = shard_router.locate(db, current_user.id)
+    if name == DEFAULT_SHARD:
+        yield db
+        return
+    with shard_router.session(name) as shard_db:
+        yield shard_db
+
+
+async def get_current_user_for_stream(
+    header_token: Optional[str] = Depends(optional_oauth2_scheme),
+    token: Optional[str] = Query(None, description="JWT for clients that cannot send headers (EventSource)"),
+    db: Session = Depends(get_db, scope="function"),
+) -> User:
+    """Like get_current_user, but also accepts ?token= and gives the DB session back before streaming.
+
+    Push connections stay open for hours; they must not pin a pooled connection meanwhile.
+    """
+    return _user_from_token(header_token or token, db)
+
+
 async def get_current_superuser(current_user: User = Depends(get_current_user)) -> User:
     if not current_user.is_superuser:
         raise HTTPException(status_code=403, detail="Insufficient privileges")
@@ -0,0 +1,107 @@
+"""Duplicate detection for transaction ingestion.
+
+Every transaction stores a fingerprint of (day, type, amount, normalized description), indexed
+with ``user_id``. Re-imported statement lines produce the same fingerprint, so checking a batch
+costs one index probe per fingerprint, and finding existing duplicates is one window query
+instead of pairwise comparison.
+"""
+import hashlib
+import re
+import unicodedata
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session
+
+from . import models, archive
+from .core.money import from_cents
+
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+def normalize_description(description: Optional[str]) -> str:
+    """Case, accents, punctuation and spacing do not matter: ``"ŻABKA  sp.z o.o."`` -> ``"zabka sp z o o"``."""
+    if not description:
+        return ""
+    text = unicodedata.normalize("NFKD", description.replace("ł", "l").replace("Ł", "L"))
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return _NON_WORD.sub(" ", text.casefold()).strip()
+
+
+def fingerprint(date: datetime, tx_type, amount_cents: int, description: Optional[str]) -> str:
+    key = f"{date.date().isoformat()}|{models.TxType(tx_type).value}|{amount_cents}|{normalize_description(description)}"
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+def fingerprint_of(tx) -> str:
+    return fingerprint(tx.date, tx.type, tx.amount_cents, tx.description)
+
+
+def existing_counts(db: Session, user_id: int, fingerprints: Iterable[str]) -> Dict[str, int]:
+    """{fingerprint: number of stored transactions} for the given fingerprints, hot and archived."""
+    wanted = list(set(fingerprints))
+    counts: Counter = Counter()
+    if not wanted:
+        return counts
+    for model in (models.Transaction, models.ArchivedTransaction):
+        counts.update(dict(db.execute(
+            select(model.fingerprint, func.count())
+            .where(model.user_id == user_id)
+            .where(model.fingerprint.in_(wanted))
+            .group_by(model.fingerprint)
+        ).all()))
+    return counts
+
+
+def new_rows(db: Session, user_id: int, fingerprints: List[str]) -> List[bool]:
+    """For each incoming row, whether it is new rather than a copy of a stored transaction.
+
+    Fingerprints are compared as multisets: two identical lines in one statement stay two
+    transactions, and only as many of them are duplicates as are already stored.
+    """
+    remaining = existing_counts(db, user_id, fingerprints)
+    result = []
+    for fp in fingerprints:
+        if remaining.get(fp, 0) > 0:
+            remaining[fp] -= 1
+            result.append(False)
+        else:
+            result.append(True)
+    return result
+
+
+def first_match(db: Session, user_id: int, fp: str) -> Optional[int]:
+    """Id of a stored transaction with this fingerprint, if any."""
+    for model in (models.Transaction, models.ArchivedTransaction):
+        found = db.scalar(
+            select(model.id).where(model.user_id == user_id).where(model.fingerprint == fp).order_by(model.id).limit(1)
+        )
+        if found is not None:
+            return found
+    return None
+
+
+def find_duplicates(db: Session, user_id: int) -> List[dict]:
+    """Groups of the user's transactions sharing a fingerprint, found in one window query."""
+    src = archive.transactions_source(user_id, archive.archived_before(db, user_id) is not None)
+    counted = select(
+        src.c.id, src.c.fingerprint, src.c.date, src.c.type, src.c.amount_cents, src.c.description,
+        func.count().over(partition_by=src.c.fingerprint).label("copies"),
+    ).where(src.c.fingerprint.is_not(None)).subquery()
+    rows = db.execute(
+        select(counted).where(counted.c.copies > 1).order_by(counted.c.date, counted.c.fingerprint, counted.c.id)
+    ).mappings()
+    groups: Dict[str, dict] = {}
+    for r in rows:
+        group = groups.setdefault(r["fingerprint"], {
+            "fingerprint": r["fingerprint"],
+            "date": r["date"],
+            "type": models.TxType(r["type"]).value,
+            "amount": str(from_cents(r["amount_cents"])),
+            "description": r["description"],
+            "ids": [],
+        })
+        group["ids"].append(r["id"])
+    return list(groups.values())
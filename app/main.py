@@ -1,5 +1,6 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from starlette.middleware.sessions import SessionMiddleware
 import os
 
@@ -14,6 +15,20 @@ app = FastAPI(title="Budget Planner API", openapi_url="/api/openapi.json")
 # Basic CORS setup for local dev
 from .core.config import settings
 from .core.security import SECRET_KEY
+from .core.admission import Overloaded, too_many_requests
+from .core.ratelimit import RateLimitMiddleware, limiter
+from .core.profiling import ProfilingMiddleware
+
+# Superuser profiling of single requests (X-Profile: 1); a no-op for requests without the flag
+app.add_middleware(ProfilingMiddleware)
+
+# Middleware added later wraps the earlier ones: CORS (below) wraps this, so 429 responses still get CORS headers
+if settings.rate_limit_enabled:
+    app.add_middleware(RateLimitMiddleware, limiter=limiter)
+
+@app.exception_handler(Overloaded)
+async def overloaded_handler(request, exc: Overloaded):
+    return too_many_requests(exc.retry_after, exc.detail)
 
 # Session middleware required for OAuth (Authlib uses request.session)
 session_secret = os.getenv("SESSION_SECRET_KEY", SECRET_KEY)
@@ -27,55 +42,88 @@ app.add_middleware(
     allow_headers=["*"]
 )
 
+# Compress larger API responses (e.g. long transaction lists); static assets are already precompressed
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
 # Database setup: create tables on startup
 from .database import Base, engine, SessionLocal  # noqa: E402
 from . import models  # noqa: F401, ensure models are imported so tables are registered
 
+# Set once the schema is current; workers forked by app.server inherit it and skip the setup
+schema_ready = False
+
+
+def setup_database():
+    """Create tables and run the startup migrations (once per process tree, see app/server.py)."""
+    global schema_ready
+    # Tables and startup migrations for the directory database and every shard
+    from .shards import shard_router
+    shard_router.create_schema()
+    schema_ready = True
+
+
 @app.on_event("startup")
 def on_startup():
-    # Ensure tables exist
-    Base.metadata.create_all(bind=engine)
-    # Lightweight startup migration: ensure user_id column exists for per-user data scoping
-    try:
-        from sqlalchemy import text
-        with engine.connect() as conn:
-            # Categories.user_id
-            res = conn.execute(text("PRAGMA table_info('categories')"))
-            cols = {row[1] for row in res}
-            if 'user_id' not in cols:
-                conn.execute(text("ALTER TABLE categories ADD COLUMN user_id INTEGER REFERENCES users(id) ON DELETE CASCADE"))
-            # Transactions.user_id
-            res2 = conn.execute(text("PRAGMA table_info('transactions')"))
-            cols2 = {row[1] for row in res2}
-            if 'user_id' not in cols2:
-                conn.execute(text("ALTER TABLE transactions ADD COLUMN user_id INTEGER REFERENCES users(id) ON DELETE CASCADE"))
-            conn.commit()
-    except Exception:
-        # Avoid crashing the app on startup; ignore migration errors in dev
-        pass
+    if not schema_ready:
+        setup_database()
+
+@app.on_event("startup")
+async def start_event_broker():
+    from .core.events import hub
+    await hub.broker.start()
+
+@app.on_event("shutdown")
+async def stop_event_broker():
+    from .core.events import hub
+    await hub.broker.stop()
+
+@app.on_event("startup")
+async def warm_oidc_cache():
+    # Fetch Google metadata and keys before the first login, without delaying startup
+    if settings.google_client_id:
+        import asyncio
+        from .api.google_auth import google_provider
+        app.state.oidc_warmup = asyncio.get_running_loop().create_task(google_provider.warm())
+
+@app.on_event("shutdown")
+async def close_oidc_pool():
+    from .core.oidc import transport
+    await transport.close()
 
 if api_router is not None:
     app.include_router(api_router, prefix="/api")
 
-# Serve static frontend
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, HTMLResponse
+# Serve static frontend from memory (precompressed, hashed asset URLs, ETags)
+from fastapi import HTTPException, Request
+from fastapi.responses import HTMLResponse
 from pathlib import Path
+from .assets import AssetStore, REVALIDATE
 
 static_dir = Path(__file__).parent / 'static'
-app.mount("/static", StaticFiles(directory=str(static_dir)), name="static")
+assets = AssetStore(static_dir, watch=settings.env == 'development')
+
+@app.get("/static/{filename}", include_in_schema=False)
+async def static_file(filename: str, request: Request):
+    asset, cache_control = assets.lookup(filename)
+    if asset is None:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return asset.response(request, cache_control)
+
+def _page(name: str, request: Request):
+    asset, _ = assets.lookup(name)
+    return asset.response(request, REVALIDATE)
 
 @app.get("/", response_class=HTMLResponse)
-async def index():
-    return FileResponse(str(static_dir / "index.html"))
+async def index(request: Request):
+    return _page("index.html", request)
 
 @app.get("/login", response_class=HTMLResponse)
-async def login_page():
-    return FileResponse(str(static_dir / "login.html"))
+async def login_page(request: Request):
+    return _page("login.html", request)
 
 @app.get("/register", response_class=HTMLResponse)
-async def register_page():
-    return FileResponse(str(static_dir / "register.html"))
+async def register_page(request: Request):
+    return _page("register.html", request)
 
 # @app.get("/api/ping")
 # async def ping():
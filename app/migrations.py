@@ -0,0 +1,122 @@
+"""Lightweight startup migrations: bring a database created by an older version up to date.
+
+``create_all()`` only creates missing tables, so columns, money conversions, indexes and derived
+data (fingerprints, budget spend counters) added later are applied here. ``migrate()`` runs for the directory database and every shard (see
+``ShardRouter.create_schema``) and is a no-op on a current schema.
+"""
+import sqlite3
+
+from sqlalchemy import bindparam, func, inspect, select, text, update
+from sqlalchemy.orm import Session
+from sqlalchemy.schema import CreateTable
+
+from . import models
+from .budgets import reconcile_spend
+from .duplicates import fingerprint
+
+
+def _add_missing_columns(conn, table: str, columns: dict):
+    """ALTER TABLE ADD COLUMN for every ``name: ddl`` pair the existing table lacks."""
+    existing = {c["name"] for c in inspect(conn).get_columns(table)}
+    for name, ddl in columns.items():
+        if name not in existing:
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {ddl}"))
+
+
+def _convert_to_cents(conn, table: str, old: str, new: str):
+    """Replace a decimal money column with integer minor units: add ``new``, backfill it, drop ``old``."""
+    existing = {c["name"] for c in inspect(conn).get_columns(table)}
+    if old not in existing:
+        return
+    if conn.dialect.name == "sqlite" and sqlite3.sqlite_version_info < (3, 35, 0):
+        raise RuntimeError(
+            f"Converting {table}.{old} to cents needs ALTER TABLE DROP COLUMN, i.e. SQLite 3.35 or newer "
+            f"(this Python uses {sqlite3.sqlite_version}); upgrade SQLite or migrate the database elsewhere"
+        )
+    if new not in existing:
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {new} BIGINT NOT NULL DEFAULT 0"))
+    conn.execute(text(f"UPDATE {table} SET {new} = ROUND({old} * 100)"))
+    conn.execute(text(f"ALTER TABLE {table} DROP COLUMN {old}"))
+
+
+def _backfill_fingerprints(conn, model, batch_size: int = 5000):
+    """Compute duplicate-detection fingerprints for rows created before the column existed."""
+    table = model.__table__
+    while True:
+        rows = conn.execute(
+            select(table.c.id, table.c.date, table.c.type, table.c.amount_cents, table.c.description)
+            .where(table.c.fingerprint.is_(None))
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            return
+        conn.execute(
+            update(table).where(table.c.id == bindparam("row_id")).values(fingerprint=bindparam("fp")),
+            [{"row_id": r.id, "fp": fingerprint(r.date, r.type, r.amount_cents, r.description)} for r in rows],
+        )
+
+
+def _never_reuse_transaction_ids(conn):
+    """Keep new transaction ids above every id ever handed out, including archived ones.
+
+    Tags and tombstones refer to archived rows by their original id. A SQLite table created
+    without AUTOINCREMENT is rebuilt with it; on every backend the id counter is then raised past
+    the largest archived id (MySQL 5.7 recomputes it from the hot table after a restart).
+    """
+    table = models.Transaction.__table__
+    top = conn.scalar(select(func.max(models.ArchivedTransaction.id))) or 0
+    if conn.dialect.name == "sqlite":
+        ddl = conn.scalar(text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'transactions'"))
+        if "AUTOINCREMENT" not in ddl.upper():
+            create = str(CreateTable(table).compile(dialect=conn.dialect)).strip()
+            existing = {c["name"] for c in inspect(conn).get_columns("transactions")}
+            columns = ", ".join(c.name for c in table.columns if c.name in existing)
+            conn.execute(text(create.replace("CREATE TABLE transactions ", "CREATE TABLE transactions_new ", 1)))
+            conn.execute(text(f"INSERT INTO transactions_new ({columns}) SELECT {columns} FROM transactions"))
+            conn.execute(text("DROP TABLE transactions"))
+            conn.execute(text("ALTER TABLE transactions_new RENAME TO transactions"))
+        top = max(top, conn.scalar(select(func.max(table.c.id))) or 0)
+        updated = conn.execute(
+            text("UPDATE sqlite_sequence SET seq = :top WHERE name = 'transactions' AND seq < :top"), {"top": top}
+        ).rowcount
+        if not updated and top and conn.scalar(text("SELECT COUNT(*) FROM sqlite_sequence WHERE name = 'transactions'")) == 0:
+            conn.execute(text("INSERT INTO sqlite_sequence (name, seq) VALUES ('transactions', :top)"), {"top": top})
+    elif conn.dialect.name == "mysql" and top:
+        # Ignored by MySQL when the counter is already higher
+        conn.execute(text(f"ALTER TABLE transactions AUTO_INCREMENT = {int(top) + 1}"))
+
+
+def migrate(engine):
+    """Add the columns, amounts in cents, fingerprints and indexes an older schema lacks.
+
+    Runs in one transaction; any failure rolls it back and is raised, so the app does not start
+    on a half-migrated database.
+    """
+    with engine.begin() as conn:
+        _add_missing_columns(conn, "categories", {
+            # per-user data scoping
+            "user_id": "INTEGER REFERENCES users(id) ON DELETE CASCADE",
+            # delta sync change sequence
+            "seq": "INTEGER NOT NULL DEFAULT 0",
+        })
+        _add_missing_columns(conn, "transactions", {
+            "user_id": "INTEGER REFERENCES users(id) ON DELETE CASCADE",
+            "seq": "INTEGER NOT NULL DEFAULT 0",
+            # duplicate detection
+            "fingerprint": "VARCHAR(40)",
+        })
+        _add_missing_columns(conn, "transactions_archive", {"fingerprint": "VARCHAR(40)"})
+        # amounts are stored as integer cents
+        _convert_to_cents(conn, "transactions", "amount", "amount_cents")
+        _convert_to_cents(conn, "budgets", "monthly_limit", "limit_cents")
+        _convert_to_cents(conn, "category_spend", "spent", "spent_cents")
+        for model in (models.Transaction, models.ArchivedTransaction):
+            _backfill_fingerprints(conn, model)
+        # Budget spend counters for transactions written before they existed (or drifted since)
+        with Session(bind=conn) as db:
+            reconcile_spend(db)
+        _never_reuse_transaction_ids(conn)
+        # create_all() skips indexes of tables that already existed
+        for table in (models.Category.__table__, models.Transaction.__table__, models.ArchivedTransaction.__table__):
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
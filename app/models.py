@@ -1,10 +1,11 @@
-from sqlalchemy import Column, Integer, String, DateTime, Enum, Numeric, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Enum, Boolean, ForeignKey, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from datetime import datetime
 import enum
 
 from .database import Base
+from .core.money import to_cents, from_cents
 
 
 class TxType(str, enum.Enum):
@@ -23,13 +24,24 @@ class User(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
 
+class UserShard(Base):
+    """Directory entry: the shard database holding a user's data (see shards.py)."""
+    __tablename__ = "user_shards"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    shard = Column(String(64), nullable=False, index=True)
+
+
 class Category(Base):
     __tablename__ = "categories"
+    __table_args__ = (Index("ix_categories_user_seq", "user_id", "seq"),)
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(100), nullable=False, unique=False)
     color = Column(String(32), nullable=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=True)
+    # Per-user change sequence of the last write, used by delta sync
+    seq = Column(Integer, nullable=False, default=0, server_default="0")
 
     # Do not cascade delete transactions when category is removed; we want to detach (set NULL)
     transactions = relationship("Transaction", back_populates="category", passive_deletes=True)
@@ -37,14 +49,216 @@ class Category(Base):
 
 class Transaction(Base):
     __tablename__ = "transactions"
+    __table_args__ = (
+        Index("ix_transactions_user_seq", "user_id", "seq"),
+        Index("ix_transactions_user_fingerprint", "user_id", "fingerprint"),
+        # Archived rows keep their ids, so SQLite must not hand out the ids of deleted rows again
+        {"sqlite_autoincrement": True},
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     category_id = Column(Integer, ForeignKey("categories.id", ondelete="SET NULL"), nullable=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=True)
     type = Column(Enum(TxType), nullable=False)
-    amount = Column(Numeric(10, 2), nullable=False)
+    # Minor units (cents); ``amount`` is the Decimal view used by schemas
+    amount_cents = Column(BigInteger, nullable=False)
     description = Column(String(255), nullable=True)
     date = Column(DateTime, default=datetime.utcnow, nullable=False)
     is_planned = Column(Boolean, default=False, nullable=False)
+    seq = Column(Integer, nullable=False, default=0, server_default="0")
+    # Duplicate-detection key over (day, type, amount, normalized description), see duplicates.py
+    fingerprint = Column(String(40), nullable=True)
 
     category = relationship("Category", back_populates="transactions")
+    tag_objects = relationship(
+        "Tag",
+        secondary="transaction_tags",
+        primaryjoin="foreign(TransactionTag.transaction_id) == Transaction.id",
+        secondaryjoin="Tag.id == foreign(TransactionTag.tag_id)",
+        order_by="Tag.name",
+        viewonly=True,
+    )
+
+    @property
+    def tags(self):
+        return [t.name for t in self.tag_objects]
+
+    @property
+    def amount(self):
+        return from_cents(self.amount_cents)
+
+    @amount.setter
+    def amount(self, value):
+        self.amount_cents = to_cents(value)
+
+
+class ArchivedTransaction(Base):
+    """Transaction moved out of the hot table by the archival job (see archive.py); edits move it back first."""
+    __tablename__ = "transactions_archive"
+    __table_args__ = (
+        Index("ix_transactions_archive_user_date", "user_id", "date"),
+        Index("ix_transactions_archive_user_fingerprint", "user_id", "fingerprint"),
+    )
+
+    # Original transaction id
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    category_id = Column(Integer, ForeignKey("categories.id", ondelete="SET NULL"), nullable=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=True)
+    type = Column(Enum(TxType), nullable=False)
+    amount_cents = Column(BigInteger, nullable=False)
+    description = Column(String(255), nullable=True)
+    date = Column(DateTime, nullable=False)
+    is_planned = Column(Boolean, default=False, nullable=False)
+    fingerprint = Column(String(40), nullable=True)
+
+    tag_objects = relationship(
+        "Tag",
+        secondary="transaction_tags",
+        primaryjoin="foreign(TransactionTag.transaction_id) == ArchivedTransaction.id",
+        secondaryjoin="Tag.id == foreign(TransactionTag.tag_id)",
+        order_by="Tag.name",
+        viewonly=True,
+    )
+
+    @property
+    def tags(self):
+        return [t.name for t in self.tag_objects]
+
+    @property
+    def amount(self):
+        return from_cents(self.amount_cents)
+
+
+class Tag(Base):
+    """Free-form per-user label; a transaction can carry any number of tags (see tags.py)."""
+    __tablename__ = "tags"
+    __table_args__ = (UniqueConstraint("user_id", "name", name="uq_tags_user_name"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    name = Column(String(50), nullable=False)
+
+
+class TransactionTag(Base):
+    """Transaction <-> tag link.
+
+    ``transaction_id`` has no foreign key because archived transactions keep their id and their
+    tags when they move to ``transactions_archive``. The primary key serves "tags of a
+    transaction", the reverse index serves tag filters as an index-only semi-join.
+    """
+    __tablename__ = "transaction_tags"
+    __table_args__ = (Index("ix_transaction_tags_tag_transaction", "tag_id", "transaction_id"),)
+
+    transaction_id = Column(Integer, primary_key=True)
+    tag_id = Column(Integer, ForeignKey("tags.id", ondelete="CASCADE"), primary_key=True)
+
+
+class TransactionSummary(Base):
+    """Income/expense totals of archived transactions per (user, category, month), for exact reports."""
+    __tablename__ = "transaction_summaries"
+    __table_args__ = (Index("ix_transaction_summaries_user_month", "user_id", "year", "month"),)
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    category_id = Column(Integer, ForeignKey("categories.id", ondelete="SET NULL"), nullable=True)
+    year = Column(Integer, nullable=False)
+    month = Column(Integer, nullable=False)
+    income_cents = Column(BigInteger, nullable=False, default=0)
+    expense_cents = Column(BigInteger, nullable=False, default=0)
+    count = Column(Integer, nullable=False, default=0)
+
+
+class ArchiveState(Base):
+    """Per-user archive boundary: every archived transaction is dated before ``archived_before``."""
+    __tablename__ = "archive_state"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    archived_before = Column(DateTime, nullable=False)
+
+
+class CategoryRule(Base):
+    """Auto-categorization rule: text pattern and/or type and amount range -> category (see categorize.py)."""
+    __tablename__ = "category_rules"
+    __table_args__ = (Index("ix_category_rules_user_priority", "user_id", "priority"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    category_id = Column(Integer, ForeignKey("categories.id", ondelete="CASCADE"), nullable=False)
+    kind = Column(String(16), nullable=False, default="keyword")  # "keyword" | "regex"
+    pattern = Column(String(255), nullable=True)
+    type = Column(Enum(TxType), nullable=True)
+    min_amount_cents = Column(BigInteger, nullable=True)
+    max_amount_cents = Column(BigInteger, nullable=True)
+    # Lower runs first; ties by id
+    priority = Column(Integer, nullable=False, default=100)
+    # Change sequence of the last write; (count, max seq) fingerprints a user's rule set
+    seq = Column(Integer, nullable=False, default=0)
+
+    @property
+    def min_amount(self):
+        return from_cents(self.min_amount_cents)
+
+    @min_amount.setter
+    def min_amount(self, value):
+        self.min_amount_cents = None if value is None else to_cents(value)
+
+    @property
+    def max_amount(self):
+        return from_cents(self.max_amount_cents)
+
+    @max_amount.setter
+    def max_amount(self, value):
+        self.max_amount_cents = None if value is None else to_cents(value)
+
+
+class Budget(Base):
+    __tablename__ = "budgets"
+    __table_args__ = (UniqueConstraint("user_id", "category_id", name="uq_budgets_user_category"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    category_id = Column(Integer, ForeignKey("categories.id", ondelete="CASCADE"), nullable=False)
+    limit_cents = Column(BigInteger, nullable=False)
+
+    @property
+    def monthly_limit(self):
+        return from_cents(self.limit_cents)
+
+    @monthly_limit.setter
+    def monthly_limit(self, value):
+        self.limit_cents = to_cents(value)
+
+
+class CategorySpend(Base):
+    """Running expense total per (user, category, month), kept in step with transaction writes."""
+    __tablename__ = "category_spend"
+    __table_args__ = (
+        UniqueConstraint("user_id", "category_id", "year", "month", name="uq_category_spend_user_category_month"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    category_id = Column(Integer, ForeignKey("categories.id", ondelete="CASCADE"), nullable=False)
+    year = Column(Integer, nullable=False)
+    month = Column(Integer, nullable=False)
+    spent_cents = Column(BigInteger, nullable=False, default=0)
+
+
+class ChangeCounter(Base):
+    """Last change sequence number handed out per user."""
+    __tablename__ = "change_counters"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    seq = Column(Integer, nullable=False, default=0)
+
+
+class Tombstone(Base):
+    """Record of a hard-deleted row so sync clients can drop it too."""
+    __tablename__ = "tombstones"
+    __table_args__ = (Index("ix_tombstones_user_seq", "user_id", "seq"),)
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    entity = Column(String(20), nullable=False)  # "transaction" | "category"
+    entity_id = Column(Integer, nullable=False)
+    seq = Column(Integer, nullable=False)
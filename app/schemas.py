@@ -1,5 +1,5 @@
-from pydantic import BaseModel, Field, condecimal, EmailStr
-from typing import Optional, Literal
+from pydantic import BaseModel, Field, condecimal, constr, EmailStr
+from typing import List, Optional, Literal
 from datetime import datetime, date
 
 
@@ -50,6 +50,7 @@ class Token(BaseModel):
 
 # Transaction Schemas
 TxTypeLiteral = Literal["income", "expense"]
+TagName = constr(strip_whitespace=True, to_lower=True, min_length=1, max_length=50)
 
 
 class TransactionBase(BaseModel):
@@ -59,6 +60,7 @@ class TransactionBase(BaseModel):
     description: Optional[str] = Field(None, max_length=255)
     date: datetime
     is_planned: bool = False
+    tags: List[TagName] = Field(default_factory=list, max_length=20)  # type: ignore
 
 
 class TransactionCreate(TransactionBase):
@@ -72,6 +74,8 @@ class TransactionUpdate(BaseModel):
     description: Optional[str] = Field(None, max_length=255)
     date: Optional[datetime] = None
     is_planned: Optional[bool] = None
+    # Replaces the transaction's tags when given
+    tags: Optional[List[TagName]] = Field(None, max_length=20)  # type: ignore
 
 
 class TransactionOut(TransactionBase):
@@ -81,6 +85,13 @@ class TransactionOut(TransactionBase):
         from_attributes = True
 
 
+class TransactionCreatedOut(TransactionOut):
+    # Remaining monthly budget of the transaction's category (None when no budget is set)
+    budget_remaining: Optional[condecimal(max_digits=12, decimal_places=2)] = None  # type: ignore
+    # Id of an already stored transaction with the same fingerprint (see duplicates.py)
+    duplicate_of: Optional[int] = None
+
+
 # Filters
 class TransactionFilters(BaseModel):
     type: Optional[TxTypeLiteral] = None
@@ -97,3 +108,79 @@ class BalanceOut(BaseModel):
     income: condecimal(max_digits=12, decimal_places=2)  # type: ignore
     expense: condecimal(max_digits=12, decimal_places=2)  # type: ignore
     net: condecimal(max_digits=12, decimal_places=2)  # type: ignore
+
+
+class DashboardOut(BaseModel):
+    user: UserOut
+    balance: BalanceOut
+    recent_transactions: List[TransactionOut]
+    categories: List[CategoryOut]
+
+
+# Budgets
+class BudgetSet(BaseModel):
+    monthly_limit: condecimal(max_digits=10, decimal_places=2, gt=0)  # type: ignore
+
+
+class BudgetOut(BaseModel):
+    category_id: int
+    monthly_limit: condecimal(max_digits=10, decimal_places=2)  # type: ignore
+
+    class Config:
+        from_attributes = True
+
+
+# Delta sync
+class SyncDeleted(BaseModel):
+    categories: List[int] = []
+    transactions: List[int] = []
+
+
+class SyncOut(BaseModel):
+    seq: int
+    categories: List[CategoryOut]
+    transactions: List[TransactionOut]
+    deleted: SyncDeleted
+
+
+# Categorization rules
+class RuleBase(BaseModel):
+    category_id: int
+    kind: Literal["keyword", "regex"] = "keyword"
+    pattern: Optional[str] = Field(None, max_length=255)
+    type: Optional[TxTypeLiteral] = None
+    min_amount: Optional[condecimal(max_digits=10, decimal_places=2)] = None  # type: ignore
+    max_amount: Optional[condecimal(max_digits=10, decimal_places=2)] = None  # type: ignore
+    priority: int = 100
+
+
+class RuleCreate(RuleBase):
+    pass
+
+
+class RuleUpdate(BaseModel):
+    category_id: Optional[int] = None
+    kind: Optional[Literal["keyword", "regex"]] = None
+    pattern: Optional[str] = Field(None, max_length=255)
+    type: Optional[TxTypeLiteral] = None
+    min_amount: Optional[condecimal(max_digits=10, decimal_places=2)] = None  # type: ignore
+    max_amount: Optional[condecimal(max_digits=10, decimal_places=2)] = None  # type: ignore
+    priority: Optional[int] = None
+
+
+class RuleOut(RuleBase):
+    id: int
+
+    class Config:
+        from_attributes = True
+
+
+class TransactionBulkCreate(BaseModel):
+    transactions: List[TransactionCreate] = Field(..., max_length=10000)
+
+
+# Tags
+class TagOut(BaseModel):
+    id: int
+    name: str
+    count: int
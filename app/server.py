@@ -0,0 +1,185 @@
+"""Preforking production server: one master, N uvicorn workers sharing a listening socket.
+
+    python -m app.server [--host 0.0.0.0] [--port 8000] [--workers N]
+
+``uvicorn --workers`` spawns fresh interpreters that each import the app and run the startup
+migration, concurrently. Here the master does the expensive part once: it imports the app, runs
+the schema setup, configures the ORM mappers and builds the OpenAPI schema, empties the
+connection pools (a pooled connection must not be shared by two processes) and only then forks.
+Workers inherit all of it copy-on-write and skip the schema setup. With several workers an
+in-memory ``CACHE_BACKEND`` is replaced by a fresh SQLite file shared by the workers, so a report
+computed by one worker is a hit for all of them; Google's OIDC metadata is shared the same way. The master restarts workers
+that die and forwards SIGTERM/SIGINT for a graceful shutdown.
+
+``--workers`` defaults to ``WEB_CONCURRENCY`` or the number of CPUs. Without ``os.fork``
+(Windows) or with one worker the app is served in-process.
+"""
+import argparse
+import logging
+import os
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+import time
+from typing import Dict, Optional
+
+import uvicorn
+
+log = logging.getLogger("app.server")
+
+# A worker dying sooner than this after its start is not restarted in a tight loop
+RESTART_BACKOFF = 1.0
+
+
+def default_workers() -> int:
+    return int(os.environ.get("WEB_CONCURRENCY") or os.cpu_count() or 1)
+
+
+def share_cache(workers: int) -> Optional[str]:
+    """Give forked workers shared cache files instead of per-process memory; return their directory.
+
+    The directory comes from ``mkdtemp`` (mode 0700), so only this user can read or plant entries:
+    the report cache if ``CACHE_BACKEND`` is in memory, and the OIDC metadata and keys if
+    ``OIDC_CACHE_DIR`` is not set. Call before the app is imported.
+    """
+    from .core.cache import cache, MemoryBackend, SQLiteBackend
+    from .core.config import settings
+
+    share_reports = isinstance(cache.backend, MemoryBackend)
+    if workers < 2 or not (share_reports or not settings.oidc_cache_dir):
+        return None
+    directory = tempfile.mkdtemp(prefix="budget-planner-cache-")
+    if share_reports:
+        cache.backend = SQLiteBackend(os.path.join(directory, "cache.db"))
+    if not settings.oidc_cache_dir:
+        settings.oidc_cache_dir = os.path.join(directory, "oidc")
+    return directory
+
+
+def warn_about_per_process_state(workers: int) -> None:
+    from .core.config import settings
+
+    if workers < 2:
+        return
+    if settings.rate_limit_enabled and not settings.rate_limit_backend.startswith(("redis://", "rediss://")):
+        log.warning("RATE_LIMIT_BACKEND=memory keeps one bucket per worker: limits are %dx looser", workers)
+    if not settings.events_broker.startswith(("redis://", "rediss://")):
+        log.warning("EVENTS_BROKER=local: live updates only reach clients of the worker that made the change")
+
+
+def preload():
+    """Import the app and prepare everything workers can inherit; return the ASGI app."""
+    from sqlalchemy.orm import configure_mappers
+
+    from . import main
+    from .shards import shard_router
+
+    main.setup_database()
+    configure_mappers()
+    main.app.openapi()
+    for engine in shard_router.engines.values():
+        engine.dispose()
+    return main.app
+
+
+def bind(host: str, port: int) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def serve(app, sock: socket.socket, log_level: str) -> None:
+    from .core.config import settings
+
+    config = uvicorn.Config(
+        app, log_level=log_level, proxy_headers=True, forwarded_allow_ips=settings.forwarded_allow_ips, lifespan="on"
+    )
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+class Master:
+    def __init__(self, app, sock: socket.socket, workers: int, log_level: str):
+        self.app = app
+        self.sock = sock
+        self.workers = workers
+        self.log_level = log_level
+        self.children: Dict[int, float] = {}
+        self.stopping = False
+
+    def spawn(self) -> None:
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            code = 0
+            try:
+                serve(self.app, self.sock, self.log_level)
+            except BaseException:
+                log.exception("Worker %d crashed", os.getpid())
+                code = 1
+            finally:
+                os._exit(code)
+        self.children[pid] = time.monotonic()
+
+    def stop(self, signum, frame) -> None:
+        self.stopping = True
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def run(self) -> None:
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        for _ in range(self.workers):
+            self.spawn()
+        log.info("Master %d started %d workers", os.getpid(), self.workers)
+        while self.children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            started = self.children.pop(pid, None)
+            if started is None or self.stopping:
+                continue
+            log.warning("Worker %d exited with status %d, restarting", pid, os.waitstatus_to_exitcode(status))
+            if time.monotonic() - started < RESTART_BACKOFF:
+                time.sleep(RESTART_BACKOFF)
+            if not self.stopping:
+                self.spawn()
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Budget Planner production server")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", 8000)))
+    parser.add_argument("--workers", type=int, default=default_workers())
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=args.log_level.upper(), format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    workers = max(args.workers, 1) if hasattr(os, "fork") else 1
+    cache_dir = share_cache(workers)
+    warn_about_per_process_state(workers)
+    app = preload()
+    sock = bind(args.host, args.port)
+    try:
+        if workers == 1:
+            serve(app, sock, args.log_level)
+        else:
+            Master(app, sock, workers, args.log_level).run()
+    finally:
+        sock.close()
+        if cache_dir:
+            shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,268 @@
+"""Per-user database sharding.
+
+The directory database (``DATABASE_URL``) keeps the ``users`` table and the ``user_shards`` map;
+everything a user owns (categories, transactions, budgets, sync state) lives on that user's shard.
+Every data query is already scoped by ``user_id``, so a request only ever touches one shard and
+each shard file has its own write lock.
+
+Configure shards with ``SHARDS="s1=sqlite:////data/shard1.db,s2=sqlite:////data/shard2.db"``.
+Without it the directory database is the only shard and nothing changes. New users are placed on
+the least-populated shard at registration; users without a directory entry (created before
+sharding was enabled) stay on the directory database, shard ``default``, until moved::
+
+    python -m app.shards stats
+    python -m app.shards move <user_id> <shard>
+    python -m app.shards rebalance
+"""
+import sys
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import select, func, delete
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, sessionmaker
+
+from . import models
+from .core.config import settings
+from .core.events import hub, RESYNC
+from .database import Base, engine, make_engine, pool_gate
+from .migrations import migrate
+
+DEFAULT_SHARD = "default"
+
+
+def parse_shards(spec: str) -> Dict[str, str]:
+    """``"name=url,name=url"`` -> ``{name: url}``."""
+    shards = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, sep, url = item.partition("=")
+        if not sep or not name.strip() or not url.strip():
+            raise ValueError(f"Invalid shard spec {item!r}, expected name=url")
+        shards[name.strip()] = url.strip()
+    return shards
+
+
+class ShardRouter:
+    """Engines, session factories and admission gates per shard, plus the user -> shard directory."""
+
+    def __init__(self, directory_engine, shard_engines: Optional[Dict[str, object]] = None):
+        self.engines = {DEFAULT_SHARD: directory_engine, **(shard_engines or {})}
+        self._sessions = {name: sessionmaker(autocommit=False, autoflush=False, bind=e) for name, e in self.engines.items()}
+        self._gates = {name: pool_gate(e) for name, e in self.engines.items()}
+        # New users are placed on the configured shards; the directory only keeps legacy users
+        self.placement = list(shard_engines or ()) or [DEFAULT_SHARD]
+
+    @classmethod
+    def from_urls(cls, directory_engine, urls: Dict[str, str]) -> "ShardRouter":
+        return cls(directory_engine, {name: make_engine(url) for name, url in urls.items()})
+
+    @property
+    def sharded(self) -> bool:
+        return len(self.engines) > 1
+
+    def create_schema(self) -> None:
+        """Create missing tables and run the startup migrations on the directory and every shard."""
+        for shard_engine in self.engines.values():
+            Base.metadata.create_all(bind=shard_engine)
+            migrate(shard_engine)
+
+    @contextmanager
+    def session(self, name: str):
+        if name not in self.engines:
+            raise HTTPException(status_code=503, detail="Shard unavailable")
+        gate = self._gates[name]
+        with gate.admit() if gate is not None else nullcontext():
+            db = self._sessions[name]()
+            try:
+                yield db
+            finally:
+                db.close()
+
+    def shard_of(self, directory: Session, user_id: int) -> Optional[str]:
+        return directory.scalar(select(models.UserShard.shard).where(models.UserShard.user_id == user_id))
+
+    def user_counts(self, directory: Session) -> Dict[str, int]:
+        counts = dict.fromkeys(self.engines, 0)
+        counts.update(directory.execute(
+            select(models.UserShard.shard, func.count()).group_by(models.UserShard.shard)
+        ).all())
+        return counts
+
+    def assign(self, directory: Session, user: models.User) -> str:
+        """Place a user on the least-populated shard and record it in the directory."""
+        counts = self.user_counts(directory)
+        name = min(self.placement, key=lambda n: (counts.get(n, 0), n))
+        with self.session(name) as db:
+            mirror_user(db, user)
+            db.commit()
+        directory.add(models.UserShard(user_id=user.id, shard=name))
+        try:
+            directory.commit()
+        except IntegrityError:
+            # A concurrent request placed the user first
+            directory.rollback()
+            return self.shard_of(directory, user.id)
+        return name
+
+    def locate(self, directory: Session, user_id: int) -> str:
+        return self.shard_of(directory, user_id) or DEFAULT_SHARD
+
+
+def mirror_user(db: Session, user: models.User) -> None:
+    """Keep a copy of the user row on a shard so foreign keys to ``users`` hold there.
+
+    Only the id matters; authentication always reads the directory.
+    """
+    if db.get(models.User, user.id) is not None:
+        return
+    db.add(models.User(
+        id=user.id,
+        email=user.email,
+        hashed_password=user.hashed_password,
+        is_active=user.is_active,
+        is_superuser=user.is_superuser,
+    ))
+    db.flush()
+
+
+shard_router = ShardRouter.from_urls(engine, parse_shards(settings.shards))
+
+
+def _copy(dst: Session, rows, make):
+    """Insert ``make(row)`` for every row; return {old id: new id} once the target assigned ids."""
+    pairs = [(row.id, make(row)) for row in rows]
+    dst.add_all(new for _, new in pairs)
+    dst.flush()
+    return {old: new.id for old, new in pairs}
+
+
+def move_user(router: ShardRouter, directory: Session, user_id: int, target: str) -> dict:
+    """Copy a user's data to ``target``, repoint the directory, then delete it from the source.
+
+    Row ids are reassigned by the target, so every moved row gets a fresh change sequence and
+    every id the user's clients may still hold is tombstoned (unless reused), which makes the
+    next delta sync converge on the moved state. Writes by the user during the move are lost;
+    run it while the user is idle.
+    """
+    if target not in router.engines:
+        raise ValueError(f"Unknown shard {target!r}")
+    user = directory.get(models.User, user_id)
+    if user is None:
+        raise ValueError(f"Unknown user {user_id}")
+    source = router.locate(directory, user_id)
+    if source == target:
+        return {"user_id": user_id, "source": source, "target": target, "moved": False}
+
+    mine = lambda model: select(model).where(model.user_id == user_id)  # noqa: E731
+    with router.session(source) as src, router.session(target) as dst:
+        seq = (src.scalar(select(models.ChangeCounter.seq).where(models.ChangeCounter.user_id == user_id)) or 0) + 1
+        categories = src.scalars(mine(models.Category)).all()
+        # Archived rows come back as hot rows on the target; the next archival run re-archives them
+        transactions = [*src.scalars(mine(models.Transaction)), *src.scalars(mine(models.ArchivedTransaction))]
+        tombstones = src.scalars(mine(models.Tombstone)).all()
+
+        mirror_user(dst, user)
+        cat_ids = _copy(dst, categories, lambda c: models.Category(
+            name=c.name, color=c.color, user_id=user_id, seq=seq,
+        ))
+        tx_ids = _copy(dst, transactions, lambda t: models.Transaction(
+            category_id=cat_ids.get(t.category_id), user_id=user_id, type=t.type, amount_cents=t.amount_cents,
+            description=t.description, date=t.date, is_planned=t.is_planned, seq=seq, fingerprint=t.fingerprint,
+        ))
+        tags = src.scalars(mine(models.Tag)).all()
+        tag_ids = _copy(dst, tags, lambda t: models.Tag(user_id=user_id, name=t.name))
+        links = src.scalars(select(models.TransactionTag).where(models.TransactionTag.tag_id.in_(list(tag_ids)))).all()
+        dst.add_all(
+            models.TransactionTag(transaction_id=tx_ids[link.transaction_id], tag_id=tag_ids[link.tag_id])
+            for link in links if link.transaction_id in tx_ids
+        )
+        dst.add_all(
+            models.Budget(user_id=user_id, category_id=cat_ids[b.category_id], limit_cents=b.limit_cents)
+            for b in src.scalars(mine(models.Budget)) if b.category_id in cat_ids
+        )
+        dst.add_all(
+            models.CategorySpend(user_id=user_id, category_id=cat_ids[s.category_id], year=s.year, month=s.month, spent_cents=s.spent_cents)
+            for s in src.scalars(mine(models.CategorySpend)) if s.category_id in cat_ids
+        )
+        dst.add_all(
+            models.CategoryRule(
+                user_id=user_id, category_id=cat_ids[r.category_id], kind=r.kind, pattern=r.pattern, type=r.type,
+                min_amount_cents=r.min_amount_cents, max_amount_cents=r.max_amount_cents, priority=r.priority, seq=seq,
+            )
+            for r in src.scalars(mine(models.CategoryRule)) if r.category_id in cat_ids
+        )
+        dst.merge(models.ChangeCounter(user_id=user_id, seq=seq))
+        for entity, new_ids in (("category", cat_ids), ("transaction", tx_ids)):
+            stale = {c.id for c in (categories if entity == "category" else transactions)}
+            stale |= {t.entity_id for t in tombstones if t.entity == entity}
+            stale -= set(new_ids.values())
+            dst.add_all(models.Tombstone(user_id=user_id, entity=entity, entity_id=i, seq=seq) for i in sorted(stale))
+        dst.commit()
+
+        entry = directory.get(models.UserShard, user_id)
+        if entry is None:
+            directory.add(models.UserShard(user_id=user_id, shard=target))
+        else:
+            entry.shard = target
+        directory.commit()
+
+        src.execute(delete(models.TransactionTag).where(models.TransactionTag.tag_id.in_(list(tag_ids))))
+        for model in (
+            models.Tag, models.Tombstone, models.CategorySpend, models.Budget, models.CategoryRule,
+            models.Transaction, models.ArchivedTransaction, models.TransactionSummary, models.ArchiveState,
+            models.Category, models.ChangeCounter,
+        ):
+            src.execute(delete(model).where(model.user_id == user_id))
+        src.commit()
+
+    hub.publish(user_id, RESYNC)
+    return {
+        "user_id": user_id,
+        "source": source,
+        "target": target,
+        "moved": True,
+        "categories": len(cat_ids),
+        "transactions": len(tx_ids),
+    }
+
+
+def rebalance(router: ShardRouter, directory: Session) -> list:
+    """Move users from the fullest to the emptiest placement shard until counts differ by at most one."""
+    moves = []
+    while True:
+        counts = router.user_counts(directory)
+        placement = {name: counts[name] for name in router.placement}
+        fullest = max(placement, key=placement.get)
+        emptiest = min(placement, key=placement.get)
+        if placement[fullest] - placement[emptiest] <= 1:
+            return moves
+        user_id = directory.scalar(
+            select(models.UserShard.user_id).where(models.UserShard.shard == fullest).order_by(models.UserShard.user_id.desc())
+        )
+        moves.append(move_user(router, directory, user_id, emptiest))
+
+
+def main(argv=None) -> int:
+    from .database import SessionLocal
+
+    args = list(sys.argv[1:] if argv is None else argv)
+    command = args.pop(0) if args else "stats"
+    shard_router.create_schema()
+    with SessionLocal() as directory:
+        if command == "stats":
+            for name, count in shard_router.user_counts(directory).items():
+                print(f"{name}\t{count}")
+        elif command == "move" and len(args) == 2:
+            print(move_user(shard_router, directory, int(args[0]), args[1]))
+        elif command == "rebalance":
+            for move in rebalance(shard_router, directory):
+                print(move)
+        else:
+            print(__doc__)
+            return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
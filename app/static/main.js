@@ -68,39 +68,40 @@ function setAuthLoading(loading) {
   if (logoutBtnEl) logoutBtnEl.disabled = loading;
 }
 
+function renderLoggedOut() {
+  if (authStatusEl) authStatusEl.textContent = 'Nie zalogowano';
+  if (logoutBtnEl) logoutBtnEl.style.display = 'none';
+  if (loginBtnEl) loginBtnEl.style.display = '';
+  if (registerBtnEl) registerBtnEl.style.display = '';
+  if (authEmail) authEmail.disabled = false;
+  if (authPassword) authPassword.disabled = false;
+  if (userEmailEl) { userEmailEl.style.display = 'none'; userEmailEl.textContent = ''; }
+}
+
+function renderUser(me) {
+  if (authStatusEl) authStatusEl.textContent = `Zalogowano jako: ${me.email}`;
+  if (userEmailEl) { userEmailEl.textContent = me.email; userEmailEl.style.display = ''; }
+  if (logoutBtnEl) logoutBtnEl.style.display = '';
+  if (loginBtnEl) loginBtnEl.style.display = 'none';
+  if (registerBtnEl) registerBtnEl.style.display = 'none';
+  if (authEmail) authEmail.disabled = true;
+  if (authPassword) authPassword.disabled = true;
+}
+
 async function updateAuthUI() {
   const token = getToken();
   // Do not early return if authStatusEl is missing; still toggle buttons on pages without status element
   if (!token) {
-    if (authStatusEl) authStatusEl.textContent = 'Nie zalogowano';
-    if (logoutBtnEl) logoutBtnEl.style.display = 'none';
-    if (loginBtnEl) loginBtnEl.style.display = '';
-    if (registerBtnEl) registerBtnEl.style.display = '';
-    if (authEmail) authEmail.disabled = false;
-    if (authPassword) authPassword.disabled = false;
-    if (userEmailEl) { userEmailEl.style.display = 'none'; userEmailEl.textContent = ''; }
+    renderLoggedOut();
     return;
   }
   try {
     const res = await authFetch('/api/auth/me');
     if (!res.ok) throw new Error('Token nieważny');
-    const me = await res.json();
-    if (authStatusEl) authStatusEl.textContent = `Zalogowano jako: ${me.email}`;
-    if (userEmailEl) { userEmailEl.textContent = me.email; userEmailEl.style.display = ''; }
-    if (logoutBtnEl) logoutBtnEl.style.display = '';
-    if (loginBtnEl) loginBtnEl.style.display = 'none';
-    if (registerBtnEl) registerBtnEl.style.display = 'none';
-    if (authEmail) authEmail.disabled = true;
-    if (authPassword) authPassword.disabled = true;
+    renderUser(await res.json());
   } catch (e) {
     clearToken();
-    if (authStatusEl) authStatusEl.textContent = 'Nie zalogowano';
-    if (logoutBtnEl) logoutBtnEl.style.display = 'none';
-    if (loginBtnEl) loginBtnEl.style.display = '';
-    if (registerBtnEl) registerBtnEl.style.display = '';
-    if (authEmail) authEmail.disabled = false;
-    if (authPassword) authPassword.disabled = false;
-    if (userEmailEl) { userEmailEl.style.display = 'none'; userEmailEl.textContent = ''; }
+    renderLoggedOut();
   }
 }
 
@@ -184,6 +185,8 @@ registerBtnEl?.addEventListener('click', async () => {
 });
 
 logoutBtnEl?.addEventListener('click', async () => {
+  liveEvents?.close();
+  liveEvents = null;
   clearToken();
   if (authStatusEl) authStatusEl.textContent = 'Wylogowano';
   await updateAuthUI();
@@ -191,44 +194,50 @@ logoutBtnEl?.addEventListener('click', async () => {
   try { if (window.location.pathname !== '/login') window.location.href = '/login'; } catch {}
 });
 
+function renderBalance(data) {
+  if (incomeEl) incomeEl.textContent = data.income;
+  if (expenseEl) expenseEl.textContent = data.expense;
+  if (netEl) {
+    netEl.textContent = data.net;
+    netEl.classList.toggle('ok', parseFloat(data.net) >= 0);
+    netEl.classList.toggle('err', parseFloat(data.net) < 0);
+  }
+}
+
 async function refreshBalance() {
   try {
     const res = await authFetch('/api/reports/balance');
     if (!res.ok) throw new Error(`HTTP ${res.status}`);
-    const data = await res.json();
-    if (incomeEl) incomeEl.textContent = data.income;
-    if (expenseEl) expenseEl.textContent = data.expense;
-    if (netEl) {
-      netEl.textContent = data.net;
-      netEl.classList.toggle('ok', parseFloat(data.net) >= 0);
-      netEl.classList.toggle('err', parseFloat(data.net) < 0);
-    }
+    renderBalance(await res.json());
   } catch (e) {
     console.error(e);
   }
 }
 
+function renderRecent(items) {
+  if (!txListEl) return;
+  if (!items.length) {
+    txListEl.innerHTML = '<li class="muted">Brak transakcji</li>';
+    return;
+  }
+  txListEl.innerHTML = items.map(tx => {
+    const sign = tx.type === 'income' ? '+' : '-';
+    const color = tx.type === 'income' ? 'style="color:#10b981"' : 'style="color:#ef4444"';
+    const amount = `${sign}${tx.amount}`;
+    const desc = tx.description ?? '';
+    const date = tx.date ? new Date(tx.date).toLocaleString() : '';
+    return `<li class="row" style="justify-content: space-between; border-bottom: 1px dashed rgba(255,255,255,0.12); padding: .35rem 0;">
+      <span>${desc ? desc : '<span class=\"muted\">(bez opisu)</span>'}<span class=\"muted\"> • ${date}</span></span>
+      <strong ${color}>${amount}</strong>
+    </li>`;
+  }).join('');
+}
+
 async function loadRecentTransactions() {
   try {
     const res = await authFetch('/api/transactions?limit=5');
     if (!res.ok) throw new Error(`HTTP ${res.status}`);
-    const items = await res.json();
-    if (!txListEl) return;
-    if (!items.length) {
-      txListEl.innerHTML = '<li class="muted">Brak transakcji</li>';
-      return;
-    }
-    txListEl.innerHTML = items.map(tx => {
-      const sign = tx.type === 'income' ? '+' : '-';
-      const color = tx.type === 'income' ? 'style="color:#10b981"' : 'style="color:#ef4444"';
-      const amount = `${sign}${tx.amount}`;
-      const desc = tx.description ?? '';
-      const date = tx.date ? new Date(tx.date).toLocaleString() : '';
-      return `<li class="row" style="justify-content: space-between; border-bottom: 1px dashed rgba(255,255,255,0.12); padding: .35rem 0;">
-        <span>${desc ? desc : '<span class=\"muted\">(bez opisu)</span>'}<span class=\"muted\"> • ${date}</span></span>
-        <strong ${color}>${amount}</strong>
-      </li>`;
-    }).join('');
+    renderRecent(await res.json());
   } catch (e) {
     console.error('Błąd ładowania transakcji:', e);
     if (txListEl) txListEl.innerHTML = `<li class="err">Nie udało się pobrać listy: ${e?.message ?? e}</li>`;
@@ -240,40 +249,45 @@ async function loadCategories() {
   try {
     const res = await authFetch('/api/categories');
     if (!res.ok) throw new Error(`HTTP ${res.status}`);
-    const cats = await res.json();
-    if (txCategory) {
-      txCategory.innerHTML = '<option value="">(Brak)</option>' + cats.map(c => `<option value="${c.id}">${c.name}</option>`).join('');
-    }
-    if (fCategory) {
-      fCategory.innerHTML = '<option value="">(Wszystkie)</option>' + cats.map(c => `<option value="${c.id}">${c.name}</option>`).join('');
-    }
-    if (catList) {
-      if (!cats.length) {
-        catList.innerHTML = '<li class="muted">Brak kategorii</li>';
-      } else {
-        catList.innerHTML = cats.map(c => `<li class="row" style="justify-content: space-between; border-bottom: 1px dashed rgba(255,255,255,0.12); padding:.35rem 0;">
-          <strong>${c.name}</strong>
-          <button data-del-cat="${c.id}" style="background:#ef4444; color:white; border-color:rgba(255,255,255,0.2)">Usuń</button>
-        </li>`).join('');
-        // attach delete listeners
-        catList.querySelectorAll('button[data-del-cat]')?.forEach(btn => {
-          btn.addEventListener('click', async (e) => {
-            const id = btn.getAttribute('data-del-cat');
-            if (!id) return;
-            if (!confirm('Usunąć kategorię? Transakcje zostaną odłączone.')) return;
-            const r = await authFetch(`/api/categories/${id}`, { method: 'DELETE' });
-            if (!r.ok && r.status !== 204) {
-              alert('Nie udało się usunąć kategorii');
-              return;
-            }
+    renderCategories(await res.json());
+  } catch (e) {
+    console.error('Błąd ładowania kategorii', e);
+  }
+}
+
+function renderCategories(cats) {
+  if (txCategory) {
+    txCategory.innerHTML = '<option value="">(Brak)</option>' + cats.map(c => `<option value="${c.id}">${c.name}</option>`).join('');
+  }
+  if (fCategory) {
+    fCategory.innerHTML = '<option value="">(Wszystkie)</option>' + cats.map(c => `<option value="${c.id}">${c.name}</option>`).join('');
+  }
+  if (catList) {
+    if (!cats.length) {
+      catList.innerHTML = '<li class="muted">Brak kategorii</li>';
+    } else {
+      catList.innerHTML = cats.map(c => `<li class="row" style="justify-content: space-between; border-bottom: 1px dashed rgba(255,255,255,0.12); padding:.35rem 0;">
+        <strong>${c.name}</strong>
+        <button data-del-cat="${c.id}" style="background:#ef4444; color:white; border-color:rgba(255,255,255,0.2)">Usuń</button>
+      </li>`).join('');
+      // attach delete listeners
+      catList.querySelectorAll('button[data-del-cat]')?.forEach(btn => {
+        btn.addEventListener('click', async (e) => {
+          const id = btn.getAttribute('data-del-cat');
+          if (!id) return;
+          if (!confirm('Usunąć kategorię? Transakcje zostaną odłączone.')) return;
+          const r = await authFetch(`/api/categories/${id}`, { method: 'DELETE' });
+          if (!r.ok && r.status !== 204) {
+            alert('Nie udało się usunąć kategorii');
+            return;
+          }
+          if (!isLive()) {
             await loadCategories();
             await refreshFiltered();
-          });
+          }
         });
-      }
+      });
     }
-  } catch (e) {
-    console.error('Błąd ładowania kategorii', e);
   }
 }
 
@@ -291,7 +305,9 @@ if (catForm) {
       if (!res.ok) throw new Error(`HTTP ${res.status}`);
       await res.json();
       catName.value = '';
-      await loadCategories();
+      if (!isLive()) {
+        await loadCategories();
+      }
     } catch (e) {
       alert('Nie udało się dodać kategorii: ' + (e?.message ?? e));
     }
@@ -326,9 +342,11 @@ if (txForm) {
       txAmount.value = '';
       txDesc.value = '';
       txPlanned.checked = false;
-      await refreshBalance();
-      await loadRecentTransactions();
-      await refreshFiltered();
+      if (!isLive()) {
+        await refreshBalance();
+        await loadRecentTransactions();
+        await refreshFiltered();
+      }
     } catch (e) {
       alert('Nie udało się dodać transakcji: ' + (e?.message ?? e));
     }
@@ -348,42 +366,48 @@ async function refreshFiltered() {
     if (fLimit?.value) params.set('limit', fLimit.value);
     const res = await authFetch('/api/transactions?' + params.toString());
     if (!res.ok) throw new Error(`HTTP ${res.status}`);
-    const items = await res.json();
-    if (!items.length) {
-      txFiltered.innerHTML = '<li class="muted">Brak wyników</li>';
-      return;
-    }
-    txFiltered.innerHTML = items.map(tx => {
-      const sign = tx.type === 'income' ? '+' : '-';
-      const color = tx.type === 'income' ? 'style="color:#10b981"' : 'style="color:#ef4444"';
-      const amount = `${sign}${tx.amount}`;
-      const desc = tx.description ?? '';
-      const date = tx.date ? new Date(tx.date).toLocaleString() : '';
-      const cat = tx.category_id ? '' : '<span class="muted">(brak kategorii)</span>';
-      return `<li class="row" style="justify-content: space-between; border-bottom: 1px dashed rgba(255,255,255,0.12); padding:.35rem 0;">
-        <span>${desc || '(bez opisu)'}<span class="muted"> • ${date}</span> ${cat}</span>
-        <span class="row" style="gap:.5rem;">
-          <strong ${color}>${amount}</strong>
-          <button data-del-tx="${tx.id}" title="Usuń" style="background:#ef4444; color:white; border-color:rgba(255,255,255,0.2)">Usuń</button>
-        </span>
-      </li>`;
-    }).join('');
-    // delete
-    txFiltered.querySelectorAll('button[data-del-tx]')?.forEach(btn => {
-      btn.addEventListener('click', async () => {
-        const id = btn.getAttribute('data-del-tx');
-        if (!id) return;
-        if (!confirm('Usunąć transakcję?')) return;
-        const r = await authFetch(`/api/transactions/${id}`, { method: 'DELETE' });
-        if (!r.ok && r.status !== 204) { alert('Nie udało się usunąć'); return; }
+    renderFiltered(await res.json());
+  } catch (e) {
+    txFiltered.innerHTML = `<li class="err">Błąd pobierania: ${e?.message ?? e}</li>`;
+  }
+}
+
+function renderFiltered(items) {
+  if (!txFiltered) return;
+  if (!items.length) {
+    txFiltered.innerHTML = '<li class="muted">Brak wyników</li>';
+    return;
+  }
+  txFiltered.innerHTML = items.map(tx => {
+    const sign = tx.type === 'income' ? '+' : '-';
+    const color = tx.type === 'income' ? 'style="color:#10b981"' : 'style="color:#ef4444"';
+    const amount = `${sign}${tx.amount}`;
+    const desc = tx.description ?? '';
+    const date = tx.date ? new Date(tx.date).toLocaleString() : '';
+    const cat = tx.category_id ? '' : '<span class="muted">(brak kategorii)</span>';
+    return `<li class="row" style="justify-content: space-between; border-bottom: 1px dashed rgba(255,255,255,0.12); padding:.35rem 0;">
+      <span>${desc || '(bez opisu)'}<span class="muted"> • ${date}</span> ${cat}</span>
+      <span class="row" style="gap:.5rem;">
+        <strong ${color}>${amount}</strong>
+        <button data-del-tx="${tx.id}" title="Usuń" style="background:#ef4444; color:white; border-color:rgba(255,255,255,0.2)">Usuń</button>
+      </span>
+    </li>`;
+  }).join('');
+  // delete
+  txFiltered.querySelectorAll('button[data-del-tx]')?.forEach(btn => {
+    btn.addEventListener('click', async () => {
+      const id = btn.getAttribute('data-del-tx');
+      if (!id) return;
+      if (!confirm('Usunąć transakcję?')) return;
+      const r = await authFetch(`/api/transactions/${id}`, { method: 'DELETE' });
+      if (!r.ok && r.status !== 204) { alert('Nie udało się usunąć'); return; }
+      if (!isLive()) {
         await refreshBalance();
         await loadRecentTransactions();
         await refreshFiltered();
-      });
+      }
     });
-  } catch (e) {
-    txFiltered.innerHTML = `<li class="err">Błąd pobierania: ${e?.message ?? e}</li>`;
-  }
+  });
 }
 
 if (fForm) {
@@ -443,10 +467,12 @@ async function clearAll() {
     const res = await authFetch('/api/debug/clear', { method: 'POST' });
     if (!res.ok) throw new Error(`HTTP ${res.status}`);
     await res.json();
-    await refreshBalance();
-    await loadRecentTransactions();
-    await loadCategories();
-    await refreshFiltered();
+    if (!isLive()) {
+      await refreshBalance();
+      await loadRecentTransactions();
+      await loadCategories();
+      await refreshFiltered();
+    }
     if (monthlyOut) monthlyOut.textContent = '(brak danych)';
     if (catReportOut) catReportOut.innerHTML = '';
   } catch (e) {
@@ -516,14 +542,92 @@ function readTokenFromQuery() {
   } catch {}
 }
 
+// Live updates pushed by the server (also reflects changes made on other devices)
+let liveEvents = null;
+let liveListsTimer = null;
+
+function isLive() {
+  return !!liveEvents && liveEvents.readyState === EventSource.OPEN;
+}
+
+function toCents(v) {
+  return Math.round(parseFloat(v || '0') * 100);
+}
+
+function applyBalanceDelta(delta) {
+  if (!incomeEl || !expenseEl) return;
+  const income = toCents(incomeEl.textContent) + toCents(delta.income);
+  const expense = toCents(expenseEl.textContent) + toCents(delta.expense);
+  renderBalance({
+    income: (income / 100).toFixed(2),
+    expense: (expense / 100).toFixed(2),
+    net: ((income - expense) / 100).toFixed(2),
+  });
+}
+
+function scheduleListsRefresh() {
+  // Coalesce bursts of events into one reload of the lists
+  clearTimeout(liveListsTimer);
+  liveListsTimer = setTimeout(() => { loadRecentTransactions(); refreshFiltered(); }, 250);
+}
+
+function connectLiveUpdates() {
+  const token = getToken();
+  if (!token || typeof EventSource === 'undefined' || liveEvents) return;
+  liveEvents = new EventSource('/api/events?token=' + encodeURIComponent(token));
+  let dropped = false;
+  const onTransaction = (e) => {
+    const d = JSON.parse(e.data);
+    if (d.balance_delta) applyBalanceDelta(d.balance_delta);
+    scheduleListsRefresh();
+  };
+  ['transaction.created', 'transaction.updated', 'transaction.deleted'].forEach(t => liveEvents.addEventListener(t, onTransaction));
+  ['category.created', 'category.updated'].forEach(t => liveEvents.addEventListener(t, () => loadCategories()));
+  liveEvents.addEventListener('category.deleted', () => { loadCategories(); scheduleListsRefresh(); });
+  liveEvents.addEventListener('resync', () => loadDashboard());
+  liveEvents.onerror = () => { dropped = true; };
+  // Events sent while reconnecting are lost, so reload everything after a reconnect
+  liveEvents.onopen = () => { if (dropped) { dropped = false; loadDashboard(); } };
+}
+
+// Whole main page state in one request: user, balance, recent transactions and categories
+async function loadDashboard() {
+  // recent_limit is capped at 100 by the API
+  const limit = Math.min(100, Math.max(5, parseInt(fLimit?.value || '5', 10) || 5));
+  const res = await authFetch(`/api/dashboard?recent_limit=${limit}`);
+  if (res.status === 401) {
+    clearToken();
+    window.location.href = '/login';
+    return false;
+  }
+  if (!res.ok) throw new Error(`HTTP ${res.status}`);
+  const d = await res.json();
+  renderUser(d.user);
+  renderBalance(d.balance);
+  renderRecent(d.recent_transactions.slice(0, 5));
+  renderCategories(d.categories);
+  // Filter form starts empty, so the newest transactions are also its initial result
+  renderFiltered(d.recent_transactions);
+  return true;
+}
+
 // Initial load
 (async function init() {
   // Handle OAuth fallback token before enforcing auth gate
   readTokenFromQuery();
+  const path = window.location.pathname;
+  if (path === '/' || path === '/index.html') {
+    if (!getToken()) {
+      window.location.href = '/login';
+      return;
+    }
+    try {
+      if (await loadDashboard()) connectLiveUpdates();
+    } catch (e) {
+      console.error('Błąd ładowania pulpitu:', e);
+    }
+    return;
+  }
   await ensureAuthGate();
   await updateAuthUI();
-  refreshBalance();
-  loadRecentTransactions();
-  loadCategories();
-  refreshFiltered();
 })();
@@ -0,0 +1,120 @@
+"""Free-form transaction tags: lookups, link maintenance and index-driven tag filters.
+
+Filters are semi-joins on ``transaction_tags`` (``id IN (SELECT transaction_id ... WHERE tag_id
+...)``): the reverse index (tag_id, transaction_id) answers them without touching the link table
+rows, and the transaction side is probed by primary key. "all" intersects one semi-join per tag.
+"""
+from typing import Dict, Iterable, List, Mapping, Optional
+
+from sqlalchemy import select, delete, insert, false
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from . import models
+
+MATCH_MODES = ("any", "all")
+
+
+def parse_tags(value: Optional[str]) -> List[str]:
+    """``"trip, Project-X"`` -> ``["trip", "project-x"]`` (normalized like stored names)."""
+    if not value:
+        return []
+    return unique(part.strip().lower() for part in value.split(",") if part.strip())
+
+
+def unique(names: Iterable[str]) -> List[str]:
+    return list(dict.fromkeys(names))
+
+
+def tag_ids(db: Session, user_id: int, names: Iterable[str], create: bool = False) -> Dict[str, int]:
+    """{name: id} for the user's tags with these names, creating missing ones when ``create``."""
+    names = unique(names)
+    if not names:
+        return {}
+    found = dict(db.execute(
+        select(models.Tag.name, models.Tag.id).where(models.Tag.user_id == user_id).where(models.Tag.name.in_(names))
+    ).all())
+    if create:
+        for name in names:
+            if name in found:
+                continue
+            try:
+                with db.begin_nested():
+                    tag = models.Tag(user_id=user_id, name=name)
+                    db.add(tag)
+                found[name] = tag.id
+            except IntegrityError:
+                # Created by a concurrent request
+                found[name] = db.scalar(
+                    select(models.Tag.id).where(models.Tag.user_id == user_id).where(models.Tag.name == name)
+                )
+    return found
+
+
+def set_tags(db: Session, user_id: int, tags_by_tx: Mapping[int, Iterable[str]]) -> None:
+    """Replace the tags of the given transactions (ids must already be flushed); the caller commits."""
+    if not tags_by_tx:
+        return
+    ids = tag_ids(db, user_id, (name for names in tags_by_tx.values() for name in names), create=True)
+    db.execute(delete(models.TransactionTag).where(models.TransactionTag.transaction_id.in_(list(tags_by_tx))))
+    links = [
+        {"transaction_id": tx_id, "tag_id": ids[name]}
+        for tx_id, names in tags_by_tx.items()
+        for name in unique(names)
+    ]
+    if links:
+        db.execute(insert(models.TransactionTag), links)
+
+
+def tags_by_transaction(db: Session, transaction_ids: Iterable[int]) -> Dict[int, List[str]]:
+    """{transaction id: sorted tag names} in one query."""
+    result: Dict[int, List[str]] = {}
+    ids = list(transaction_ids)
+    if not ids:
+        return result
+    rows = db.execute(
+        select(models.TransactionTag.transaction_id, models.Tag.name)
+        .join(models.Tag, models.Tag.id == models.TransactionTag.tag_id)
+        .where(models.TransactionTag.transaction_id.in_(ids))
+        .order_by(models.Tag.name)
+    )
+    for tx_id, name in rows:
+        result.setdefault(tx_id, []).append(name)
+    return result
+
+
+def user_tags_by_transaction(db: Session, user_id: int) -> Dict[int, List[str]]:
+    """{transaction id: sorted tag names} for all of the user's transactions, for full exports."""
+    result: Dict[int, List[str]] = {}
+    rows = db.execute(
+        select(models.TransactionTag.transaction_id, models.Tag.name)
+        .join(models.Tag, models.Tag.id == models.TransactionTag.tag_id)
+        .where(models.Tag.user_id == user_id)
+        .order_by(models.Tag.name)
+    )
+    for tx_id, name in rows:
+        result.setdefault(tx_id, []).append(name)
+    return result
+
+
+def tagged(model, ids: Iterable[int]):
+    """Semi-join: ``model`` rows linked to any of the tag ids."""
+    ids = list(ids)
+    links = models.TransactionTag
+    subquery = select(links.transaction_id).where(
+        links.tag_id == ids[0] if len(ids) == 1 else links.tag_id.in_(ids)
+    )
+    return model.id.in_(subquery)
+
+
+def filter_conditions(model, names: List[str], ids: Mapping[str, int], match: str = "any") -> list:
+    """Conditions restricting ``model`` to transactions with any/all of ``names`` (resolved in ``ids``)."""
+    if not names:
+        return []
+    if match == "all":
+        if len(ids) < len(names):
+            return [false()]
+        return [tagged(model, [ids[name]]) for name in names]
+    if not ids:
+        return [false()]
+    return [tagged(model, ids.values())]
@@ -0,0 +1,124 @@
+"""Throughput of ``python -m app.server`` by worker count.
+
+Starts the server on a throwaway SQLite database for each worker count, seeds one user with a few
+hundred transactions, then lets client processes (keep-alive connections) request a mix of a
+transaction page, the balance and the by-category report for a fixed time::
+
+    python scripts/bench_server.py [--workers 1,2,4] [--clients N] [--seconds 10]
+
+Worker counts default to powers of two up to the number of CPUs. The load generator runs on the
+same machine, so leave it cores (``--clients``) or scaling flattens early; on a machine with C
+cores, requests/s should grow close to linearly up to about C/2 workers with the default client
+count.
+"""
+import argparse
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+PATHS = ["/api/transactions?limit=50", "/api/reports/balance", "/api/reports/by-category"]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(workers: int, port: int, directory: str) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{os.path.join(directory, 'bench.db')}",
+        "RATE_LIMIT_ENABLED": "false",
+        "PYTHONPATH": ROOT,
+    }
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "app.server", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        env=env, cwd=directory, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/api/openapi.json", timeout=1)
+            return proc
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError("server did not start")
+
+
+def seed(base: str) -> str:
+    with httpx.Client(base_url=base) as c:
+        c.post("/api/auth/register", json={"email": "bench@example.com", "password": "S3cretPass!"})
+        token = c.post("/api/auth/login", data={"username": "bench@example.com", "password": "S3cretPass!"}).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        food = c.post("/api/categories", json={"name": "Jedzenie"}, headers=headers).json()["id"]
+        rows = [
+            {"type": "expense" if i % 5 else "income", "amount": f"{10 + i % 90}.{i % 100:02d}",
+             "description": f"Zakupy {i % 23}", "date": f"2024-{1 + i % 12:02d}-{1 + i % 28:02d}T10:00:00",
+             "category_id": food if i % 3 else None}
+            for i in range(500)
+        ]
+        c.post("/api/transactions/bulk", json={"transactions": rows}, headers=headers)
+    return token
+
+
+def client(base: str, token: str, seconds: float, results) -> None:
+    done = 0
+    with httpx.Client(base_url=base, headers={"Authorization": f"Bearer {token}"}) as c:
+        end = time.monotonic() + seconds
+        while time.monotonic() < end:
+            r = c.get(PATHS[done % len(PATHS)])
+            r.raise_for_status()
+            done += 1
+    results.put(done)
+
+
+def measure(workers: int, clients: int, seconds: float) -> float:
+    with tempfile.TemporaryDirectory() as directory:
+        port = free_port()
+        proc = start_server(workers, port, directory)
+        try:
+            base = f"http://127.0.0.1:{port}"
+            token = seed(base)
+            results = multiprocessing.Queue()
+            procs = [multiprocessing.Process(target=client, args=(base, token, seconds, results)) for _ in range(clients)]
+            for p in procs:
+                p.start()
+            total = sum(results.get() for _ in procs)
+            for p in procs:
+                p.join()
+            return total / seconds
+        finally:
+            proc.terminate()
+            proc.wait(timeout=30)
+
+
+def main() -> None:
+    cpus = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", default=",".join(str(1 << i) for i in range(cpus.bit_length()) if 1 << i <= cpus))
+    parser.add_argument("--clients", type=int, default=None, help="load processes (default: 2 per worker)")
+    parser.add_argument("--seconds", type=float, default=10)
+    args = parser.parse_args()
+
+    print(f"{cpus} CPUs")
+    print(f"{'workers':>7} {'clients':>7} {'req/s':>9} {'speedup':>8} {'per worker':>10}")
+    baseline = None
+    for workers in (int(w) for w in args.workers.split(",")):
+        clients = args.clients or 2 * workers
+        rate = measure(workers, clients, args.seconds)
+        baseline = baseline or rate
+        print(f"{workers:>7} {clients:>7} {rate:>9.0f} {rate / baseline:>7.2f}x {rate / baseline / workers:>9.0%}")
+
+
+if __name__ == "__main__":
+    main()
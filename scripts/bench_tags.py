@@ -0,0 +1,120 @@
+"""Tag filter benchmark: query plans and timings for tag filters and the by-tag report.
+
+Builds a throwaway SQLite database with one user, N transactions and 10 tags (every transaction
+carries 0-3 of them), then prints EXPLAIN QUERY PLAN and the median time of each query::
+
+    python scripts/bench_tags.py [transactions] [database file]
+
+The default is 1 000 000 transactions in a temporary file. Every plan should search
+``ix_transaction_tags_tag_transaction`` (tag -> transaction ids) and probe ``transactions`` by
+primary key; a ``SCAN transaction_tags`` line means a filter lost its index.
+"""
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from sqlalchemy import create_engine, insert, select, func, case, text  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from app import models, tags as tagging  # noqa: E402
+from app.database import Base  # noqa: E402
+
+TAGS = ["trip", "reimbursable", "project-x", "home", "car", "kids", "gift", "health", "work", "hobby"]
+USER_ID = 1
+BATCH = 50_000
+
+
+def populate(db: Session, count: int) -> None:
+    rnd = random.Random(42)
+    db.execute(insert(models.User), [{"id": USER_ID, "email": "bench@example.com", "hashed_password": "x"}])
+    db.execute(insert(models.Tag), [{"id": i + 1, "user_id": USER_ID, "name": name} for i, name in enumerate(TAGS)])
+    start = datetime(2015, 1, 1)
+    for first in range(1, count + 1, BATCH):
+        ids = range(first, min(first + BATCH, count + 1))
+        db.execute(insert(models.Transaction), [
+            {
+                "id": i, "user_id": USER_ID, "type": models.TxType.expense, "amount_cents": rnd.randint(100, 50_000),
+                "description": None, "date": start + timedelta(minutes=5 * i), "is_planned": False, "seq": 0,
+            }
+            for i in ids
+        ])
+        # Skewed tag popularity: "trip" is common, "hobby" rare
+        db.execute(insert(models.TransactionTag), [
+            {"transaction_id": i, "tag_id": tag_id}
+            for i in ids
+            for tag_id in {min(int(rnd.expovariate(0.4)), 9) + 1 for _ in range(rnd.randint(0, 3))}
+        ])
+    db.commit()
+    db.execute(text("ANALYZE"))
+
+
+def listing(names, match):
+    resolved = {name: TAGS.index(name) + 1 for name in names}
+    tx = models.Transaction
+    return (
+        select(tx.id)
+        .where(tx.user_id == USER_ID)
+        .where(*tagging.filter_conditions(tx, names, resolved, match))
+        .order_by(tx.date.desc())
+        .limit(100)
+    )
+
+
+def counting(names, match):
+    resolved = {name: TAGS.index(name) + 1 for name in names}
+    tx = models.Transaction
+    return select(func.count()).where(tx.user_id == USER_ID).where(*tagging.filter_conditions(tx, names, resolved, match))
+
+
+def by_tag():
+    tx, links = models.Transaction, models.TransactionTag
+    return (
+        select(models.Tag.name, func.sum(case((tx.type == models.TxType.expense, tx.amount_cents), else_=0)), func.count(tx.id))
+        .join(links, links.tag_id == models.Tag.id, isouter=True)
+        .join(tx, (tx.id == links.transaction_id) & (tx.user_id == USER_ID), isouter=True)
+        .where(models.Tag.user_id == USER_ID)
+        .group_by(models.Tag.id, models.Tag.name)
+    )
+
+
+def main(argv=None) -> int:
+    args = list(sys.argv[1:] if argv is None else argv)
+    count = int(args[0]) if args else 1_000_000
+    path = args[1] if len(args) > 1 else os.path.join(tempfile.mkdtemp(), "bench_tags.db")
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as db:
+        if not db.scalar(select(func.count()).select_from(models.Transaction)):
+            t0 = time.perf_counter()
+            populate(db, count)
+            print(f"populated {count} transactions in {time.perf_counter() - t0:.1f}s ({path})")
+        queries = {
+            "any(hobby) page": listing(["hobby"], "any"),
+            "any(trip) page": listing(["trip"], "any"),
+            "any(trip,hobby) count": counting(["trip", "hobby"], "any"),
+            "all(trip,hobby) count": counting(["trip", "hobby"], "all"),
+            "all(trip,reimbursable) page": listing(["trip", "reimbursable"], "all"),
+            "by-tag report": by_tag(),
+        }
+        for label, stmt in queries.items():
+            sql = str(stmt.compile(engine, compile_kwargs={"literal_binds": True}))
+            plan = [row[-1] for row in db.execute(text("EXPLAIN QUERY PLAN " + sql))]
+            times = []
+            for _ in range(5):
+                t0 = time.perf_counter()
+                db.execute(stmt).all()
+                times.append(time.perf_counter() - t0)
+            print(f"\n{label}: {statistics.median(times) * 1000:.1f} ms")
+            for line in plan:
+                print(f"  {line}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,7 +3,7 @@ import os
 os.environ.setdefault("DATABASE_URL", "sqlite://")
 
 import pytest
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 from fastapi.testclient import TestClient
@@ -12,6 +12,8 @@ from fastapi.testclient import TestClient
 from app.database import Base
 from app.main import app
 from app.database import get_db
+from app.core.ratelimit import limiter
+from app.core.cache import cache
 
 # Create a dedicated in-memory SQLite engine shared across connections
 TEST_ENGINE = create_engine(
@@ -54,6 +56,77 @@ def client(db_session):
             pass
 
     app.dependency_overrides[get_db] = override_get_db
+    # Every test starts with full rate-limit buckets (all TestClient requests share one IP)
+    limiter.backend.reset()
+    # User ids repeat across tests (every test rolls back), so cached entries would leak between them
+    cache.clear()
     with TestClient(app) as c:
         yield c
     app.dependency_overrides.clear()
+
+
+@pytest.fixture()
+def make_user(client):
+    """``make_user(email)`` registers and logs in a user and returns its ``Authorization`` headers."""
+    def make(email: str = "user@example.com", password: str = "S3cretPass!"):
+        r = client.post("/api/auth/register", json={"email": email, "password": password})
+        assert r.status_code == 201, r.text
+        r = client.post("/api/auth/login", data={"username": email, "password": password})
+        assert r.status_code == 200, r.text
+        return {"Authorization": f"Bearer {r.json()['access_token']}"}
+    return make
+
+
+@pytest.fixture()
+def auth_headers(make_user):
+    """Headers of a freshly registered ``user@example.com``."""
+    return make_user()
+
+
+class QueryCounter:
+    """Counts statements sent to ``TEST_ENGINE`` and rows returned by ORM selects while active.
+
+    Savepoint bookkeeping of the test transaction is not counted.
+    """
+
+    IGNORED = ("SAVEPOINT", "RELEASE SAVEPOINT", "ROLLBACK TO SAVEPOINT")
+
+    def __init__(self, engine, session):
+        self.engine = engine
+        self.session = session
+        self.statements = []
+        self.rows = 0
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def _on_statement(self, conn, cursor, statement, parameters, context, executemany):
+        if not statement.lstrip().upper().startswith(self.IGNORED):
+            self.statements.append(statement)
+
+    def _on_orm_execute(self, state):
+        if not state.is_select:
+            return None
+        frozen = state.invoke_statement().freeze()
+        self.rows += len(frozen.data)
+        return frozen()
+
+    def report(self) -> str:
+        return f"{self.count} statements, {self.rows} rows:\n" + "\n---\n".join(self.statements)
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._on_statement)
+        event.listen(self.session, "do_orm_execute", self._on_orm_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._on_statement)
+        event.remove(self.session, "do_orm_execute", self._on_orm_execute)
+        return False
+
+
+@pytest.fixture()
+def count_queries(db_session):
+    """``with count_queries() as q: ...`` then assert on ``q.count`` / ``q.rows`` (``q.report()`` lists the SQL)."""
+    return lambda: QueryCounter(TEST_ENGINE, db_session)
@@ -0,0 +1,71 @@
+import pytest
+from fastapi.testclient import TestClient
+
+analytics = pytest.importorskip("app.analytics")
+
+
+@pytest.fixture(autouse=True)
+def fresh_snapshots():
+    # Test databases are rolled back, so user ids and change sequences repeat between tests
+    analytics.snapshots.invalidate()
+    yield
+    analytics.snapshots.invalidate()
+
+
+def add_tx(client: TestClient, headers: dict, category_id, amount: str, date: str, type_: str = "expense"):
+    r = client.post(
+        "/api/transactions",
+        json={"category_id": category_id, "type": type_, "amount": amount, "description": "x", "date": date},
+        headers=headers,
+    )
+    assert r.status_code == 201, r.text
+    return r.json()
+
+
+def test_stats_percentiles_outliers_and_monthly_change(client: TestClient, auth_headers):
+    cat = client.post("/api/categories", json={"name": "Jedzenie"}, headers=auth_headers).json()
+    for amount in ["10.00", "20.00", "30.00", "40.00", "25.00"]:
+        add_tx(client, auth_headers, cat["id"], amount, "2024-01-10T12:00:00Z")
+    big = add_tx(client, auth_headers, cat["id"], "900.00", "2024-02-10T12:00:00Z")
+    add_tx(client, auth_headers, None, "5.50", "2024-03-01T12:00:00Z")
+    add_tx(client, auth_headers, cat["id"], "1000.00", "2024-01-01T12:00:00Z", type_="income")
+
+    r = client.get("/api/reports/stats", headers=auth_headers)
+    assert r.status_code == 200, r.text
+    data = r.json()
+    food = next(c for c in data["categories"] if c["category_id"] == cat["id"])
+    assert food["count"] == 6
+    assert food["median"] == "27.50"
+    assert food["total"] == "1025.00"
+    uncategorized = next(c for c in data["categories"] if c["category_id"] is None)
+    assert uncategorized["median"] == "5.50"
+    assert [o["id"] for o in data["outliers"]] == [big["id"]]
+
+    monthly = data["monthly"]
+    assert monthly["months"] == ["2024-01", "2024-02", "2024-03"]
+    assert monthly["expense"] == ["125.00", "900.00", "5.50"]
+    assert monthly["change"] == ["775.00", "-894.50"]
+
+
+def test_forecast_linear_trend_and_cache_invalidation(client: TestClient, auth_headers):
+    for month, amount in [(1, "100.00"), (2, "200.00"), (3, "300.00")]:
+        add_tx(client, auth_headers, None, amount, f"2024-0{month}-15T12:00:00Z")
+
+    r = client.get("/api/reports/forecast?months=2", headers=auth_headers)
+    assert r.status_code == 200, r.text
+    data = r.json()
+    assert data["method"] == "linear"
+    assert data["months"] == ["2024-04", "2024-05"]
+    assert data["expense"] == ["400.00", "500.00"]
+    assert data["net"] == ["-400.00", "-500.00"]
+
+    user_id = client.get("/api/auth/me", headers=auth_headers).json()["id"]
+    cached = analytics.snapshots._items[user_id]
+    client.get("/api/reports/stats", headers=auth_headers)
+    assert analytics.snapshots._items[user_id] is cached
+
+    # A write bumps the change sequence, so the next call reloads
+    add_tx(client, auth_headers, None, "100.00", "2024-04-15T12:00:00Z")
+    r = client.get("/api/reports/forecast?months=1", headers=auth_headers)
+    assert analytics.snapshots._items[user_id] is not cached
+    assert r.json()["months"] == ["2024-05"]
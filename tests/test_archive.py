@@ -0,0 +1,140 @@
+from datetime import datetime
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, func, insert, select
+from sqlalchemy.pool import StaticPool
+
+from app import models
+from app.archive import archive_database
+from app.database import Base
+from app.migrations import migrate
+
+
+def seed(client: TestClient, headers: dict):
+    food = client.post("/api/categories", json={"name": "Jedzenie"}, headers=headers).json()
+    home = client.post("/api/categories", json={"name": "Dom"}, headers=headers).json()
+    rows = [
+        (food["id"], "expense", "12.50", "2020-01-05T10:00:00"),
+        (food["id"], "expense", "7.25", "2020-01-20T10:00:00"),
+        (home["id"], "expense", "300.00", "2021-03-01T10:00:00"),
+        (None, "income", "2000.00", "2021-03-02T10:00:00"),
+        (None, "expense", "1.99", "2022-12-31T23:00:00"),
+        (food["id"], "expense", "40.00", "2024-05-01T10:00:00"),
+        (None, "income", "100.00", "2024-05-02T10:00:00"),
+    ]
+    ids = []
+    for category_id, tx_type, amount, date in rows:
+        r = client.post(
+            "/api/transactions",
+            json={"category_id": category_id, "type": tx_type, "amount": amount, "date": date},
+            headers=headers,
+        )
+        assert r.status_code == 201, r.text
+        ids.append(r.json()["id"])
+    return food, home, ids
+
+
+REPORTS = [
+    "/api/reports/balance",
+    "/api/reports/by-category",
+    "/api/reports/monthly?year=2020&month=1",
+    "/api/reports/monthly?year=2024&month=5",
+    "/api/reports/running-balance",
+    "/api/reports/running-balance?from=2024-01-01T00:00:00",
+    "/api/reports/running-balance?from=2021-01-01T00:00:00&granularity=year",
+    "/api/reports/pivot",
+    "/api/reports/pivot?from=2024-01-01T00:00:00&value=net",
+    "/api/transactions",
+    "/api/transactions?limit=2",
+    "/api/transactions?skip=1&limit=3",
+    "/api/transactions?date_from=2021-01-01T00:00:00&type=expense",
+    "/api/transactions?date_from=2024-01-01T00:00:00",
+    "/api/transactions?q=&category_id={food}",
+    "/api/budgets/status?year=2020&month=1",
+]
+
+
+def test_archival_keeps_reports_and_listings_exact(client: TestClient, db_session, auth_headers):
+    food, _, ids = seed(client, auth_headers)
+    client.put(f"/api/budgets/{food['id']}", json={"monthly_limit": "50.00"}, headers=auth_headers)
+    before = {url: client.get(url.format(food=food["id"]), headers=auth_headers).json() for url in REPORTS}
+
+    result = archive_database(db_session, horizon_days=365, now=datetime(2024, 6, 15))
+    assert result == {"cutoff": "2023-06-01T00:00:00", "users": 1, "transactions": 5}
+    assert db_session.scalar(select(func.count()).select_from(models.Transaction)) == 2
+    assert db_session.scalar(select(func.count()).select_from(models.ArchivedTransaction)) == 5
+
+    after = {url: client.get(url.format(food=food["id"]), headers=auth_headers).json() for url in REPORTS}
+    assert after == before
+
+    r = client.get(f"/api/transactions/{ids[0]}", headers=auth_headers)
+    assert r.status_code == 200 and r.json()["amount"] == "12.50"
+    assert client.post("/api/budgets/reconcile", headers=auth_headers).json() == {"corrected": 0}
+
+
+def test_deleting_category_moves_archived_totals_to_uncategorized(client: TestClient, db_session, auth_headers):
+    _, home, _ = seed(client, auth_headers)
+    archive_database(db_session, horizon_days=365, now=datetime(2024, 6, 15))
+
+    assert client.delete(f"/api/categories/{home['id']}", headers=auth_headers).status_code == 204
+    rows = client.get("/api/reports/by-category", headers=auth_headers).json()
+    uncategorized = rows[-1]
+    assert uncategorized["category_id"] is None
+    assert uncategorized["expense"] == "301.99"
+    assert uncategorized["income"] == "2100.00"
+
+
+def test_ids_of_archived_transactions_are_not_reused(client: TestClient, db_session, auth_headers):
+    seed(client, auth_headers)
+    old = {"type": "expense", "amount": "5.00", "date": "2019-01-01T10:00:00"}
+    archived_id = client.post("/api/transactions", json=old, headers=auth_headers).json()["id"]
+    archive_database(db_session, horizon_days=365, now=datetime(2024, 6, 15))
+
+    new = {"type": "expense", "amount": "6.00", "date": "2024-06-01T10:00:00"}
+    r = client.post("/api/transactions", json=new, headers=auth_headers)
+    assert r.json()["id"] > archived_id
+    assert client.get(f"/api/transactions/{archived_id}", headers=auth_headers).json()["amount"] == "5.00"
+
+
+def test_migration_stops_sqlite_from_reusing_archived_ids():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        # A database created before transactions used AUTOINCREMENT
+        conn.exec_driver_sql("DROP TABLE transactions")
+        conn.exec_driver_sql(
+            "CREATE TABLE transactions (id INTEGER PRIMARY KEY, category_id INTEGER, user_id INTEGER, "
+            "type VARCHAR(7) NOT NULL, amount_cents BIGINT NOT NULL, description VARCHAR(255), date DATETIME NOT NULL, "
+            "is_planned BOOLEAN NOT NULL, seq INTEGER NOT NULL DEFAULT 0, fingerprint VARCHAR(40))"
+        )
+        conn.exec_driver_sql("INSERT INTO transactions (id, type, amount_cents, date, is_planned) VALUES (3, 'income', 100, '2024-05-01', 0)")
+        conn.exec_driver_sql(
+            "INSERT INTO transactions_archive (id, type, amount_cents, date, is_planned) VALUES (7, 'expense', 100, '2019-05-01', 0)"
+        )
+    migrate(engine)
+    with engine.begin() as conn:
+        new_id = conn.execute(insert(models.Transaction).values(type="expense", amount_cents=1, date=datetime(2024, 6, 1))).inserted_primary_key[0]
+        indexes = {row[1] for row in conn.exec_driver_sql("PRAGMA index_list(transactions)")}
+    assert new_id == 8
+    assert "ix_transactions_user_seq" in indexes
+    engine.dispose()
+
+
+def test_archived_transactions_can_be_edited_and_deleted(client: TestClient, db_session, auth_headers):
+    food, home, ids = seed(client, auth_headers)
+    archive_database(db_session, horizon_days=365, now=datetime(2024, 6, 15))
+
+    r = client.put(f"/api/transactions/{ids[0]}", json={"amount": "20.00", "category_id": home["id"]}, headers=auth_headers)
+    assert r.status_code == 200, r.text
+    assert (r.json()["id"], r.json()["amount"]) == (ids[0], "20.00")
+    assert client.delete(f"/api/transactions/{ids[3]}", headers=auth_headers).status_code == 204
+    assert client.get(f"/api/transactions/{ids[3]}", headers=auth_headers).status_code == 404
+    assert db_session.get(models.ArchivedTransaction, ids[0]) is None
+
+    balance = client.get("/api/reports/balance", headers=auth_headers).json()
+    assert balance == {"income": "100.00", "expense": "369.24", "net": "-269.24"}
+    by_category = {r["category_id"]: r["expense"] for r in client.get("/api/reports/by-category", headers=auth_headers).json()}
+    assert by_category[food["id"]] == "47.25" and by_category[home["id"]] == "320.00"
+    jan = client.get("/api/reports/monthly?year=2020&month=1", headers=auth_headers).json()
+    assert jan["expense"] == "27.25"
+    assert client.post("/api/budgets/reconcile", headers=auth_headers).json() == {"corrected": 0}
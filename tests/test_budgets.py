@@ -0,0 +1,105 @@
+from datetime import datetime, timezone
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.pool import StaticPool
+
+from app import budgets, models, shards
+from app.database import Base
+from app.migrations import migrate
+
+
+def add_expense(client: TestClient, headers: dict, category_id: int, amount: str):
+    r = client.post(
+        "/api/transactions",
+        json={
+            "category_id": category_id,
+            "type": "expense",
+            "amount": amount,
+            "description": "x",
+            "date": datetime.now(timezone.utc).isoformat(),
+            "is_planned": False,
+        },
+        headers=headers,
+    )
+    assert r.status_code == 201, r.text
+    return r.json()
+
+
+def test_budget_remaining_tracks_create_update_delete(client: TestClient, auth_headers):
+    r = client.post("/api/categories", json={"name": "Jedzenie"}, headers=auth_headers)
+    cat = r.json()
+
+    r = client.put(f"/api/budgets/{cat['id']}", json={"monthly_limit": "500.00"}, headers=auth_headers)
+    assert r.status_code == 200, r.text
+
+    tx = add_expense(client, auth_headers, cat["id"], "120.00")
+    assert tx["budget_remaining"] == "380.00"
+    tx2 = add_expense(client, auth_headers, cat["id"], "30.00")
+    assert tx2["budget_remaining"] == "350.00"
+
+    r = client.put(f"/api/transactions/{tx['id']}", json={"amount": "100.00"}, headers=auth_headers)
+    assert r.status_code == 200
+    r = client.delete(f"/api/transactions/{tx2['id']}", headers=auth_headers)
+    assert r.status_code == 204
+
+    r = client.get("/api/budgets/status", headers=auth_headers)
+    assert r.status_code == 200
+    rows = r.json()["categories"]
+    assert rows == [{
+        "category_id": cat["id"],
+        "category_name": "Jedzenie",
+        "limit": "500.00",
+        "spent": "100.00",
+        "remaining": "400.00",
+    }]
+
+
+def test_reconcile_corrects_counter_drift(client: TestClient, db_session, auth_headers):
+    cat = client.post("/api/categories", json={"name": "Transport"}, headers=auth_headers).json()
+    client.put(f"/api/budgets/{cat['id']}", json={"monthly_limit": "100.00"}, headers=auth_headers)
+    add_expense(client, auth_headers, cat["id"], "40.00")
+
+    # Simulate drift
+    db_session.query(models.CategorySpend).update({models.CategorySpend.spent_cents: 99900})
+    db_session.commit()
+
+    r = client.post("/api/budgets/reconcile", headers=auth_headers)
+    assert r.status_code == 200
+    assert r.json()["corrected"] == 1
+
+    r = client.get("/api/budgets/status", headers=auth_headers)
+    assert r.json()["categories"][0]["spent"] == "40.00"
+
+
+def _engine_with_uncounted_expenses():
+    # Transactions written before spend counters existed
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(insert(models.Transaction), [
+            {"user_id": 1, "category_id": 3, "type": models.TxType.expense, "amount_cents": 1250, "date": datetime(2024, 5, 1)},
+            {"user_id": 1, "category_id": 3, "type": models.TxType.expense, "amount_cents": 750, "date": datetime(2024, 5, 9)},
+            {"user_id": 1, "category_id": 3, "type": models.TxType.income, "amount_cents": 9900, "date": datetime(2024, 5, 9)},
+        ])
+    return engine
+
+
+def spent(engine):
+    with engine.connect() as conn:
+        return conn.execute(select(models.CategorySpend.year, models.CategorySpend.month, models.CategorySpend.spent_cents)).all()
+
+
+def test_migration_fills_spend_counters_of_existing_transactions():
+    engine = _engine_with_uncounted_expenses()
+    migrate(engine)
+    assert spent(engine) == [(2024, 5, 2000)]
+    engine.dispose()
+
+
+def test_reconcile_job_runs_on_every_shard(monkeypatch, capsys):
+    engine = _engine_with_uncounted_expenses()
+    monkeypatch.setattr(shards, "shard_router", shards.ShardRouter(engine))
+    assert budgets.main([]) == 0
+    assert capsys.readouterr().out == "default {'corrected': 1}\n"
+    assert spent(engine) == [(2024, 5, 2000)]
+    engine.dispose()
@@ -0,0 +1,95 @@
+import os
+import shutil
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import server
+from app.core.cache import Cache, MemoryBackend, SQLiteBackend, cache
+from app.core.config import settings
+
+
+def test_memory_backend_expires_and_evicts():
+    backend = MemoryBackend(max_items=2)
+    backend.set("a", "1", ttl=60)
+    backend.set("b", "2", ttl=0.01)
+    time.sleep(0.02)
+    assert backend.get("b") is None
+    backend.set("c", "3", ttl=60)
+    backend.set("d", "4", ttl=60)
+    assert backend.get("a") is None and backend.get("d") == "4"
+
+
+def test_sqlite_backend_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / "cache.db")
+    writer, reader = Cache(SQLiteBackend(path)), Cache(SQLiteBackend(path))
+    writer.set("report", {"income": "10.00"}, ttl=60)
+    assert reader.get("report") == {"income": "10.00"}
+    writer.set("short", [1], ttl=-1)
+    assert reader.get("short") is None
+
+
+def test_reports_are_cached_until_the_next_write(client: TestClient, count_queries, auth_headers):
+    tx = {"type": "income", "amount": "100.00", "description": "Pensja", "date": "2024-05-01T10:00:00"}
+    client.post("/api/transactions", json=tx, headers=auth_headers)
+
+    assert client.get("/api/reports/balance", headers=auth_headers).json()["income"] == "100.00"
+    with count_queries() as q:
+        assert client.get("/api/reports/balance", headers=auth_headers).json()["income"] == "100.00"
+    assert q.count == 2  # authentication and the change sequence
+
+    client.post("/api/transactions", json=tx, headers=auth_headers)
+    assert client.get("/api/reports/balance", headers=auth_headers).json()["income"] == "200.00"
+    assert client.get("/api/dashboard", headers=auth_headers).json()["balance"]["income"] == "200.00"
+
+
+def test_cached_reports_follow_writes_made_by_other_processes(client: TestClient, monkeypatch, auth_headers):
+    # Another worker keeps its own memory backend; only the database is shared
+    monkeypatch.setattr(cache, "backend", MemoryBackend())
+    tx = {"type": "expense", "amount": "10.00", "date": "2024-05-01T10:00:00"}
+    client.post("/api/transactions", json=tx, headers=auth_headers)
+    assert client.get("/api/reports/balance", headers=auth_headers).json()["expense"] == "10.00"
+
+    other_worker = cache.backend
+    monkeypatch.setattr(cache, "backend", MemoryBackend())
+    client.post("/api/transactions", json=tx, headers=auth_headers)
+    monkeypatch.setattr(cache, "backend", other_worker)
+    assert client.get("/api/reports/balance", headers=auth_headers).json()["expense"] == "20.00"
+
+
+def test_report_cache_can_be_disabled(client: TestClient, count_queries, monkeypatch, auth_headers):
+    monkeypatch.setattr(settings, "report_cache_ttl", 0)
+    client.get("/api/reports/by-category", headers=auth_headers)
+    with count_queries() as q:
+        client.get("/api/reports/by-category", headers=auth_headers)
+    assert q.count == 3
+
+
+def test_auth_cache_skips_the_user_lookup(client: TestClient, count_queries, monkeypatch, auth_headers):
+    monkeypatch.setattr(settings, "auth_cache_ttl", 30)
+    me = client.get("/api/auth/me", headers=auth_headers).json()
+    with count_queries() as q:
+        assert client.get("/api/auth/me", headers=auth_headers).json() == me
+    assert q.count == 0
+
+
+def test_forked_workers_get_a_shared_cache(monkeypatch):
+    monkeypatch.setattr(cache, "backend", MemoryBackend())
+    monkeypatch.setattr(settings, "oidc_cache_dir", "")
+    assert server.share_cache(1) is None
+    directory = server.share_cache(4)
+    try:
+        assert isinstance(cache.backend, SQLiteBackend)
+        assert cache.backend.path.startswith(directory)
+        assert settings.oidc_cache_dir == os.path.join(directory, "oidc")
+        assert os.stat(directory).st_mode & 0o777 == 0o700
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+@pytest.mark.parametrize("env,expected", [({"WEB_CONCURRENCY": "3"}, 3), ({"WEB_CONCURRENCY": ""}, None)])
+def test_default_worker_count(monkeypatch, env, expected):
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    assert server.default_workers() == (expected or os.cpu_count() or 1)
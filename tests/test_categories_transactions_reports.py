@@ -1,5 +1,11 @@
 from datetime import datetime, timezone, timedelta
+import pytest
 from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.pool import StaticPool
+
+from app import migrations
+from app.database import Base
 
 
 def auth_header(token: str):
@@ -188,3 +194,182 @@ def test_debug_clear_removes_user_data_only(client: TestClient):
     assert r.status_code == 200
     cats2 = r.json()
     assert len(cats2) == 1 and cats2[0]["name"] == "C2"
+
+
+def test_running_balance_series(client: TestClient):
+    token = register_and_login(client, email="running@example.com")
+
+    def add(tx_type: str, amount: str, when: datetime):
+        r = client.post(
+            "/api/transactions",
+            json={"type": tx_type, "amount": amount, "date": when.isoformat(), "is_planned": False},
+            headers=auth_header(token),
+        )
+        assert r.status_code == 201, r.text
+
+    add("income", "1000.00", datetime(2024, 1, 10, tzinfo=timezone.utc))
+    add("expense", "200.00", datetime(2024, 2, 5, tzinfo=timezone.utc))
+    add("expense", "50.00", datetime(2024, 2, 20, tzinfo=timezone.utc))
+    add("income", "300.00", datetime(2024, 4, 1, tzinfo=timezone.utc))
+
+    r = client.get("/api/reports/running-balance?granularity=month", headers=auth_header(token))
+    assert r.status_code == 200, r.text
+    data = r.json()
+    assert data["opening"] == "0"
+    assert data["periods"] == ["2024-01", "2024-02", "2024-04"]
+    assert data["net"] == ["1000.00", "-250.00", "300.00"]
+    assert data["balance"] == ["1000.00", "750.00", "1050.00"]
+
+    # Opening balance covers everything before `from`
+    r = client.get(
+        "/api/reports/running-balance",
+        params={"from": "2024-02-01T00:00:00", "to": "2024-02-28T23:59:59"},
+        headers=auth_header(token),
+    )
+    data = r.json()
+    assert data["opening"] == "1000.00"
+    assert data["periods"] == ["2024-02"]
+    assert data["balance"] == ["750.00"]
+
+
+def test_dashboard_bundles_main_page_data(client: TestClient):
+    token = register_and_login(client, email="dash@example.com")
+    cat = client.post("/api/categories", json={"name": "Dom"}, headers=auth_header(token)).json()
+    for i in range(7):
+        r = client.post(
+            "/api/transactions",
+            json={
+                "category_id": cat["id"],
+                "type": "income" if i == 0 else "expense",
+                "amount": "100.00" if i == 0 else "10.00",
+                "date": datetime(2024, 1, i + 1, tzinfo=timezone.utc).isoformat(),
+                "is_planned": False,
+            },
+            headers=auth_header(token),
+        )
+        assert r.status_code == 201
+
+    r = client.get("/api/dashboard", headers=auth_header(token))
+    assert r.status_code == 200, r.text
+    d = r.json()
+    assert d["user"]["email"] == "dash@example.com"
+    assert d["balance"] == client.get("/api/reports/balance", headers=auth_header(token)).json()
+    assert d["balance"]["net"] == "40.00"
+    assert len(d["recent_transactions"]) == 5
+    assert d["recent_transactions"][0]["date"].startswith("2024-01-07")
+    assert [c["name"] for c in d["categories"]] == ["Dom"]
+
+    assert client.get("/api/dashboard").status_code == 401
+
+
+def test_week_periods_are_iso_weeks(client: TestClient):
+    token = register_and_login(client, email="weeks@example.com")
+    # Sunday 2021-01-03 is in 2020-W53, Monday 2024-12-30 already in 2025-W01
+    for day in ("2021-01-03", "2021-01-04", "2021-01-19", "2024-12-30"):
+        r = client.post(
+            "/api/transactions",
+            json={"type": "expense", "amount": "1.00", "date": f"{day}T12:00:00"},
+            headers=auth_header(token),
+        )
+        assert r.status_code == 201, r.text
+
+    r = client.get("/api/reports/running-balance?granularity=week", headers=auth_header(token)).json()
+    assert r["periods"] == ["2020-W53", "2021-W01", "2021-W03", "2025-W01"]
+    p = client.get("/api/reports/pivot?cols=week&to=2021-01-31T00:00:00", headers=auth_header(token)).json()
+    assert p["columns"] == ["2020-W53", "2021-W01", "2021-W02", "2021-W03"]
+    assert p["col_totals"] == ["1.00", "1.00", "0", "1.00"]
+
+
+def test_pivot_category_by_month_matrix(client: TestClient):
+    token = register_and_login(client, email="pivot@example.com")
+    food = client.post("/api/categories", json={"name": "Jedzenie"}, headers=auth_header(token)).json()
+    car = client.post("/api/categories", json={"name": "Auto"}, headers=auth_header(token)).json()
+
+    def add(category_id, tx_type, amount, month):
+        r = client.post(
+            "/api/transactions",
+            json={
+                "category_id": category_id,
+                "type": tx_type,
+                "amount": amount,
+                "date": datetime(2024, month, 15, tzinfo=timezone.utc).isoformat(),
+                "is_planned": False,
+            },
+            headers=auth_header(token),
+        )
+        assert r.status_code == 201
+
+    add(food["id"], "expense", "10.00", 1)
+    add(food["id"], "expense", "5.50", 1)
+    add(car["id"], "expense", "100.00", 3)
+    add(None, "expense", "1.00", 3)
+    add(food["id"], "income", "999.00", 1)  # not part of the expense matrix
+
+    r = client.get("/api/reports/pivot?rows=category&cols=month", headers=auth_header(token))
+    assert r.status_code == 200, r.text
+    p = r.json()
+    assert p["columns"] == ["2024-01", "2024-02", "2024-03"]
+    assert p["row_labels"] == ["Auto", "Jedzenie", "(Brak kategorii)"]
+    assert p["row_keys"] == [car["id"], food["id"], None]
+    assert p["values"] == [["0", "0", "100.00"], ["15.50", "0", "0"], ["0", "0", "1.00"]]
+    assert p["row_totals"] == ["100.00", "15.50", "1.00"]
+    assert p["col_totals"] == ["15.50", "0", "101.00"]
+    assert p["total"] == "116.50"
+
+
+def test_amounts_stored_as_cents_and_summed_exactly(client: TestClient, db_session):
+    from app import models
+
+    token = register_and_login(client, email="cents@example.com")
+    date = datetime(2024, 6, 1, tzinfo=timezone.utc).isoformat()
+    for amount in ["0.1", "0.2", "0.10", "99999999.99"]:
+        r = client.post(
+            "/api/transactions",
+            json={"type": "expense", "amount": amount, "date": date},
+            headers=auth_header(token),
+        )
+        assert r.status_code == 201, r.text
+    assert r.json()["amount"] == "99999999.99"
+
+    stored = db_session.query(models.Transaction.amount_cents).order_by(models.Transaction.id).all()
+    assert [c for (c,) in stored] == [10, 20, 10, 9999999999]
+
+    r = client.get("/api/reports/balance", headers=auth_header(token))
+    assert r.json() == {"income": "0", "expense": "100000000.39", "net": "-100000000.39"}
+    r = client.get("/api/reports/monthly?year=2024&month=6", headers=auth_header(token))
+    assert r.json()["expense"] == "100000000.39"
+
+
+def _legacy_money_engine():
+    # Database from before amounts were stored in cents: budgets.monthly_limit is a decimal
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("DROP TABLE budgets")
+        conn.exec_driver_sql(
+            "CREATE TABLE budgets (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, category_id INTEGER NOT NULL, "
+            "monthly_limit NUMERIC(12, 2) NOT NULL)"
+        )
+        conn.exec_driver_sql("INSERT INTO budgets (user_id, category_id, monthly_limit) VALUES (1, 1, 123.45)")
+    return engine
+
+
+def test_money_migration_converts_decimal_columns():
+    engine = _legacy_money_engine()
+    migrations.migrate(engine)
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("SELECT * FROM budgets").mappings().one() == {
+            "id": 1, "user_id": 1, "category_id": 1, "limit_cents": 12345,
+        }
+    engine.dispose()
+
+
+def test_money_migration_refuses_sqlite_without_drop_column(monkeypatch):
+    engine = _legacy_money_engine()
+    monkeypatch.setattr(migrations.sqlite3, "sqlite_version_info", (3, 31, 1))
+    with pytest.raises(RuntimeError, match="SQLite 3.35"):
+        migrations.migrate(engine)
+    with engine.connect() as conn:
+        # Nothing was applied
+        assert [row[1] for row in conn.exec_driver_sql("PRAGMA table_info(budgets)")][-1] == "monthly_limit"
+    engine.dispose()
@@ -0,0 +1,68 @@
+from datetime import datetime, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import columnar
+from app.archive import archive_database
+
+
+def seed(client: TestClient, headers: dict):
+    food = client.post("/api/categories", json={"name": "Jedzenie"}, headers=headers).json()["id"]
+    rows = [
+        {"type": "expense", "amount": "12.50", "description": "Żabka", "date": "2020-01-05T10:00:00", "category_id": food, "tags": ["trip"]},
+        {"type": "income", "amount": "5000.00", "description": "Pensja", "date": "2024-05-02T00:00:00"},
+        {"type": "expense", "amount": "4.05", "description": "Kawa", "date": "2024-05-03T08:30:00", "category_id": food},
+    ]
+    client.post("/api/transactions/bulk", json={"transactions": rows}, headers=headers)
+    return food
+
+
+def test_columnar_list_matches_objects(client: TestClient, auth_headers):
+    food = seed(client, auth_headers)
+    objects = client.get("/api/transactions", headers=auth_headers).json()
+    r = client.get("/api/transactions?format=columnar", headers=auth_headers)
+    assert r.status_code == 200
+    cols = r.json()
+    assert cols["count"] == 3
+    assert cols["id"] == [o["id"] for o in objects]
+    assert cols["amount_cents"] == [405, 500000, 1250]
+    assert [cols["types"][t] for t in cols["type"]] == ["expense", "income", "expense"]
+    assert cols["category_id"] == [food, None, food]
+    assert cols["date"][0] == int(datetime(2024, 5, 3, 8, 30, tzinfo=timezone.utc).timestamp())
+    assert cols["tags"] == [[], [], ["trip"]]
+    assert len(r.content) < len(client.get("/api/transactions", headers=auth_headers).content)
+
+
+def test_export_includes_archive_oldest_first(client: TestClient, db_session, auth_headers):
+    seed(client, auth_headers)
+    archive_database(db_session, horizon_days=365, now=datetime(2024, 6, 1))
+
+    objects = client.get("/api/transactions/export", headers=auth_headers).json()
+    assert [o["amount"] for o in objects] == ["12.50", "5000.00", "4.05"]
+    assert objects[0]["tags"] == ["trip"]
+
+    cols = client.get("/api/transactions/export?format=columnar", headers=auth_headers).json()
+    assert cols["id"] == [o["id"] for o in objects]
+    assert cols["amount_cents"] == [1250, 500000, 405]
+
+    cols = client.get("/api/transactions/export?format=columnar&date_from=2024-01-01T00:00:00", headers=auth_headers).json()
+    assert cols["count"] == 2
+
+
+def test_msgpack_negotiation(client: TestClient, auth_headers):
+    msgpack = pytest.importorskip("msgpack")
+    seed(client, auth_headers)
+    r = client.get("/api/transactions", headers={**auth_headers, "Accept": "application/x-msgpack"})
+    assert r.headers["content-type"] == columnar.MSGPACK
+    cols = msgpack.unpackb(r.content)
+    assert cols["amount_cents"] == [405, 500000, 1250]
+
+
+def test_msgpack_without_library(client: TestClient, monkeypatch, auth_headers):
+    monkeypatch.setattr(columnar, "msgpack", None)
+    only_msgpack = {**auth_headers, "Accept": "application/x-msgpack"}
+    assert client.get("/api/transactions", headers=only_msgpack).status_code == 406
+    # Clients that also take JSON get it instead
+    r = client.get("/api/transactions?format=columnar", headers={**only_msgpack, "Accept": "application/x-msgpack, application/json;q=0.5"})
+    assert r.status_code == 200 and r.json()["count"] == 0
@@ -0,0 +1,73 @@
+from datetime import datetime
+
+from fastapi.testclient import TestClient
+
+from app import models
+from app.archive import archive_database
+from app.duplicates import fingerprint, normalize_description
+
+
+STATEMENT = [
+    {"type": "expense", "amount": "12.50", "description": "ŻABKA  Warszawa", "date": "2024-05-01T08:00:00"},
+    {"type": "expense", "amount": "4.00", "description": "Kawa", "date": "2024-05-01T09:00:00"},
+    {"type": "expense", "amount": "4.00", "description": "Kawa", "date": "2024-05-01T15:00:00"},
+    {"type": "income", "amount": "5000.00", "description": "Pensja", "date": "2024-05-02T00:00:00"},
+]
+
+
+def test_fingerprint_normalization():
+    day = datetime(2024, 5, 1, 8)
+    assert normalize_description("ŻABKA  sp.z o.o.") == "zabka sp z o o"
+    assert fingerprint(day, "expense", 1250, "Żabka, Warszawa") == fingerprint(day.replace(hour=20), "expense", 1250, "zabka warszawa")
+    assert fingerprint(day, "expense", 1250, "zabka") != fingerprint(day, "income", 1250, "zabka")
+    assert fingerprint(day, "expense", 1250, "zabka") != fingerprint(day, "expense", 1251, "zabka")
+
+
+def test_bulk_reimport_skips_overlap(client: TestClient, auth_headers):
+    r = client.post("/api/transactions/bulk", json={"transactions": STATEMENT}, headers=auth_headers)
+    assert r.json() == {"created": 4, "categorized": 0, "duplicates": []}
+
+    # Overlapping statement: the two coffees and the salary again, plus one more coffee and a new line
+    overlap = STATEMENT[1:] + [
+        {**STATEMENT[1], "date": "2024-05-01T18:00:00"},
+        {"type": "expense", "amount": "30.00", "description": "Apteka", "date": "2024-05-03T10:00:00"},
+    ]
+    r = client.post("/api/transactions/bulk?on_duplicate=skip", json={"transactions": overlap}, headers=auth_headers)
+    assert r.json() == {"created": 2, "categorized": 0, "duplicates": [0, 1, 2]}
+    assert len(client.get("/api/transactions", headers=auth_headers).json()) == 6
+
+
+def test_single_create_reports_or_rejects_duplicates(client: TestClient, auth_headers):
+    first = client.post("/api/transactions", json=STATEMENT[0], headers=auth_headers).json()
+    assert first["duplicate_of"] is None
+
+    again = {**STATEMENT[0], "description": "zabka warszawa"}
+    r = client.post("/api/transactions?on_duplicate=skip", json=again, headers=auth_headers)
+    assert r.status_code == 409
+    assert r.json()["detail"]["duplicate_of"] == first["id"]
+
+    r = client.post("/api/transactions", json=again, headers=auth_headers)
+    assert r.status_code == 201
+    assert r.json()["duplicate_of"] == first["id"]
+
+    groups = client.get("/api/transactions/duplicates", headers=auth_headers).json()
+    assert len(groups) == 1
+    assert groups[0]["ids"] == [first["id"], r.json()["id"]]
+    assert groups[0]["amount"] == "12.50"
+
+    # Editing the copy makes it distinct
+    client.put(f"/api/transactions/{r.json()['id']}", json={"amount": "12.60"}, headers=auth_headers)
+    assert client.get("/api/transactions/duplicates", headers=auth_headers).json() == []
+
+
+def test_archived_rows_count_as_stored(client: TestClient, db_session, auth_headers):
+    old = {**STATEMENT[0], "date": "2020-01-05T10:00:00"}
+    client.post("/api/transactions", json=old, headers=auth_headers)
+    archive_database(db_session, horizon_days=365, now=datetime(2024, 6, 1))
+    assert db_session.query(models.ArchivedTransaction).count() == 1
+
+    r = client.post("/api/transactions/bulk?on_duplicate=skip", json={"transactions": [old]}, headers=auth_headers)
+    assert r.json()["duplicates"] == [0] and r.json()["created"] == 0
+    r = client.post("/api/transactions", json=old, headers=auth_headers)
+    groups = client.get("/api/transactions/duplicates", headers=auth_headers).json()
+    assert len(groups[0]["ids"]) == 2
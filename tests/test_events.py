@@ -0,0 +1,96 @@
+import asyncio
+import json
+import threading
+from datetime import datetime, timezone
+
+from fastapi.testclient import TestClient
+
+from app.core.events import EventHub, RESYNC, hub
+from app.main import app
+
+
+def test_hub_delivers_cross_thread_and_signals_resync_on_overflow():
+    async def scenario():
+        hub = EventHub(queue_size=2)
+        sub = hub.subscribe(7)
+        other = hub.subscribe(8)
+        t = threading.Thread(target=hub.publish, args=(7, {"type": "ping"}))
+        t.start()
+        t.join()
+        assert await asyncio.wait_for(sub.queue.get(), 1) == {"type": "ping"}
+        assert other.queue.empty()
+
+        for i in range(3):
+            hub.publish(7, {"type": "n", "i": i})
+        await asyncio.sleep(0)
+        assert await sub.queue.get() == RESYNC
+        hub.unsubscribe(sub)
+        hub.unsubscribe(other)
+        assert hub.subscriber_count() == 0
+
+    asyncio.run(scenario())
+
+
+def test_transaction_routes_publish_balance_deltas(client: TestClient, monkeypatch, auth_headers):
+    published = []
+    monkeypatch.setattr(hub, "publish", lambda user_id, event: published.append(event))
+
+    r = client.post(
+        "/api/transactions",
+        json={"type": "expense", "amount": "19.99", "date": datetime.now(timezone.utc).isoformat()},
+        headers=auth_headers,
+    )
+    tx = r.json()
+    client.put(f"/api/transactions/{tx['id']}", json={"type": "income", "amount": "5.00"}, headers=auth_headers)
+    client.delete(f"/api/transactions/{tx['id']}", headers=auth_headers)
+
+    assert [e["type"] for e in published] == ["transaction.created", "transaction.updated", "transaction.deleted"]
+    assert published[0]["transaction"]["id"] == tx["id"]
+    assert published[0]["balance_delta"] == {"income": "0", "expense": "19.99"}
+    assert published[1]["balance_delta"] == {"income": "5.00", "expense": "-19.99"}
+    assert published[2]["balance_delta"] == {"income": "-5.00", "expense": "0"}
+    assert published[2]["seq"] > published[1]["seq"] > published[0]["seq"]
+
+
+def test_event_stream_authenticates_with_query_token_and_streams_events(client: TestClient, auth_headers):
+    assert client.get("/api/events").status_code == 401
+    user_id = client.get("/api/auth/me", headers=auth_headers).json()["id"]
+    token = auth_headers["Authorization"].split()[1]
+
+    # TestClient buffers whole responses, so drive the endpoint as a raw ASGI call
+    async def scenario():
+        chunks = []
+        done = asyncio.Event()
+
+        async def receive():
+            await done.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                chunks.append(dict(message["headers"]))
+            elif message.get("body"):
+                chunks.append(message["body"].decode())
+                if "data:" in chunks[-1]:
+                    done.set()
+
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+            "scheme": "http", "path": "/api/events", "raw_path": b"/api/events", "root_path": "",
+            "query_string": f"token={token}".encode(), "headers": [],
+            "client": ("127.0.0.1", 1), "server": ("testserver", 80),
+        }
+        task = asyncio.create_task(app(scope, receive, send))
+        for _ in range(200):
+            if hub.subscriber_count(user_id):
+                break
+            await asyncio.sleep(0.01)
+        hub.publish(user_id, {"type": "transaction.deleted", "seq": 9, "id": 1})
+        await asyncio.wait_for(task, 5)
+        return chunks
+
+    chunks = asyncio.run(scenario())
+    assert chunks[0][b"content-type"].startswith(b"text/event-stream")
+    assert chunks[1] == "retry: 3000\n\n"
+    assert chunks[2] == 'event: transaction.deleted\ndata: {"type":"transaction.deleted","seq":9,"id":1}\n\n'
+    assert hub.subscriber_count(user_id) == 0
@@ -0,0 +1,155 @@
+import asyncio
+import json
+import time
+from urllib.parse import parse_qs, urlparse
+
+import httpx
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from fastapi.testclient import TestClient
+from jose import jwk, jwt
+
+from app.api import google_auth
+from app.core import oidc
+from app.core.config import settings
+
+ISSUER = "https://idp.test"
+CLIENT_ID = "client-123"
+
+
+class StandInProvider:
+    """Local OpenID provider answering through httpx.MockTransport; records every call."""
+
+    def __init__(self):
+        key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        self.private_pem = key.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+        )
+        public_pem = key.public_key().public_bytes(serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo)
+        self.jwks = {"keys": [{**jwk.construct(public_pem, "RS256").to_dict(), "kid": "k1", "use": "sig"}]}
+        self.calls = []
+        self.nonce = None
+        self.email = "oidc@example.com"
+
+    def metadata(self):
+        return {
+            "issuer": ISSUER,
+            "authorization_endpoint": f"{ISSUER}/authorize",
+            "token_endpoint": f"{ISSUER}/token",
+            "userinfo_endpoint": f"{ISSUER}/userinfo",
+            "jwks_uri": f"{ISSUER}/jwks",
+            "id_token_signing_alg_values_supported": ["RS256"],
+        }
+
+    def id_token(self):
+        now = int(time.time())
+        claims = {
+            "iss": ISSUER, "aud": CLIENT_ID, "sub": "42", "iat": now, "exp": now + 300,
+            "nonce": self.nonce, "email": self.email, "email_verified": True,
+        }
+        return jwt.encode(claims, self.private_pem, algorithm="RS256", headers={"kid": "k1"})
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        self.calls.append(path)
+        if path == "/.well-known/openid-configuration":
+            return httpx.Response(200, json=self.metadata())
+        if path == "/jwks":
+            return httpx.Response(200, json=self.jwks)
+        if path == "/token":
+            return httpx.Response(200, json={
+                "access_token": "at", "token_type": "Bearer", "expires_in": 3600, "id_token": self.id_token(),
+            })
+        return httpx.Response(404)
+
+
+@pytest.fixture()
+def provider(monkeypatch, tmp_path):
+    idp = StandInProvider()
+    transport = oidc.SharedTransport(httpx.MockTransport(idp.handler))
+    cache = oidc.ProviderCache(f"{ISSUER}/.well-known/openid-configuration", cache_dir=str(tmp_path), transport=transport)
+    monkeypatch.setattr(google_auth, "google_provider", cache)
+    app = google_auth.oauth.google
+    monkeypatch.setattr(app, "client_id", CLIENT_ID)
+    monkeypatch.setattr(app, "client_secret", "secret")
+    monkeypatch.setattr(app, "server_metadata", {})
+    monkeypatch.setitem(app.client_kwargs, "transport", transport)
+    monkeypatch.setattr(settings, "google_client_id", CLIENT_ID)
+    monkeypatch.setattr(settings, "google_client_secret", "secret")
+    idp.cache = cache
+    return idp
+
+
+def login(client: TestClient, idp: StandInProvider):
+    r = client.get("/api/auth/google/login", follow_redirects=False)
+    assert r.status_code == 302, r.text
+    query = parse_qs(urlparse(r.headers["location"]).query)
+    idp.nonce = query["nonce"][0]
+    return client.get(f"/api/auth/google/callback?code=abc&state={query['state'][0]}")
+
+
+def test_login_validates_id_token_locally(client: TestClient, provider):
+    r = login(client, provider)
+    assert r.status_code == 200, r.text
+    assert "access_token" in r.text
+    assert provider.calls == ["/.well-known/openid-configuration", "/jwks", "/token"]
+
+    # Second login: metadata and keys from the cache, no userinfo call
+    provider.calls.clear()
+    assert login(client, provider).status_code == 200
+    assert provider.calls == ["/token"]
+
+
+def test_rejects_token_for_another_audience(client: TestClient, provider, monkeypatch):
+    monkeypatch.setattr(google_auth.oauth.google, "client_id", "someone-else")
+    r = login(client, provider)
+    assert r.status_code == 400
+    assert r.json()["detail"].startswith("OAuth error")
+    assert "/userinfo" not in provider.calls
+
+
+def test_cache_file_is_shared_and_refreshed_in_background(provider, tmp_path):
+    cache = provider.cache
+    asyncio.run(cache.get())
+    assert provider.calls == ["/.well-known/openid-configuration", "/jwks"]
+
+    # Another worker reads the same file without any HTTP call
+    other = oidc.ProviderCache(cache.metadata_url, cache_dir=str(tmp_path), transport=cache.transport)
+    assert asyncio.run(other.get())["jwks"] == provider.jwks
+    assert len(provider.calls) == 2
+
+    async def stale_read():
+        other.fetched_at -= other.ttl + 1
+        stale_at = other.fetched_at
+        # Cached file is older now too; the stale copy is served and refreshed behind it
+        json_entry = {"fetched_at": stale_at, "metadata": other.metadata}
+        other.path.write_text(json.dumps(json_entry))
+        metadata = await other.get()
+        assert metadata["issuer"] == ISSUER and len(provider.calls) == 2
+        await other._refresh_task
+        return stale_at
+
+    stale_at = asyncio.run(stale_read())
+    assert provider.calls[2:] == ["/.well-known/openid-configuration", "/jwks"]
+    assert other.fetched_at > stale_at
+    assert json.loads(other.path.read_text())["fetched_at"] == other.fetched_at
+
+
+def test_cache_directory_writable_by_others_is_ignored(provider, tmp_path):
+    shared = tmp_path / "shared"
+    shared.mkdir()
+    shared.chmod(0o777)
+    planted = oidc.ProviderCache(provider.cache.metadata_url, cache_dir=str(shared), transport=provider.cache.transport)
+    planted.path.write_text(json.dumps({"fetched_at": time.time() + 3600, "metadata": {"issuer": "https://evil.example", "jwks": {"keys": []}}}))
+
+    assert asyncio.run(planted.get())["jwks"] == provider.jwks
+    assert provider.calls == ["/.well-known/openid-configuration", "/jwks"]
+    assert "evil" in planted.path.read_text()
+
+
+def test_without_a_cache_directory_metadata_stays_in_memory(provider, monkeypatch):
+    monkeypatch.setattr(settings, "oidc_cache_dir", "")
+    cache = oidc.ProviderCache(provider.cache.metadata_url, transport=provider.cache.transport)
+    assert cache.path is None
+    assert asyncio.run(cache.get())["jwks"] == provider.jwks
@@ -0,0 +1,70 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app import models
+from app.core.profiling import Profile, ProfileBuffer, profiles
+
+
+@pytest.fixture(autouse=True)
+def empty_buffer():
+    profiles.clear()
+    yield
+    profiles.clear()
+
+
+def make_superuser(db_session, email: str):
+    db_session.query(models.User).filter(models.User.email == email).update({models.User.is_superuser: True})
+    db_session.commit()
+
+
+def test_flag_is_ignored_for_regular_users(client: TestClient, auth_headers):
+    r = client.get("/api/reports/by-category", headers={**auth_headers, "X-Profile": "1"})
+    assert r.status_code == 200
+    assert "x-profile-id" not in r.headers
+    assert profiles.list() == []
+    assert client.get("/api/debug/profiles", headers=auth_headers).status_code == 403
+
+
+def test_superuser_profiles_a_single_request(client: TestClient, db_session, make_user):
+    headers = make_user("admin@example.com")
+    make_superuser(db_session, "admin@example.com")
+    client.post("/api/categories", json={"name": "Jedzenie"}, headers=headers)
+
+    r = client.get("/api/categories", headers=headers)
+    assert "x-profile-id" not in r.headers
+
+    r = client.get("/api/reports/by-category?profile=1", headers=headers)
+    assert r.status_code == 200
+    assert r.json()[0]["category_name"] == "Jedzenie"
+    profile_id = r.headers["x-profile-id"]
+    assert "db;dur=" in r.headers["server-timing"]
+
+    listed = client.get("/api/debug/profiles", headers=headers).json()
+    assert [p["id"] for p in listed] == [int(profile_id)]
+    details = client.get(f"/api/debug/profiles/{profile_id}", headers=headers).json()
+    assert details["path"] == "/api/reports/by-category"
+    assert details["status"] == 200
+    assert details["sql_count"] == len(details["sql"]) > 0
+    assert any("categories" in s["sql"] for s in details["sql"])
+
+    folded = client.get(f"/api/debug/profiles/{profile_id}?format=folded", headers=headers)
+    assert folded.headers["content-type"].startswith("text/plain")
+    assert client.get("/api/debug/profiles/999999", headers=headers).status_code == 404
+
+
+def test_ring_buffer_keeps_the_newest():
+    buffer = ProfileBuffer(2)
+    items = [Profile("GET", f"/api/{i}", "", 0.005) for i in range(3)]
+    for item in items:
+        buffer.add(item)
+    assert buffer.list() == [items[2], items[1]]
+    assert buffer.get(items[0].id) is None
+
+
+def test_folded_stacks_and_top_functions():
+    profile = Profile("GET", "/api/x", "", 0.005)
+    profile.stacks.update({"main;handler;query": 3, "main;handler": 1})
+    assert profile.folded() == "main;handler;query 3\nmain;handler 1\n"
+    top = {t["function"]: t for t in profile.top_functions()}
+    assert top["handler"] == {"function": "handler", "total": 4, "self": 1}
+    assert top["query"]["self"] == 3
@@ -0,0 +1,174 @@
+"""Statement budgets per API route, to catch N+1 queries and redundant lookups.
+
+Each budget is the number of SQL statements a route may issue on top of the authentication
+lookup, measured on a small seeded account that has categories, tags, a budget, a rule and
+archived transactions, so every branch that scales with data is exercised. Lower a budget when
+a route gets cheaper; raising one needs a reason in review.
+"""
+import random
+import re
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import models
+from app.api import debug
+from app.archive import archive_database
+from app.main import app
+
+# Statements of get_current_user (the user lookup)
+AUTH_QUERIES = 1
+
+# (method, path template, JSON body, statement budget excluding authentication)
+# Cached reports (balance, by-category, by-tag, the dashboard balance) spend one statement on the
+# user's change sequence, the cache key
+BUDGETS = [
+    ("GET", "/api/categories", None, 1),
+    ("POST", "/api/categories", {"name": "Nowa"}, 4),
+    ("GET", "/api/categories/{food}", None, 1),
+    ("PUT", "/api/categories/{food}", {"color": "#ff0000"}, 5),
+    ("DELETE", "/api/categories/{home}", None, 11),
+    ("GET", "/api/transactions?limit=2", None, 2),
+    # Page running past the archive boundary: hot page, boundary, merged page, archived tags
+    ("GET", "/api/transactions", None, 4),
+    ("GET", "/api/transactions?tags=trip,work&tag_match=all&limit=1", None, 3),
+    ("POST", "/api/transactions", {"type": "expense", "amount": "9.99", "description": "Lidl", "date": "2024-05-03T10:00:00", "tags": ["trip"]}, 11),
+    ("POST", "/api/transactions/bulk", {"transactions": [
+        {"type": "expense", "amount": "1.00", "description": f"Lidl {i}", "date": "2024-05-04T10:00:00", "tags": ["trip"]}
+        for i in range(50)
+    ]}, 10),
+    ("GET", "/api/transactions/duplicates", None, 2),
+    ("GET", "/api/transactions/export", None, 3),
+    ("GET", "/api/transactions/export?format=columnar", None, 3),
+    ("GET", "/api/transactions/{tx}", None, 1),
+    ("PUT", "/api/transactions/{tx}", {"amount": "20.00", "tags": ["work"]}, 11),
+    ("DELETE", "/api/transactions/{tx}", None, 7),
+    ("GET", "/api/reports/balance", None, 2),
+    ("GET", "/api/reports/monthly", None, 1),
+    ("GET", "/api/reports/by-category", None, 2),
+    ("GET", "/api/reports/by-tag", None, 4),
+    ("GET", "/api/reports/running-balance", None, 2),
+    ("GET", "/api/reports/pivot", None, 2),
+    ("GET", "/api/reports/stats", None, 4),
+    ("GET", "/api/reports/forecast", None, 1),
+    ("POST", "/api/debug/seed-demo", None, 14),
+    ("POST", "/api/debug/clear", None, 15),
+    ("GET", "/api/debug/profiles", None, 0),
+    ("GET", "/api/debug/profiles/{profile}", None, 0),
+    ("GET", "/api/budgets", None, 1),
+    ("PUT", "/api/budgets/{food}", {"monthly_limit": "300.00"}, 4),
+    ("DELETE", "/api/budgets/{food}", None, 1),
+    ("GET", "/api/budgets/status", None, 1),
+    ("POST", "/api/budgets/reconcile", None, 2),
+    ("GET", "/api/dashboard", None, 7),
+    # Full sync: hot and archived rows, each with their tags
+    ("GET", "/api/sync", None, 6),
+    ("GET", "/api/sync?since=1", None, 5),
+    ("GET", "/api/rules", None, 1),
+    ("POST", "/api/rules", {"category_id": "{food}", "pattern": "biedronka"}, 5),
+    ("PUT", "/api/rules/{rule}", {"priority": 5}, 6),
+    ("DELETE", "/api/rules/{rule}", None, 2),
+    ("POST", "/api/rules/apply", None, 3),
+    ("GET", "/api/tags", None, 1),
+    ("DELETE", "/api/tags/{tag}", None, 6),
+    ("GET", "/api/auth/me", None, 0),
+]
+
+# Routes without a budget, with the reason
+EXEMPT = {
+    ("GET", "/api/events"): "stream that stays open; one lookup per connection",
+    ("GET", "/api/auth/google/login"): "redirect to Google, no database access",
+    ("GET", "/api/auth/google/callback"): "OAuth exchange; covered by test_google_auth with a stand-in provider",
+    ("POST", "/api/auth/register"): "password hashing dominates; covered by test_auth",
+    ("POST", "/api/auth/login"): "password hashing dominates; covered by test_auth",
+}
+
+
+class SameDayRandom(random.Random):
+    """Seeded draws with every demo transaction dated today, so seed-demo touches a fixed set of counters."""
+
+    def randint(self, a, b):
+        return a
+
+
+@pytest.fixture()
+def seeded(client: TestClient, db_session, monkeypatch, make_user):
+    monkeypatch.setattr(debug, "random", SameDayRandom(0))
+    h = make_user("budgets@example.com")
+    # Superuser so the debug profile routes are reachable too
+    db_session.query(models.User).filter(models.User.email == "budgets@example.com").update({models.User.is_superuser: True})
+    db_session.commit()
+    food = client.post("/api/categories", json={"name": "Jedzenie"}, headers=h).json()["id"]
+    home = client.post("/api/categories", json={"name": "Dom"}, headers=h).json()["id"]
+    client.put(f"/api/budgets/{food}", json={"monthly_limit": "500.00"}, headers=h)
+    rule = client.post("/api/rules", json={"category_id": home, "pattern": "ikea"}, headers=h).json()["id"]
+    rows = [
+        (food, "expense", "12.50", "2020-01-05T10:00:00", ["trip"]),
+        (home, "expense", "300.00", "2021-03-01T10:00:00", []),
+        (None, "income", "2000.00", "2024-04-02T10:00:00", ["work"]),
+        (food, "expense", "40.00", "2024-05-01T10:00:00", ["trip", "work"]),
+        (home, "expense", "99.00", "2024-05-02T10:00:00", ["trip"]),
+        (None, "expense", "5.00", "2024-05-02T11:00:00", []),
+    ]
+    tx_ids = [
+        client.post(
+            "/api/transactions",
+            json={"category_id": c, "type": t, "amount": a, "date": d, "tags": tags},
+            headers=h,
+        ).json()["id"]
+        for c, t, a, d, tags in rows
+    ]
+    archive_database(db_session, horizon_days=365 * 2, now=datetime(2024, 6, 1))
+    tag = next(t["id"] for t in client.get("/api/tags", headers=h).json() if t["name"] == "trip")
+    profile = client.get("/api/categories", headers={**h, "X-Profile": "1"}).headers["x-profile-id"]
+    return {"headers": h, "food": food, "home": home, "rule": rule, "tx": tx_ids[-2], "tag": tag, "profile": profile}
+
+
+def _fill(value, ids):
+    if isinstance(value, str):
+        return value.format(**ids) if "{" in value else value
+    if isinstance(value, dict):
+        filled = {k: _fill(v, ids) for k, v in value.items()}
+        return {k: int(v) if k.endswith("_id") and isinstance(v, str) and v.isdigit() else v for k, v in filled.items()}
+    if isinstance(value, list):
+        return [_fill(v, ids) for v in value]
+    return value
+
+
+@pytest.mark.parametrize("method,path,body,budget", BUDGETS, ids=[f"{m} {p}" for m, p, _, _ in BUDGETS])
+def test_route_statement_budget(client: TestClient, seeded, count_queries, method, path, body, budget):
+    url = _fill(path, seeded)
+    with count_queries() as q:
+        r = client.request(method, url, json=_fill(body, seeded), headers=seeded["headers"])
+    assert 200 <= r.status_code < 300, r.text
+    assert q.count <= budget + AUTH_QUERIES, f"{method} {url}: {q.report()}"
+
+
+def _route_key(method: str, path: str):
+    return method.upper(), re.sub(r"\{[^}]*\}", "{}", path.split("?")[0])
+
+
+def test_every_route_has_a_budget():
+    budgeted = {_route_key(m, p) for m, p, _, _ in BUDGETS} | {_route_key(m, p) for m, p in EXEMPT}
+    routes = {
+        _route_key(method, path)
+        for path, operations in app.openapi()["paths"].items() if path.startswith("/api/")
+        for method in operations
+    }
+    missing = routes - budgeted
+    assert not missing, f"routes without a statement budget: {sorted(missing)}"
+
+
+def test_bulk_import_statements_do_not_grow_with_rows(client: TestClient, seeded, count_queries):
+    def import_rows(n: int, day: int) -> int:
+        rows = [
+            {"type": "expense", "amount": f"{i + 1}.00", "description": "Lidl", "date": f"2024-05-{day:02d}T10:00:00", "tags": ["trip"]}
+            for i in range(n)
+        ]
+        with count_queries() as q:
+            r = client.post("/api/transactions/bulk", json={"transactions": rows}, headers=seeded["headers"])
+        assert r.json()["created"] == n
+        return q.count
+
+    assert import_rows(200, 10) == import_rows(2, 11)
@@ -0,0 +1,98 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+from uvicorn.middleware.proxy_headers import ProxyHeadersMiddleware
+
+from app.core.admission import AdmissionGate, Overloaded
+from app.core.config import settings
+from app.core.ratelimit import InMemoryBackend, RateLimitBackend, RateLimiter, limiter
+
+
+def test_login_is_rate_limited_per_ip_with_retry_after(client: TestClient, monkeypatch):
+    monkeypatch.setattr(limiter, "capacity", 30)
+    limiter.backend.reset()
+    statuses = []
+    for _ in range(4):
+        r = client.post("/api/auth/login", data={"username": "nobody@example.com", "password": "x"})
+        statuses.append(r.status_code)
+    # login costs 10: three attempts fit in a 30-token bucket, the fourth is rejected
+    assert statuses == [401, 401, 401, 429]
+    assert int(r.headers["retry-after"]) >= 1
+
+
+def test_limiter_keys_by_user_and_costs_by_route():
+    backend = InMemoryBackend()
+    rl = RateLimiter(backend, capacity=10, refill_rate=1.0, costs={("GET", "/api/reports/by-category"): 5})
+    scope = {"method": "GET", "path": "/api/reports/by-category", "headers": [], "client": ("10.0.0.1", 1)}
+    assert rl.check(scope) == 0
+    assert rl.check(scope) == 0
+    assert rl.check(scope) > 0
+    other = dict(scope, client=("10.0.0.2", 1))
+    assert rl.check(other) == 0
+
+
+def test_limiter_keys_by_forwarded_address_behind_a_trusted_proxy():
+    keys = []
+
+    async def app(scope, receive, send):
+        keys.append(RateLimiter.client_key(scope))
+
+    # What app.server puts in front of the app
+    proxied = ProxyHeadersMiddleware(app, trusted_hosts=settings.forwarded_allow_ips)
+    for peer, forwarded in [("127.0.0.1", b"203.0.113.7"), ("127.0.0.1", b"198.51.100.2"), ("10.0.0.5", b"203.0.113.7")]:
+        scope = {
+            "type": "http", "scheme": "http", "method": "GET", "path": "/api/categories",
+            "headers": [(b"x-forwarded-for", forwarded)], "client": (peer, 5000),
+        }
+        asyncio.run(proxied(scope, None, None))
+    # Clients behind the proxy get their own buckets; an untrusted peer cannot pick one
+    assert keys == ["ip:203.0.113.7", "ip:198.51.100.2", "ip:10.0.0.5"]
+
+
+class AsyncOnlyBackend(RateLimitBackend):
+    """Stands in for a network backend: the blocking call must never run on the event loop."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def take(self, key, cost, capacity, refill_rate):
+        raise AssertionError("blocking take() called from the middleware")
+
+    async def take_async(self, key, cost, capacity, refill_rate):
+        self.calls += 1
+        return 0.0 if self.calls == 1 else 3.0
+
+    def reset(self):
+        self.calls = 0
+
+
+def test_middleware_uses_the_async_backend_call(client: TestClient, monkeypatch):
+    backend = AsyncOnlyBackend()
+    monkeypatch.setattr(limiter, "backend", backend)
+    assert client.get("/api/categories").status_code == 401
+    r = client.get("/api/categories")
+    assert r.status_code == 429 and r.headers["retry-after"] == "3"
+    assert backend.calls == 2
+
+def test_admission_gate_rejects_when_queue_is_full():
+    gate = AdmissionGate("test", concurrency=1, max_queue=0, timeout=0.1)
+    entered = threading.Event()
+    release = threading.Event()
+
+    def hold():
+        with gate.admit():
+            entered.set()
+            release.wait(1)
+
+    t = threading.Thread(target=hold)
+    t.start()
+    entered.wait(1)
+    with pytest.raises(Overloaded):
+        with gate.admit():
+            pass
+    release.set()
+    t.join()
+    with gate.admit():
+        pass
@@ -0,0 +1,141 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app import models
+from app.categorize import RuleMatcher, RuleSpec, matchers
+
+
+@pytest.fixture(autouse=True)
+def fresh_matchers():
+    # Test databases are rolled back, so user ids and change sequences repeat between tests
+    matchers.invalidate()
+    yield
+
+
+def make_categories(client: TestClient, headers: dict, *names):
+    return [client.post("/api/categories", json={"name": n}, headers=headers).json()["id"] for n in names]
+
+
+def add_rule(client: TestClient, headers: dict, **rule):
+    r = client.post("/api/rules", json=rule, headers=headers)
+    assert r.status_code == 201, r.text
+    return r.json()
+
+
+def test_matcher_priority_type_and_amount_ranges():
+    m = RuleMatcher([
+        RuleSpec(1, "biedronka", None, None, None),
+        RuleSpec(2, r"czynsz|najem", models.TxType.expense, 100000, None),
+        RuleSpec(3, None, models.TxType.income, 500000, 999999),
+        RuleSpec(4, "sklep", None, None, 5000),
+        RuleSpec(5, "sklep", None, None, None),
+    ])
+    assert m.categorize("Zakupy BIEDRONKA 123", 2000, "expense") == 1
+    assert m.categorize("Czynsz za maj", 250000, "expense") == 2
+    assert m.categorize("Czynsz za maj", 50000, "expense") is None
+    assert m.categorize("Czynsz za maj", 250000, "income") is None
+    assert m.categorize("Pensja", 600000, "income") == 3
+    assert m.categorize("Pensja", 1000000, "income") is None
+    assert m.categorize("maly sklep", 5000, "expense") == 4
+    assert m.categorize("duzy sklep", 5001, "expense") == 5
+    assert m.categorize(None, 100, "expense") is None
+
+
+def test_create_transaction_applies_rules(client: TestClient, auth_headers):
+    food, fuel, rent = make_categories(client, auth_headers, "Jedzenie", "Paliwo", "Czynsz")
+    add_rule(client, auth_headers, category_id=food, pattern="lidl")
+    add_rule(client, auth_headers, category_id=fuel, kind="regex", pattern=r"orlen|shell\b", priority=10)
+    add_rule(client, auth_headers, category_id=rent, type="expense", min_amount="1000.00", priority=200)
+
+    def create(description, amount="10.00", category_id=None):
+        r = client.post(
+            "/api/transactions",
+            json={"type": "expense", "amount": amount, "description": description, "category_id": category_id, "date": "2024-05-01T10:00:00"},
+            headers=auth_headers,
+        )
+        assert r.status_code == 201, r.text
+        return r.json()["category_id"]
+
+    assert create("LIDL Warszawa") == food
+    assert create("Stacja ORLEN i lidl") == fuel  # priority 10 wins over 100
+    assert create("Przelew", amount="1500.00") == rent
+    assert create("Przelew") is None
+    assert create("LIDL", category_id=rent) == rent  # explicit category is kept
+
+    rules = client.get("/api/rules", headers=auth_headers).json()
+    assert [r["category_id"] for r in rules] == [fuel, food, rent]
+
+
+def test_rule_validation(client: TestClient, auth_headers):
+    (food,) = make_categories(client, auth_headers, "Jedzenie")
+    bad = [
+        {"category_id": food, "kind": "regex", "pattern": "("},
+        {"category_id": food, "kind": "regex", "pattern": "(lidl)"},
+        {"category_id": food, "kind": "regex", "pattern": "(?:a+)+$"},
+        {"category_id": food, "kind": "regex", "pattern": "(?:a|aa)*b"},
+        {"category_id": food, "kind": "regex", "pattern": "a{1000}"},
+        {"category_id": food, "kind": "regex", "pattern": r"\w+\s+\w+\s+\w+"},
+        {"category_id": food},
+        {"category_id": 9999, "pattern": "x"},
+        {"category_id": food, "min_amount": "10.00", "max_amount": "5.00"},
+    ]
+    for rule in bad:
+        r = client.post("/api/rules", json=rule, headers=auth_headers)
+        assert r.status_code == 400, rule
+
+
+
+def test_stored_rules_failing_pattern_checks_are_skipped(client: TestClient, db_session, auth_headers):
+    food, home = make_categories(client, auth_headers, "Jedzenie", "Dom")
+    add_rule(client, auth_headers, category_id=home, pattern="ikea", priority=10)
+    user_id = client.get("/api/auth/me", headers=auth_headers).json()["id"]
+    # Saved before nested repeats were rejected
+    db_session.add(models.CategoryRule(user_id=user_id, category_id=food, kind="regex", pattern="(?:i+)+kea", priority=1, seq=99))
+    db_session.commit()
+
+    r = client.post("/api/transactions", json={"type": "expense", "amount": "5.00", "description": "IKEA", "date": "2024-05-01T10:00:00"}, headers=auth_headers)
+    assert r.status_code == 201 and r.json()["category_id"] == home
+
+def test_rule_changes_invalidate_cached_matcher(client: TestClient, auth_headers):
+    food, home = make_categories(client, auth_headers, "Jedzenie", "Dom")
+    rule = add_rule(client, auth_headers, category_id=food, pattern="ikea")
+
+    def create():
+        r = client.post("/api/transactions", json={"type": "expense", "amount": "5.00", "description": "IKEA", "date": "2024-05-01T10:00:00"}, headers=auth_headers)
+        return r.json()["category_id"]
+
+    assert create() == food
+    r = client.put(f"/api/rules/{rule['id']}", json={"category_id": home}, headers=auth_headers)
+    assert r.status_code == 200, r.text
+    assert create() == home
+    assert client.delete(f"/api/rules/{rule['id']}", headers=auth_headers).status_code == 204
+    assert create() is None
+
+
+def test_bulk_create_and_apply(client: TestClient, auth_headers):
+    food, fuel = make_categories(client, auth_headers, "Jedzenie", "Paliwo")
+    add_rule(client, auth_headers, category_id=food, pattern="zabka")
+    rows = [
+        {"type": "expense", "amount": "3.50", "description": f"Zabka {i}", "date": "2024-05-01T10:00:00"}
+        for i in range(30)
+    ] + [
+        {"type": "expense", "amount": "200.00", "description": f"Orlen {i}", "date": "2024-05-02T10:00:00"}
+        for i in range(20)
+    ]
+    r = client.post("/api/transactions/bulk", json={"transactions": rows}, headers=auth_headers)
+    assert r.status_code == 201, r.text
+    assert r.json() == {"created": 50, "categorized": 30, "duplicates": []}
+
+    r = client.post("/api/transactions/bulk", json={"transactions": [{**rows[0], "category_id": 9999}]}, headers=auth_headers)
+    assert r.status_code == 400
+
+    add_rule(client, auth_headers, category_id=fuel, pattern="orlen")
+    r = client.post("/api/rules/apply?batch_size=7", headers=auth_headers)
+    assert r.status_code == 200, r.text
+    assert r.json() == {"scanned": 20, "categorized": 20, "batches": 3}
+
+    report = client.get("/api/reports/by-category", headers=auth_headers).json()
+    totals = {row["category_id"]: row["expense"] for row in report}
+    assert totals[food] == "105.00" and totals[fuel] == "4000.00"
+    r = client.post("/api/budgets/reconcile", headers=auth_headers)
+    assert r.json() == {"corrected": 0}
@@ -0,0 +1,115 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.pool import StaticPool
+
+from app import models, deps, shards
+from app.api import auth
+from app.database import Base
+from tests.conftest import TEST_ENGINE
+
+
+def _memory_engine():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    return engine
+
+
+@pytest.fixture()
+def router(monkeypatch):
+    router = shards.ShardRouter(TEST_ENGINE, {"s1": _memory_engine(), "s2": _memory_engine()})
+    monkeypatch.setattr(deps, "shard_router", router)
+    monkeypatch.setattr(auth, "shard_router", router)
+    yield router
+    for name in ("s1", "s2"):
+        router.engines[name].dispose()
+
+
+def count(router, shard, model, user_id):
+    with router.session(shard) as db:
+        return db.scalar(select(func.count()).select_from(model).where(model.user_id == user_id))
+
+
+def test_users_are_spread_over_shards_and_data_stays_on_theirs(client: TestClient, db_session, router, make_user):
+    headers_a = make_user("a@example.com")
+    headers_b = make_user("b@example.com")
+    a = client.get("/api/auth/me", headers=headers_a).json()["id"]
+    b = client.get("/api/auth/me", headers=headers_b).json()["id"]
+    assert {router.shard_of(db_session, a), router.shard_of(db_session, b)} == {"s1", "s2"}
+    shard_a = router.shard_of(db_session, a)
+
+    cat = client.post("/api/categories", json={"name": "Jedzenie"}, headers=headers_a).json()
+    r = client.post(
+        "/api/transactions",
+        json={"category_id": cat["id"], "type": "expense", "amount": "12.50", "date": "2024-01-05T10:00:00"},
+        headers=headers_a,
+    )
+    assert r.status_code == 201, r.text
+
+    assert count(router, shard_a, models.Transaction, a) == 1
+    assert db_session.scalar(select(func.count()).select_from(models.Transaction)) == 0
+    assert client.get("/api/reports/balance", headers=headers_a).json()["expense"] == "12.50"
+    assert client.get("/api/transactions", headers=headers_b).json() == []
+
+
+def test_move_user_between_shards_remaps_ids_and_tombstones_old_ones(client: TestClient, db_session, router, auth_headers):
+    user_id = client.get("/api/auth/me", headers=auth_headers).json()["id"]
+    source = router.shard_of(db_session, user_id)
+    target = "s2" if source == "s1" else "s1"
+
+    # Occupy low ids on the target so the moved rows cannot keep theirs
+    with router.session(target) as db:
+        db.add_all(models.Category(name=f"other {i}", user_id=999) for i in range(3))
+        db.commit()
+
+    cat = client.post("/api/categories", json={"name": "Dom"}, headers=auth_headers).json()
+    client.put(f"/api/budgets/{cat['id']}", json={"monthly_limit": "100.00"}, headers=auth_headers)
+    tx = client.post(
+        "/api/transactions",
+        json={"category_id": cat["id"], "type": "expense", "amount": "40.00", "date": "2024-01-05T10:00:00"},
+        headers=auth_headers,
+    ).json()
+    before = client.get("/api/sync", headers=auth_headers).json()
+
+    result = shards.move_user(router, db_session, user_id, target)
+    assert result["moved"] and result["transactions"] == 1
+    assert router.shard_of(db_session, user_id) == target
+    assert count(router, source, models.Transaction, user_id) == 0
+    assert count(router, source, models.Category, user_id) == 0
+
+    r = client.get(f"/api/sync?since={before['seq']}", headers=auth_headers)
+    data = r.json()
+    assert data["seq"] > before["seq"]
+    [moved_cat] = data["categories"]
+    [moved_tx] = data["transactions"]
+    assert moved_cat["id"] != cat["id"] and moved_tx["category_id"] == moved_cat["id"]
+    # The category got a new id, so the old one is tombstoned; the transaction id was free on the
+    # target and is reused, so clients simply overwrite that row
+    assert moved_tx["id"] == tx["id"]
+    assert data["deleted"] == {"categories": [cat["id"]], "transactions": []}
+
+    status = client.get("/api/budgets/status?year=2024&month=1", headers=auth_headers).json()
+    assert status["categories"][0]["spent"] == "40.00"
+    assert status["categories"][0]["remaining"] == "60.00"
+
+
+def test_create_schema_migrates_existing_shards():
+    legacy = _memory_engine()
+    with legacy.begin() as conn:
+        # A shard created before duplicate detection: no fingerprint column or index
+        conn.exec_driver_sql("DROP INDEX ix_transactions_user_fingerprint")
+        conn.exec_driver_sql("ALTER TABLE transactions DROP COLUMN fingerprint")
+        conn.exec_driver_sql(
+            "INSERT INTO transactions (user_id, seq, type, amount_cents, description, date, is_planned) "
+            "VALUES (1, 1, 'expense', 1250, 'Zakupy', '2024-05-01 10:00:00', 0)"
+        )
+    router = shards.ShardRouter(TEST_ENGINE, {"s1": legacy})
+    try:
+        router.create_schema()
+        with router.session("s1") as db:
+            assert db.scalar(select(models.Transaction.fingerprint)) is not None
+        with legacy.connect() as conn:
+            indexes = {row[1] for row in conn.exec_driver_sql("PRAGMA index_list(transactions)")}
+        assert "ix_transactions_user_fingerprint" in indexes
+    finally:
+        legacy.dispose()
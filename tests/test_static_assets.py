@@ -0,0 +1,41 @@
+import re
+
+from fastapi.testclient import TestClient
+
+
+def test_index_references_hashed_immutable_assets(client: TestClient):
+    r = client.get("/")
+    assert r.status_code == 200
+    assert r.headers["cache-control"] == "no-cache"
+    m = re.search(r'src="(/static/main\.[0-9a-f]{12}\.js)"', r.text)
+    assert m, r.text[-300:]
+
+    r = client.get(m.group(1), headers={"Accept-Encoding": "gzip"})
+    assert r.status_code == 200
+    assert r.headers["content-encoding"] == "gzip"
+    assert "immutable" in r.headers["cache-control"]
+    assert "Accept-Encoding" in r.headers["vary"]
+    assert "function getToken" in r.text
+
+    # Unhashed name still works but must be revalidated
+    r = client.get("/static/main.js", headers={"Accept-Encoding": "identity"})
+    assert r.status_code == 200
+    assert "content-encoding" not in r.headers
+    assert r.headers["cache-control"] == "no-cache"
+
+    assert client.get("/static/missing.js").status_code == 404
+
+
+def test_html_etag_revalidation(client: TestClient):
+    r = client.get("/login")
+    etag = r.headers["etag"]
+    r = client.get("/login", headers={"If-None-Match": etag})
+    assert r.status_code == 304
+    assert r.content == b""
+
+
+def test_large_json_responses_are_gzipped(client: TestClient):
+    r = client.get("/api/openapi.json", headers={"Accept-Encoding": "gzip"})
+    assert r.status_code == 200
+    assert r.headers["content-encoding"] == "gzip"
+    assert "paths" in r.json()
@@ -0,0 +1,77 @@
+from datetime import datetime, timezone
+from fastapi.testclient import TestClient
+
+from app.archive import archive_database
+
+
+def add_tx(client: TestClient, headers: dict, category_id=None, amount="10.00"):
+    r = client.post(
+        "/api/transactions",
+        json={
+            "category_id": category_id,
+            "type": "expense",
+            "amount": amount,
+            "date": datetime.now(timezone.utc).isoformat(),
+            "is_planned": False,
+        },
+        headers=headers,
+    )
+    assert r.status_code == 201, r.text
+    return r.json()
+
+
+def test_delta_sync_returns_changes_and_tombstones(client: TestClient, auth_headers):
+    cat = client.post("/api/categories", json={"name": "Kawa"}, headers=auth_headers).json()
+    tx1 = add_tx(client, auth_headers, cat["id"])
+    tx2 = add_tx(client, auth_headers)
+
+    full = client.get("/api/sync", headers=auth_headers).json()
+    assert full["seq"] == 3
+    assert [c["id"] for c in full["categories"]] == [cat["id"]]
+    assert {t["id"] for t in full["transactions"]} == {tx1["id"], tx2["id"]}
+
+    # Nothing changed since
+    r = client.get(f"/api/sync?since={full['seq']}", headers=auth_headers).json()
+    assert r["categories"] == [] and r["transactions"] == []
+    assert r["deleted"] == {"categories": [], "transactions": []}
+
+    client.put(f"/api/transactions/{tx2['id']}", json={"amount": "12.00"}, headers=auth_headers)
+    # Deleting the category detaches tx1, which therefore changes as well
+    client.delete(f"/api/categories/{cat['id']}", headers=auth_headers)
+
+    delta = client.get(f"/api/sync?since={full['seq']}", headers=auth_headers).json()
+    assert delta["seq"] == 5
+    assert {t["id"]: t["amount"] for t in delta["transactions"]}[tx2["id"]] == "12.00"
+    assert {t["id"]: t["category_id"] for t in delta["transactions"]}[tx1["id"]] is None
+    assert delta["deleted"] == {"categories": [cat["id"]], "transactions": []}
+
+    client.post("/api/debug/clear", headers=auth_headers)
+    delta = client.get(f"/api/sync?since={delta['seq']}", headers=auth_headers).json()
+    assert sorted(delta["deleted"]["transactions"]) == sorted([tx1["id"], tx2["id"]])
+    assert delta["transactions"] == []
+
+
+def test_sync_is_scoped_per_user(client: TestClient, make_user):
+    headers_1 = make_user("s1@example.com")
+    headers_2 = make_user("s2@example.com")
+    add_tx(client, headers_1)
+    r = client.get("/api/sync", headers=headers_2).json()
+    assert r == {"seq": 0, "categories": [], "transactions": [], "deleted": {"categories": [], "transactions": []}}
+
+
+def test_full_sync_and_clear_cover_archived_transactions(client: TestClient, db_session, auth_headers):
+    old = client.post(
+        "/api/transactions",
+        json={"type": "expense", "amount": "3.50", "date": "2020-01-05T10:00:00", "tags": ["trip"]},
+        headers=auth_headers,
+    ).json()
+    new = add_tx(client, auth_headers)
+    archive_database(db_session, horizon_days=365, now=datetime.now())
+
+    full = client.get("/api/sync", headers=auth_headers).json()
+    assert [t["id"] for t in full["transactions"]] == [old["id"], new["id"]]
+    assert full["transactions"][0]["tags"] == ["trip"]
+
+    client.post("/api/debug/clear", headers=auth_headers)
+    delta = client.get(f"/api/sync?since={full['seq']}", headers=auth_headers).json()
+    assert sorted(delta["deleted"]["transactions"]) == sorted([old["id"], new["id"]])
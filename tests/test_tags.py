@@ -0,0 +1,97 @@
+from datetime import datetime
+
+from fastapi.testclient import TestClient
+from sqlalchemy import select, text
+
+from app import models, tags as tagging
+from app.archive import archive_database
+
+
+def create(client: TestClient, headers: dict, amount: str, tags, tx_type: str = "expense", date: str = "2024-05-01T10:00:00"):
+    r = client.post(
+        "/api/transactions",
+        json={"type": tx_type, "amount": amount, "date": date, "tags": tags},
+        headers=headers,
+    )
+    assert r.status_code == 201, r.text
+    return r.json()
+
+
+def ids(client: TestClient, headers: dict, query: str):
+    r = client.get(f"/api/transactions?{query}", headers=headers)
+    assert r.status_code == 200, r.text
+    return sorted(t["id"] for t in r.json())
+
+
+def test_tags_filter_any_all_and_report(client: TestClient, auth_headers):
+    a = create(client, auth_headers, "10.00", ["Trip", " reimbursable"])
+    b = create(client, auth_headers, "20.00", ["trip"])
+    c = create(client, auth_headers, "5.00", ["project-x", "reimbursable"])
+    d = create(client, auth_headers, "100.00", [], tx_type="income")
+    assert a["tags"] == ["reimbursable", "trip"]
+    assert d["tags"] == []
+
+    assert ids(client, auth_headers, "tags=trip") == [a["id"], b["id"]]
+    assert ids(client, auth_headers, "tags=trip,project-x") == [a["id"], b["id"], c["id"]]
+    assert ids(client, auth_headers, "tags=trip,reimbursable&tag_match=all") == [a["id"]]
+    assert ids(client, auth_headers, "tags=trip,unknown&tag_match=all") == []
+    assert ids(client, auth_headers, "tags=unknown") == []
+    assert ids(client, auth_headers, "tags=trip&type=income") == []
+
+    r = client.put(f"/api/transactions/{b['id']}", json={"tags": ["project-x"]}, headers=auth_headers)
+    assert r.status_code == 200, r.text
+    assert r.json()["tags"] == ["project-x"]
+
+    report = client.get("/api/reports/by-tag", headers=auth_headers).json()
+    assert [(r["tag_name"], r["expense"], r["count"]) for r in report] == [
+        ("project-x", "25.00", 2),
+        ("reimbursable", "15.00", 2),
+        ("trip", "10.00", 1),
+    ]
+    tags = {t["name"]: t for t in client.get("/api/tags", headers=auth_headers).json()}
+    assert {name: t["count"] for name, t in tags.items()} == {"project-x": 2, "reimbursable": 2, "trip": 1}
+
+    assert client.delete(f"/api/tags/{tags['trip']['id']}", headers=auth_headers).status_code == 204
+    r = client.get(f"/api/transactions/{a['id']}", headers=auth_headers)
+    assert r.json()["tags"] == ["reimbursable"]
+
+
+def test_archived_transactions_keep_tags(client: TestClient, db_session, auth_headers):
+    old = create(client, auth_headers, "12.50", ["trip"], date="2020-01-05T10:00:00")
+    new = create(client, auth_headers, "7.00", ["trip"], date="2024-05-01T10:00:00")
+    archive_database(db_session, horizon_days=365, now=datetime(2024, 6, 1))
+    assert db_session.get(models.ArchivedTransaction, old["id"]) is not None
+
+    assert ids(client, auth_headers, "tags=trip") == [old["id"], new["id"]]
+    assert ids(client, auth_headers, "tags=trip&date_from=2024-01-01T00:00:00") == [new["id"]]
+    page = client.get("/api/transactions?tags=trip", headers=auth_headers).json()
+    assert [t["tags"] for t in page] == [["trip"], ["trip"]]
+    report = client.get("/api/reports/by-tag", headers=auth_headers).json()
+    assert (report[0]["expense"], report[0]["count"]) == ("19.50", 2)
+
+
+def test_new_transactions_do_not_inherit_tags_of_archived_ones(client: TestClient, db_session, auth_headers):
+    create(client, auth_headers, "7.00", [], date="2024-05-01T10:00:00")
+    # The newest row is the one archived, so its id is the highest ever handed out
+    old = create(client, auth_headers, "12.50", ["trip"], date="2020-01-05T10:00:00")
+    archive_database(db_session, horizon_days=365, now=datetime(2024, 6, 1))
+
+    new = create(client, auth_headers, "3.00", [])
+    assert new["id"] != old["id"] and new["tags"] == []
+    assert client.get(f"/api/transactions/{new['id']}", headers=auth_headers).json()["tags"] == []
+    assert client.delete(f"/api/transactions/{new['id']}", headers=auth_headers).status_code == 204
+    assert client.get(f"/api/transactions/{old['id']}", headers=auth_headers).json()["tags"] == ["trip"]
+
+def test_tag_filters_use_indexes(db_session):
+    names = ["trip", "project-x"]
+    resolved = {"trip": 1, "project-x": 2}
+    for match in ("any", "all"):
+        stmt = (
+            select(models.Transaction.id)
+            .where(models.Transaction.user_id == 1)
+            .where(*tagging.filter_conditions(models.Transaction, names, resolved, match))
+        )
+        sql = str(stmt.compile(db_session.get_bind(), compile_kwargs={"literal_binds": True}))
+        plan = " | ".join(row[-1] for row in db_session.execute(text("EXPLAIN QUERY PLAN " + sql)))
+        assert "ix_transaction_tags_tag_transaction" in plan, plan
+        assert "SCAN transaction_tags" not in plan, plan